@@ -127,6 +127,55 @@ def get_price(symbol):
         return {'error': str(e)}
 $$;
 
+-- 5c. Batch Stock Price Table Function
+-- One call per batch of symbols, fetched concurrently inside the function:
+--   SELECT * FROM TABLE(SECURITY_MASTER_DB.TRADES.GET_STOCK_PRICES(SPLIT('AAPL,MSFT,NVDA', ',')));
+CREATE OR REPLACE FUNCTION SECURITY_MASTER_DB.TRADES.GET_STOCK_PRICES(SYMBOLS ARRAY)
+RETURNS TABLE (SYMBOL VARCHAR, PRICE FLOAT, PREVIOUS_CLOSE FLOAT, MARKET_STATE VARCHAR,
+               EXCHANGE VARCHAR, QUOTE_TIME VARCHAR, ERROR VARCHAR)
+LANGUAGE PYTHON
+RUNTIME_VERSION = '3.11'
+PACKAGES = ('requests')
+EXTERNAL_ACCESS_INTEGRATIONS = (YAHOO_FINANCE_INTEGRATION)
+HANDLER = 'StockPrices'
+AS
+$$
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+WORKERS = 16
+
+class StockPrices:
+    def __init__(self):
+        self.http = requests.Session()
+        self.http.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=WORKERS))
+
+    def quote(self, symbol):
+        try:
+            url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+            response = self.http.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+            if response.status_code != 200:
+                return (symbol, None, None, None, None, None, f"API error {response.status_code}")
+            result = (response.json().get('chart', {}).get('result') or [{}])[0]
+            meta = result.get('meta', {})
+            market_time = meta.get('regularMarketTime')
+            return (symbol, meta.get('regularMarketPrice'),
+                    meta.get('previousClose', meta.get('chartPreviousClose')),
+                    meta.get('marketState'), meta.get('exchangeName'),
+                    time.strftime('%H:%M:%S', time.gmtime(market_time)) if market_time else '',
+                    None)
+        except Exception as e:
+            return (symbol, None, None, None, None, None, str(e))
+
+    def process(self, symbols):
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols or [] if s and s.strip()))
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            for row in pool.map(self.quote, symbols):
+                yield row
+$$;
+
 -- ============================================
 -- STEP 6: Create FIX Stage for FIXML Messages
 -- ============================================
@@ -139,8 +188,24 @@ CREATE OR REPLACE STAGE SECURITY_MASTER_DB.TRADES.FIX_STAGE
 CREATE OR REPLACE STAGE SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE
     DIRECTORY = (ENABLE = TRUE);
 
--- Upload streamlit/streamlit_app.py to the stage:
+-- Upload streamlit/streamlit_app.py and the shared modules it imports to the stage:
 -- PUT file:///path/to/streamlit/streamlit_app.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/python/identifiers.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/security_index.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/table_cache.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/portfolio_snapshot.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/positions.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/queries.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/trade_blotter.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/formatting.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/quote_service.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/bond_analytics.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/valuation.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/rate_risk.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/settlement_calendar.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/fix_messages.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/matching_engine.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
+-- PUT file:///path/to/streamlit/order_pipeline.py @SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE AUTO_COMPRESS=FALSE OVERWRITE=TRUE;
 
 CREATE OR REPLACE STREAMLIT SECURITY_MASTER_DB.GOLDEN_RECORD.SNOWTRADE_APP
     ROOT_LOCATION = '@SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE'
@@ -148,6 +213,13 @@ CREATE OR REPLACE STREAMLIT SECURITY_MASTER_DB.GOLDEN_RECORD.SNOWTRADE_APP
     QUERY_WAREHOUSE = 'ADHOC_WH'
     TITLE = 'SnowTrade EDM';
 
+-- ============================================
+-- STEP 8: Settlement Projection
+-- ============================================
+-- Execute: sql/setup_settlement_projection.sql (after the STEP 7 uploads)
+-- Creates: SETTLEMENT_CALENDAR, TRADE_SETTLEMENTS and TRADE_DATES tables,
+--          REFRESH_TRADE_SETTLEMENTS procedure and its one-minute task
+
 -- ============================================
 -- INSTALLATION COMPLETE
 -- ============================================
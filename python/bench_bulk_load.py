@@ -0,0 +1,106 @@
+"""
+Benchmark the bulk load strategies against a local stand-in connection
+
+The stand-in counts round trips and sleeps a fixed network latency per
+call, so the numbers show what each strategy costs in round trips and
+client-side work without a live account.
+
+Usage:
+    python bench_bulk_load.py --rows 1000 10000 100000 --latency 0.03
+"""
+
+import argparse
+import io
+import random
+import time
+
+from bulk_load import STRATEGIES, bulk_insert
+
+
+class StandInCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _round_trip(self, rows=0):
+        self.conn.round_trips += 1
+        self.conn.rows_received += rows
+        time.sleep(self.conn.latency)
+
+    def execute(self, sql, params=None):
+        self._round_trip(1 if sql.lstrip().upper().startswith("INSERT") else 0)
+
+    def executemany(self, sql, seq_of_params):
+        self._round_trip(len(seq_of_params))
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    """Minimal connector look-alike: every execute is one simulated round trip."""
+
+    def __init__(self, latency=0.03):
+        self.latency = latency
+        self.round_trips = 0
+        self.rows_received = 0
+
+    def cursor(self):
+        return StandInCursor(self)
+
+
+def stand_in_write_pandas(conn, df, table_name, chunk_size=100_000, **kwargs):
+    """Mirror write_pandas: temp stage, one PUT per serialized chunk, one COPY."""
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE TEMPORARY STAGE {table_name}_STAGE")
+    chunks = 0
+    for i in range(0, len(df), chunk_size):
+        buffer = io.StringIO()
+        df.iloc[i:i + chunk_size].to_csv(buffer, index=False)
+        cursor.execute(f"PUT file://chunk_{chunks}.parquet @{table_name}_STAGE")
+        chunks += 1
+    cursor.execute(f"COPY INTO {table_name}")
+    conn.rows_received += len(df)
+    return True, chunks, len(df), None
+
+
+def legacy_row_by_row(conn, table, columns, rows):
+    cursor = conn.cursor()
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    start = time.perf_counter()
+    for row in rows:
+        cursor.execute(sql, row)
+    return time.perf_counter() - start
+
+
+def make_rows(n):
+    rng = random.Random(7)
+    return [(i, f"SYM{i % 5000}", f"Company {i}", f"BBG{rng.randrange(10**9):09d}") for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load strategy benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--latency", type=float, default=0.03, help="Seconds per simulated round trip")
+    parser.add_argument("--legacy-max", type=int, default=3_000,
+                        help="Skip the row-by-row baseline above this many rows")
+    args = parser.parse_args()
+
+    columns = ("ID", "SYMBOL", "COMPANY_NAME", "ISIN")
+    print(f"Stand-in latency {args.latency * 1000:.0f}ms per round trip")
+    print(f"{'rows':>10}  {'strategy':<14}{'round trips':>12}{'seconds':>10}{'rows/sec':>14}")
+    for n in args.rows:
+        rows = make_rows(n)
+        if n <= args.legacy_max:
+            conn = StandInConnection(args.latency)
+            seconds = legacy_row_by_row(conn, "NYSE_SECURITIES", columns, rows)
+            print(f"{n:>10,}  {'row_by_row':<14}{conn.round_trips:>12,}{seconds:>10.2f}{n / seconds:>14,.0f}")
+        for strategy in STRATEGIES:
+            conn = StandInConnection(args.latency)
+            kwargs = {"write_pandas": stand_in_write_pandas} if strategy == "write_pandas" else {}
+            result = bulk_insert(conn, "NYSE_SECURITIES", columns, rows, strategy=strategy, **kwargs)
+            print(f"{n:>10,}  {strategy:<14}{conn.round_trips:>12,}{result['seconds']:>10.2f}"
+                  f"{result['rows_per_sec']:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Bulk loading for the table builders
+
+Three load paths, picked by row count unless the caller forces one:
+
+    executemany   rows <= EXECUTEMANY_MAX_ROWS
+                  One INSERT with server-side (qmark) array binding per
+                  chunk instead of one round trip per row.
+    write_pandas  rows <= WRITE_PANDAS_MAX_ROWS
+                  DataFrame -> Parquet/Arrow chunks -> temporary stage -> COPY.
+    stage_copy    anything larger
+                  Rows streamed to a gzipped CSV, PUT to the table stage
+                  and loaded with a single COPY INTO.
+
+Server-side binding needs a connection opened with paramstyle='qmark'.
+"""
+
+import csv
+import gzip
+import os
+import tempfile
+import time
+
+EXECUTEMANY_MAX_ROWS = 10_000
+WRITE_PANDAS_MAX_ROWS = 1_000_000
+EXECUTEMANY_CHUNK = 16_384
+
+STRATEGIES = ("executemany", "write_pandas", "stage_copy")
+
+
+def choose_strategy(row_count):
+    if row_count <= EXECUTEMANY_MAX_ROWS:
+        return "executemany"
+    if row_count <= WRITE_PANDAS_MAX_ROWS:
+        return "write_pandas"
+    return "stage_copy"
+
+
+def load_executemany(conn, table, columns, rows):
+    """Array-bound INSERT, chunked to keep each bind payload bounded."""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+    cursor = conn.cursor()
+    try:
+        for i in range(0, len(rows), EXECUTEMANY_CHUNK):
+            cursor.executemany(sql, rows[i:i + EXECUTEMANY_CHUNK])
+    finally:
+        cursor.close()
+    return len(rows)
+
+
+def load_write_pandas(conn, table, columns, rows, write_pandas=None):
+    """DataFrame upload through the connector's Arrow/Parquet path."""
+    import pandas as pd
+    if write_pandas is None:
+        from snowflake.connector.pandas_tools import write_pandas
+    df = pd.DataFrame.from_records(rows, columns=list(columns))
+    success, _, nrows, _ = write_pandas(conn, df, table, quote_identifiers=False)
+    if not success:
+        raise RuntimeError(f"write_pandas failed for {table}")
+    return nrows
+
+
+def load_stage_copy(conn, table, columns, rows):
+    """Gzipped CSV -> PUT to the table stage -> one COPY INTO."""
+    cursor = conn.cursor()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"{table.lower()}_{int(time.time())}.csv.gz")
+        with gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=1) as f:
+            csv.writer(f).writerows(rows)
+        try:
+            cursor.execute(f"PUT 'file://{path}' @%{table} AUTO_COMPRESS=FALSE OVERWRITE=TRUE")
+            cursor.execute(f"""
+                COPY INTO {table} ({', '.join(columns)})
+                FROM @%{table}/{os.path.basename(path)}
+                FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY = '"' COMPRESSION = GZIP)
+                PURGE = TRUE
+            """)
+        finally:
+            cursor.close()
+    return len(rows)
+
+
+LOADERS = {
+    "executemany": load_executemany,
+    "write_pandas": load_write_pandas,
+    "stage_copy": load_stage_copy,
+}
+
+
+def bulk_insert(conn, table, columns, rows, strategy=None, **kwargs):
+    """
+    Load rows (a sequence of tuples in `columns` order) into table.
+
+    Returns {'strategy', 'rows', 'seconds', 'rows_per_sec'}.
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    strategy = strategy or choose_strategy(len(rows))
+    if strategy not in LOADERS:
+        raise ValueError(f"Unknown load strategy '{strategy}', expected one of {STRATEGIES}")
+    start = time.perf_counter()
+    loaded = LOADERS[strategy](conn, table, columns, rows, **kwargs)
+    seconds = time.perf_counter() - start
+    return {
+        'strategy': strategy,
+        'rows': loaded,
+        'seconds': seconds,
+        'rows_per_sec': loaded / seconds if seconds > 0 else float('inf'),
+    }
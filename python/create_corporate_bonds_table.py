@@ -1,7 +1,12 @@
+import argparse
 import os
-import random
-from datetime import datetime, timedelta
-import snowflake.connector
+from collections.abc import Sequence
+from datetime import datetime
+
+import numpy as np
+
+from bulk_load import bulk_insert
+from identifiers import cusip_check_digit, cusip_check_digits, isin_check_digits, isin_from_cusip
 
 TOP_CORPORATE_ISSUERS = [
     ("AAPL", "Apple Inc", "037833"),
@@ -115,82 +120,197 @@ CREDIT_RATINGS = [
 ]
 
 def generate_cusip(base_cusip, issue_num):
-    return f"{base_cusip}{issue_num:02d}0"
+    base = f"{base_cusip}{issue_num:02d}"
+    return base + cusip_check_digit(base)
 
 def generate_isin(cusip):
-    return f"US{cusip}0"
+    return isin_from_cusip(cusip)
 
-def generate_figi():
-    chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
-    return "BBG" + "".join(random.choices(chars, k=9))
+PAR_VALUES = [500, 750, 1000, 1250, 1500, 2000, 2500, 3000]
+MATURITY_YEARS = [3, 5, 7, 10, 20, 30]
+COUPON_FREQUENCIES = ['SEMI-ANNUAL', 'QUARTERLY', 'ANNUAL']
+BOND_TYPES = ['SENIOR UNSECURED', 'SENIOR SECURED', 'SUBORDINATED']
+FIGI_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+ISSUE_CODE_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+MAX_ISSUES_PER_ISSUER = 99 + 26 * 36  # 01-99, then A0-ZZ, per 6-character issuer code
 
-def generate_bonds():
-    bonds = []
-    bond_id = 1
-    
-    for ticker, issuer_name, base_cusip in TOP_CORPORATE_ISSUERS:
-        num_bonds = random.randint(8, 15)
-        
-        if ticker in ["AAPL", "MSFT", "GOOG", "AMZN", "JPM", "BAC"]:
-            rating_idx = random.randint(0, 3)
-        elif ticker in ["META", "NVDA", "GS", "MS", "V", "MA"]:
-            rating_idx = random.randint(2, 6)
-        elif ticker in ["F", "GM", "PCG"]:
-            rating_idx = random.randint(8, 12)
+BOND_COLUMNS = (
+    'bond_id', 'cusip', 'isin', 'figi', 'ticker', 'issuer_name',
+    'issue_date', 'maturity_date', 'coupon_rate', 'coupon_frequency',
+    'current_yield', 'credit_rating', 'par_value', 'currency',
+    'bond_type', 'callable', 'sector',
+)
+
+def issuer_rating_range(ticker):
+    if ticker in ["AAPL", "MSFT", "GOOG", "AMZN", "JPM", "BAC"]:
+        return 0, 3
+    elif ticker in ["META", "NVDA", "GS", "MS", "V", "MA"]:
+        return 2, 6
+    elif ticker in ["F", "GM", "PCG"]:
+        return 8, 12
+    return 4, 9
+
+def _issue_codes(issue_num):
+    """Two-character CUSIP issue numbers as a (n, 2) uint8 matrix: 01-99, then A0-ZZ."""
+    digits = np.frombuffer(FIGI_CHARS[26:].encode(), dtype=np.uint8)
+    alnum = np.frombuffer((FIGI_CHARS[26:] + ISSUE_CODE_LETTERS).encode(), dtype=np.uint8)
+    letters = np.frombuffer(ISSUE_CODE_LETTERS.encode(), dtype=np.uint8)
+    extra = issue_num - 100
+    codes = np.empty((len(issue_num), 2), dtype=np.uint8)
+    decimal = issue_num < 100
+    codes[:, 0] = np.where(decimal, digits[issue_num // 10 % 10], letters[extra // len(alnum)])
+    codes[:, 1] = np.where(decimal, digits[issue_num % 10], alnum[extra % len(alnum)])
+    return codes
+
+def _issuer_codes(bases, blocks):
+    """
+    (issuers, blocks, 6) uint8 matrix of issuer codes: the issuer's own code,
+    then made-up codes sharing its first four characters for issuers whose
+    issue numbers run out. Every code is distinct from the others.
+    """
+    alnum = ISSUE_CODE_LETTERS + FIGI_CHARS[26:]
+    used = set(bases)
+    codes = [[base] for base in bases]
+    for issuer_codes in codes:
+        suffixes = (a + b for a in alnum for b in alnum)
+        while len(issuer_codes) < blocks:
+            code = issuer_codes[0][:4] + next(suffixes)
+            if code not in used:
+                used.add(code)
+                issuer_codes.append(code)
+    return _fixed_width([code for issuer_codes in codes for code in issuer_codes], 6).reshape(len(bases), blocks, 6)
+
+def _fixed_width(strings, width):
+    return np.array(strings, dtype=f"S{width}").view(np.uint8).reshape(-1, width)
+
+def generate_bond_columns(num_bonds=None, seed=None, as_of=None):
+    """
+    Vectorized bond universe as a dict of NumPy columns (same schema as generate_bonds).
+
+    With num_bonds=None each issuer gets 8-15 bonds like the original
+    generator; otherwise num_bonds bonds are spread across the issuers.
+    Dates are datetime64[D], missing yields are NaN.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = np.array([t for t, _, _ in TOP_CORPORATE_ISSUERS])
+    names = np.array([name for _, name, _ in TOP_CORPORATE_ISSUERS])
+    sectors = np.array([get_sector(t) for t in tickers])
+    ranges = np.array([issuer_rating_range(t) for t in tickers])
+    issuer_rating = rng.integers(ranges[:, 0], ranges[:, 1] + 1)
+
+    if num_bonds is None:
+        issuer = np.repeat(np.arange(len(tickers)), rng.integers(8, 16, size=len(tickers)))
+    else:
+        issuer = np.sort(rng.integers(0, len(tickers), size=num_bonds))
+    n = len(issuer)
+    starts = np.flatnonzero(np.r_[True, issuer[1:] != issuer[:-1]])
+    issue_num = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+    # Past MAX_ISSUES_PER_ISSUER bonds an issuer moves on to another issuer code
+    block, issue_num = np.divmod(issue_num, MAX_ISSUES_PER_ISSUER)
+    bases = _issuer_codes([base for _, _, base in TOP_CORPORATE_ISSUERS], int(block.max(initial=0)) + 1)
+
+    cusip = np.empty((n, 9), dtype=np.uint8)
+    cusip[:, :6] = bases[issuer, block]
+    cusip[:, 6:8] = _issue_codes(issue_num + 1)
+    cusip[:, 8] = cusip_check_digits(cusip[:, :8])
+    isin = np.empty((n, 12), dtype=np.uint8)
+    isin[:, :2] = np.frombuffer(b"US", dtype=np.uint8)
+    isin[:, 2:11] = cusip
+    isin[:, 11] = isin_check_digits(isin[:, :11])
+    figi = np.empty((n, 12), dtype=np.uint8)
+    figi[:, :3] = np.frombuffer(b"BBG", dtype=np.uint8)
+    figi[:, 3:] = np.frombuffer(FIGI_CHARS.encode(), dtype=np.uint8)[rng.integers(0, len(FIGI_CHARS), size=(n, 9))]
+
+    issue_year = rng.integers(2015, 2026, size=n)
+    months = (issue_year - 1970) * 12 + rng.integers(0, 12, size=n)
+    issue_date = months.astype('datetime64[M]').astype('datetime64[D]') + rng.integers(0, 28, size=n)
+    maturity_date = issue_date + np.array(MATURITY_YEARS)[rng.integers(0, len(MATURITY_YEARS), size=n)] * 365
+
+    coupon_lo = np.select([issue_year <= 2020, issue_year <= 2022], [1.5, 2.0], 4.0)
+    coupon_hi = np.select([issue_year <= 2020, issue_year <= 2022], [4.5, 4.0], 6.5)
+    rating_idx = issuer_rating[issuer]
+    coupon_rate = np.round(coupon_lo + (coupon_hi - coupon_lo) * rng.random(n) + rating_idx * 0.15, 3)
+
+    today = np.datetime64(as_of or datetime.now().date(), 'D')
+    current_yield = np.where(maturity_date > today,
+                             np.round(coupon_rate + rng.uniform(-0.5, 1.0, size=n), 3), np.nan)
+
+    ratings = np.array([r for r, _ in CREDIT_RATINGS])
+    credit_rating = ratings[np.clip(rating_idx + rng.integers(-1, 2, size=n), 0, len(ratings) - 1)]
+
+    return {
+        'bond_id': np.arange(1, n + 1, dtype=np.int64),
+        'cusip': cusip.view('S9').ravel().astype('U9'),
+        'isin': isin.view('S12').ravel().astype('U12'),
+        'figi': figi.view('S12').ravel().astype('U12'),
+        'ticker': tickers[issuer],
+        'issuer_name': names[issuer],
+        'issue_date': issue_date,
+        'maturity_date': maturity_date,
+        'coupon_rate': coupon_rate,
+        'coupon_frequency': np.array(COUPON_FREQUENCIES)[rng.integers(0, len(COUPON_FREQUENCIES), size=n)],
+        'current_yield': current_yield,
+        'credit_rating': credit_rating,
+        'par_value': np.array(PAR_VALUES, dtype=np.int64)[rng.integers(0, len(PAR_VALUES), size=n)] * 1_000_000,
+        'currency': np.full(n, 'USD'),
+        'bond_type': np.array(BOND_TYPES)[rng.integers(0, len(BOND_TYPES), size=n)],
+        'callable': rng.random(n) < 0.5,
+        'sector': sectors[issuer],
+    }
+
+def take(columns, index):
+    return {name: col[index] for name, col in columns.items()}
+
+def top_k_by_par(columns, k):
+    """Largest k bonds by par value (ties by bond_id) via argpartition, not a full sort."""
+    par = columns['par_value']
+    if k < len(par):
+        index = np.argpartition(-par, k - 1)[:k]
+    else:
+        index = np.arange(len(par))
+    index = index[np.lexsort((columns['bond_id'][index], -par[index]))]
+    return take(columns, index)
+
+def _python_value(name, value):
+    if name in ('issue_date', 'maturity_date'):
+        return str(value)
+    if name == 'current_yield' and np.isnan(value):
+        return None
+    return value.item()
+
+def to_rows(columns, names=BOND_COLUMNS):
+    """Row tuples in `names` order with native Python values, for bulk loading."""
+    converted = []
+    for name in names:
+        col = columns[name]
+        if col.dtype.kind == 'M':
+            converted.append(np.datetime_as_string(col, unit='D').tolist())
+        elif col.dtype.kind == 'f':
+            converted.append([None if v != v else v for v in col.tolist()])
         else:
-            rating_idx = random.randint(4, 9)
-        
-        for i in range(num_bonds):
-            cusip = generate_cusip(base_cusip, i + 1)
-            isin = generate_isin(cusip)
-            figi = generate_figi()
-            
-            issue_year = random.randint(2015, 2025)
-            maturity_years = random.choice([3, 5, 7, 10, 20, 30])
-            issue_date = datetime(issue_year, random.randint(1, 12), random.randint(1, 28))
-            maturity_date = issue_date + timedelta(days=maturity_years * 365)
-            
-            if issue_year <= 2020:
-                base_coupon = random.uniform(1.5, 4.5)
-            elif issue_year <= 2022:
-                base_coupon = random.uniform(2.0, 4.0)
-            else:
-                base_coupon = random.uniform(4.0, 6.5)
-            
-            coupon_rate = round(base_coupon + rating_idx * 0.15, 3)
-            
-            if maturity_date > datetime.now():
-                yield_adjustment = random.uniform(-0.5, 1.0)
-                current_yield = round(coupon_rate + yield_adjustment, 3)
-            else:
-                current_yield = None
-            
-            rating, _ = CREDIT_RATINGS[min(rating_idx + random.randint(-1, 1), len(CREDIT_RATINGS) - 1)]
-            
-            par_value = random.choice([500, 750, 1000, 1250, 1500, 2000, 2500, 3000]) * 1000000
-            
-            bonds.append({
-                'bond_id': bond_id,
-                'cusip': cusip,
-                'isin': isin,
-                'figi': figi,
-                'ticker': ticker,
-                'issuer_name': issuer_name,
-                'issue_date': issue_date.strftime('%Y-%m-%d'),
-                'maturity_date': maturity_date.strftime('%Y-%m-%d'),
-                'coupon_rate': coupon_rate,
-                'coupon_frequency': random.choice(['SEMI-ANNUAL', 'QUARTERLY', 'ANNUAL']),
-                'current_yield': current_yield,
-                'credit_rating': rating,
-                'par_value': par_value,
-                'currency': 'USD',
-                'bond_type': random.choice(['SENIOR UNSECURED', 'SENIOR SECURED', 'SUBORDINATED']),
-                'callable': random.choice([True, False]),
-                'sector': get_sector(ticker),
-            })
-            bond_id += 1
-    
-    return bonds
+            converted.append(col.tolist())
+    return list(zip(*converted))
+
+def to_arrow(columns):
+    import pyarrow as pa
+    return pa.table({name: pa.array(col, from_pandas=True) for name, col in columns.items()})
+
+class BondView(Sequence):
+    """Read-only list-of-dicts view over the columnar bond universe."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns['bond_id'])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return BondView(take(self.columns, np.arange(len(self))[i]))
+        return {name: _python_value(name, col[i]) for name, col in self.columns.items()}
+
+def generate_bonds(num_bonds=None, seed=None):
+    return BondView(generate_bond_columns(num_bonds, seed))
 
 def get_sector(ticker):
     sectors = {
@@ -225,16 +345,16 @@ def get_sector(ticker):
     }
     return sectors.get(ticker, 'Other')
 
-def main():
+def main(num_bonds=None, top=1000, seed=None):
     print("Generating corporate bond data...")
-    bonds = generate_bonds()
-    print(f"Generated {len(bonds)} bonds")
+    bonds = generate_bond_columns(num_bonds, seed)
+    print(f"Generated {len(bonds['bond_id'])} bonds")
     
-    bonds.sort(key=lambda x: x['par_value'], reverse=True)
-    top_1000 = bonds[:1000]
+    top_bonds = top_k_by_par(bonds, top)
     
     print("\nConnecting to Snowflake...")
-    conn = snowflake.connector.connect(connection_name=os.getenv("SNOWFLAKE_CONNECTION_NAME") or "colms_uswest")
+    import snowflake.connector
+    conn = snowflake.connector.connect(connection_name=os.getenv("SNOWFLAKE_CONNECTION_NAME") or "colms_uswest", paramstyle="qmark")
     cursor = conn.cursor()
     
     cursor.execute("USE DATABASE SECURITIES_MASTER")
@@ -266,35 +386,9 @@ def main():
     
     print("Inserting bond data into Snowflake...")
     
-    insert_sql = """
-        INSERT INTO CORPORATE_BONDS (
-            BOND_ID, CUSIP, ISIN, FIGI, TICKER, ISSUER_NAME, 
-            ISSUE_DATE, MATURITY_DATE, COUPON_RATE, COUPON_FREQUENCY,
-            CURRENT_YIELD, CREDIT_RATING, PAR_VALUE, CURRENCY,
-            BOND_TYPE, CALLABLE, SECTOR
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    
-    for bond in top_1000:
-        cursor.execute(insert_sql, (
-            bond['bond_id'],
-            bond['cusip'],
-            bond['isin'],
-            bond['figi'],
-            bond['ticker'],
-            bond['issuer_name'],
-            bond['issue_date'],
-            bond['maturity_date'],
-            bond['coupon_rate'],
-            bond['coupon_frequency'],
-            bond['current_yield'],
-            bond['credit_rating'],
-            bond['par_value'],
-            bond['currency'],
-            bond['bond_type'],
-            bond['callable'],
-            bond['sector'],
-        ))
+    columns = tuple(c.upper() for c in BOND_COLUMNS)
+    load = bulk_insert(conn, "CORPORATE_BONDS", columns, to_rows(top_bonds))
+    print(f"Loaded {load['rows']} rows via {load['strategy']} in {load['seconds']:.2f}s")
     
     cursor.execute("SELECT COUNT(*) FROM CORPORATE_BONDS")
     count = cursor.fetchone()[0]
@@ -335,4 +429,9 @@ def main():
     print("\nDone!")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate and load the CORPORATE_BONDS table")
+    parser.add_argument("--bonds", type=int, default=None, help="Universe size (default: 8-15 per issuer)")
+    parser.add_argument("--top", type=int, default=1000, help="Load the top N bonds by par value")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    main(args.bonds, args.top, args.seed)
@@ -1,12 +1,10 @@
 import csv
 import json
-import time
-import requests
 import os
-import snowflake.connector
 
-OPENFIGI_URL = "https://api.openfigi.com/v3/mapping"
-BATCH_SIZE = 10
+from bulk_load import bulk_insert
+from figi_cache import open_cache
+from openfigi_resolver import DEFAULT_WORKERS, resolve_tickers
 
 def load_tickers(csv_path):
     tickers = []
@@ -19,54 +17,20 @@ def load_tickers(csv_path):
                 tickers.append({'symbol': symbol, 'name': name})
     return tickers
 
-def lookup_isins_batch(tickers):
-    jobs = [{"idType": "TICKER", "idValue": t['symbol'], "exchCode": "US"} for t in tickers]
-    
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(OPENFIGI_URL, headers=headers, json=jobs)
-    
-    if response.status_code == 200:
-        return response.json()
-    elif response.status_code == 429:
-        print("Rate limited, waiting 60 seconds...")
-        time.sleep(60)
-        return lookup_isins_batch(tickers)
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-        return [{"error": "API error"}] * len(tickers)
-
 def main():
     print("Loading tickers from CSV...")
     tickers = load_tickers('nyse_listed.csv')
     print(f"Loaded {len(tickers)} tickers (excluding preferred shares and special classes)")
     
-    results = []
+    cache = open_cache()
+    if len(cache) == 0 and os.path.exists('nyse_with_isins.json'):
+        print(f"Seeded resolution cache with {cache.seed_from_json('nyse_with_isins.json')} entries from nyse_with_isins.json")
+    added, removed = cache.diff_listing(tickers)
+    print(f"Listing changes since last run: {len(added)} added, {len(removed)} removed")
     
     print("Looking up ISINs via OpenFIGI API...")
-    for i in range(0, len(tickers), BATCH_SIZE):
-        batch = tickers[i:i+BATCH_SIZE]
-        print(f"Processing batch {i//BATCH_SIZE + 1}/{(len(tickers) + BATCH_SIZE - 1)//BATCH_SIZE}...")
-        
-        figi_results = lookup_isins_batch(batch)
-        
-        for j, (ticker, figi_result) in enumerate(zip(batch, figi_results)):
-            isin = None
-            if isinstance(figi_result, dict) and 'data' in figi_result:
-                for item in figi_result['data']:
-                    if item.get('shareClassFIGI'):
-                        isin = item.get('shareClassFIGI')[:12] if item.get('shareClassFIGI') else None
-                    if 'compositeFIGI' in item:
-                        for d in figi_result.get('data', []):
-                            if d.get('securityType') == 'Common Stock':
-                                isin = d.get('shareClassFIGI', '')[:12] if d.get('shareClassFIGI') else None
-            
-            results.append({
-                'symbol': ticker['symbol'],
-                'name': ticker['name'],
-                'isin': isin
-            })
-        
-        time.sleep(0.5)
+    results = resolve_tickers(tickers, max_workers=int(os.getenv("OPENFIGI_WORKERS", DEFAULT_WORKERS)), cache=cache)
+    cache.close()
     
     with open('nyse_with_isins.json', 'w') as f:
         json.dump(results, f, indent=2)
@@ -75,7 +39,8 @@ def main():
     print(f"Found ISINs for {sum(1 for r in results if r['isin'])} securities")
     
     print("\nConnecting to Snowflake...")
-    conn = snowflake.connector.connect(connection_name=os.getenv("SNOWFLAKE_CONNECTION_NAME") or "colms_uswest")
+    import snowflake.connector
+    conn = snowflake.connector.connect(connection_name=os.getenv("SNOWFLAKE_CONNECTION_NAME") or "colms_uswest", paramstyle="qmark")
     
     cursor = conn.cursor()
     
@@ -95,10 +60,9 @@ def main():
     """)
     
     print("Inserting data into Snowflake...")
-    insert_sql = "INSERT INTO NYSE_SECURITIES (SYMBOL, COMPANY_NAME, ISIN) VALUES (%s, %s, %s)"
-    
-    for r in results:
-        cursor.execute(insert_sql, (r['symbol'], r['name'], r['isin']))
+    load = bulk_insert(conn, "NYSE_SECURITIES", ("SYMBOL", "COMPANY_NAME", "ISIN"),
+                       [(r['symbol'], r['name'], r['isin']) for r in results])
+    print(f"Loaded {load['rows']} rows via {load['strategy']} in {load['seconds']:.2f}s")
     
     cursor.execute("SELECT COUNT(*) FROM NYSE_SECURITIES")
     count = cursor.fetchone()[0]
@@ -0,0 +1,98 @@
+"""
+Local stand-in for SnowflakeStreamingIngestClient
+
+Mimics the parts of the Ingest SDK the ingest scripts use: open_channel,
+insert_row/insert_rows with offset tokens, get_latest_committed_offset_token
+and close. Each insert costs a fixed round-trip latency plus a small
+per-row cost (both spent sleeping, like network I/O), and rows become
+"committed" a short delay after they are accepted, the way buffered
+channel data is flushed by the real client.
+
+Committed rows are kept in memory per table, so benchmarks and restart
+tests can check exactly what landed.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+
+class FakeChannel:
+    def __init__(self, client, name, table_key):
+        self.client = client
+        self.name = name
+        self.table_key = table_key
+        self.lock = threading.Lock()
+        self.pending = []  # (ready_at, offset_token, rows)
+        self.committed_token = client.committed_tokens.get((table_key, name))
+        self.closed = False
+
+    def _send(self, rows, offset_token):
+        if self.closed:
+            raise RuntimeError(f"Channel {self.name} is closed")
+        time.sleep(self.client.latency + self.client.per_row_cost * len(rows))
+        with self.lock:
+            self.pending.append((time.monotonic() + self.client.commit_delay, offset_token, rows))
+        self.client.insert_calls += 1
+
+    def insert_row(self, row, offset_token=None):
+        self._send([row], offset_token)
+
+    def insert_rows(self, rows, offset_token=None):
+        self._send(list(rows), offset_token)
+
+    def _flush(self, force=False):
+        now = time.monotonic()
+        with self.lock:
+            while self.pending and (force or self.pending[0][0] <= now):
+                _, token, rows = self.pending.pop(0)
+                self.client._commit(self.table_key, self.name, rows, token)
+                if token is not None:
+                    self.committed_token = token
+
+    def get_latest_committed_offset_token(self):
+        self._flush()
+        return self.committed_token
+
+    def close(self):
+        self._flush(force=True)
+        self.closed = True
+
+
+class FakeStreamingIngestClient:
+    """
+    In-process client with the same constructor shape as the SDK client.
+
+    Args:
+        latency: Seconds per insert call (round trip)
+        per_row_cost: Extra seconds per row in a call
+        commit_delay: Seconds between a row being accepted and committed
+    """
+
+    def __init__(self, account=None, user=None, private_key=None, role=None,
+                 latency=0.005, per_row_cost=2e-6, commit_delay=0.05):
+        self.latency = latency
+        self.per_row_cost = per_row_cost
+        self.commit_delay = commit_delay
+        self.lock = threading.Lock()
+        self.tables = defaultdict(list)
+        self.committed_tokens = {}
+        self.insert_calls = 0
+
+    def open_channel(self, name, database_name, schema_name, table_name):
+        return FakeChannel(self, name, f"{database_name}.{schema_name}.{table_name}")
+
+    def _commit(self, table_key, channel_name, rows, token):
+        with self.lock:
+            self.tables[table_key].extend(rows)
+            if token is not None:
+                self.committed_tokens[(table_key, channel_name)] = token
+
+    def row_count(self, table_key=None):
+        with self.lock:
+            if table_key:
+                return len(self.tables[table_key])
+            return sum(len(rows) for rows in self.tables.values())
+
+    def close(self):
+        pass
@@ -0,0 +1,166 @@
+"""
+Persistent FIGI/ISIN resolution cache
+
+SQLite-backed cache of OpenFIGI mapping results keyed by
+(idType, idValue, exchCode). Entries carry their own expiry so only new
+or expired symbols go over the wire; "no match" answers are cached too
+(negative caching) with a shorter TTL. Expiry times are spread across
+the second half of the TTL window so a daily refresh touches a small,
+steady slice of the listing instead of all of it on the same day.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = "figi_cache.sqlite"
+DEFAULT_TTL_DAYS = 30
+DEFAULT_NEGATIVE_TTL_DAYS = 7
+LOOKUP_CHUNK = 300  # keys per query, keeps bind count under SQLite's limit
+TTL_JITTER = 0.5    # entries expire uniformly in [ttl * (1 - jitter), ttl]
+
+DAY = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS figi_cache (
+    id_type    TEXT NOT NULL,
+    id_value   TEXT NOT NULL,
+    exch_code  TEXT NOT NULL,
+    isin       TEXT,
+    payload    TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (id_type, id_value, exch_code)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS listing (
+    symbol     TEXT PRIMARY KEY,
+    name       TEXT,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def cache_key(job):
+    return (job["idType"], job["idValue"], job.get("exchCode") or "")
+
+
+def _jitter(key):
+    digest = hashlib.blake2b("|".join(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+def is_negative(result):
+    """True when OpenFIGI answered but found no identifier."""
+    return isinstance(result, dict) and "warning" in result and "data" not in result
+
+
+def is_cacheable(result):
+    return isinstance(result, dict) and ("data" in result or is_negative(result))
+
+
+class FigiCache:
+    """
+    On-disk mapping cache.
+
+    Args:
+        path: SQLite database file
+        ttl_days: Lifetime of a successful mapping
+        negative_ttl_days: Lifetime of a "no identifier found" answer
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_days=DEFAULT_TTL_DAYS,
+                 negative_ttl_days=DEFAULT_NEGATIVE_TTL_DAYS):
+        self.path = path
+        self.ttl = ttl_days * DAY
+        self.negative_ttl = negative_ttl_days * DAY
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM figi_cache").fetchone()[0]
+
+    def _expiry(self, key, negative, now):
+        ttl = self.negative_ttl if negative else self.ttl
+        return now + ttl * (1 - TTL_JITTER * _jitter(key))
+
+    def get_many(self, keys, now=None):
+        """Return {key: (isin, payload)} for every unexpired entry among keys."""
+        now = now or time.time()
+        keys = list(keys)
+        hits = {}
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[i:i + LOOKUP_CHUNK]
+            values = ", ".join(["(?, ?, ?)"] * len(chunk))
+            rows = self.conn.execute(
+                "SELECT id_type, id_value, exch_code, isin, payload FROM figi_cache "
+                f"WHERE (id_type, id_value, exch_code) IN (VALUES {values}) AND expires_at > ?",
+                [part for key in chunk for part in key] + [now],
+            )
+            for id_type, id_value, exch_code, isin, payload in rows:
+                hits[(id_type, id_value, exch_code)] = (isin, json.loads(payload) if payload else None)
+        return hits
+
+    def put_many(self, entries, now=None):
+        """Store [(key, isin, payload)]; payloads that are errors are skipped."""
+        now = now or time.time()
+        rows = []
+        for key, isin, payload in entries:
+            if payload is not None and not is_cacheable(payload):
+                continue
+            negative = isin is None
+            rows.append((*key, isin, json.dumps(payload) if payload is not None else None,
+                         now, self._expiry(key, negative, now)))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO figi_cache "
+                "(id_type, id_value, exch_code, isin, payload, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def purge_expired(self, now=None):
+        with self.conn:
+            return self.conn.execute(
+                "DELETE FROM figi_cache WHERE expires_at <= ?", (now or time.time(),)
+            ).rowcount
+
+    def seed_from_json(self, json_path, exch_code="US", now=None):
+        """Warm an empty cache from a previous nyse_with_isins.json export."""
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        return self.put_many(
+            [(("TICKER", r["symbol"], exch_code), r.get("isin"), None) for r in records],
+            now=now,
+        )
+
+    def diff_listing(self, tickers, now=None):
+        """
+        Record the current listing and return (added, removed) symbols
+        relative to the listing seen on the previous run.
+        """
+        now = now or time.time()
+        previous = {row[0] for row in self.conn.execute("SELECT symbol FROM listing")}
+        current = {t["symbol"] for t in tickers}
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO listing (symbol, name, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(symbol) DO UPDATE SET name = excluded.name, last_seen = excluded.last_seen",
+                [(t["symbol"], t.get("name"), now, now) for t in tickers],
+            )
+            removed = previous - current
+            self.conn.executemany("DELETE FROM listing WHERE symbol = ?", [(s,) for s in removed])
+        added = current - previous if previous else set()
+        return sorted(added), sorted(removed)
+
+
+def open_cache(path=None):
+    return FigiCache(path or os.getenv("FIGI_CACHE_PATH") or DEFAULT_CACHE_PATH)
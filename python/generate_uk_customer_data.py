@@ -1,13 +1,25 @@
 """
 Generate realistic UK customer web analytics data as JSON files
 for Snowpipe Streaming ingestion
+
+generate_batch / save_json_files build a few hundred readable events.
+generate_columns / generate_files produce the same distributions as
+columnar NumPy batches and write compact NDJSON, gzipped NDJSON or
+Parquet from several worker processes, for load tests with tens of
+millions of events.
 """
 
+import argparse
+import gzip
 import json
 import random
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
 import os
 
+import numpy as np
+
 # UK-specific data for realistic generation
 UK_CITIES_IPS = {
     "London": ["185.86.", "194.168.", "212.58.", "31.52."],
@@ -140,6 +152,211 @@ def generate_batch(batch_size=100, days_back=30):
     return events
 
 
+# ============================================
+# VECTORIZED GENERATOR
+# ============================================
+
+SEARCH_ENGINE_IDS = np.array(list(SEARCH_ENGINES.keys()))
+SEARCH_ENGINE_WEIGHTS = np.array([50, 20, 10, 10, 5, 5]) / 100
+SEARCH_PHRASE_RATE = 0.7   # random.random() > 0.3
+REFRESH_RATE = 0.15        # weights [85, 15]
+DONTCOUNT_RATE = 0.05      # weights [95, 5]
+CHUNK_RECORDS = 250_000    # rows generated and written per step inside a worker
+GZIP_LEVEL = 3
+
+# Every prefix with its city's pick probability split evenly across the city's prefixes
+_IP_PREFIXES = [p for prefixes in UK_CITIES_IPS.values() for p in prefixes]
+_IP_PREFIX_WEIGHTS = np.array([1 / len(UK_CITIES_IPS) / len(prefixes)
+                               for prefixes in UK_CITIES_IPS.values() for _ in prefixes])
+
+FORMATS = {
+    "ndjson": ".ndjson",
+    "ndjson.gz": ".ndjson.gz",
+    "parquet": ".parquet",
+}
+
+
+def generate_columns(n, rng, days_back=30, base_date=None):
+    """
+    Generate n events as columns
+    
+    Strings are returned as (codes, categories) pairs so writers can
+    dictionary-encode them; numbers are plain arrays.
+    """
+    base = np.datetime64(base_date or date.today(), "D")
+    phrase_codes = rng.integers(0, len(UK_SEARCH_PHRASES), n) + 1
+    phrase_codes[rng.random(n) >= SEARCH_PHRASE_RATE] = 0
+    return {
+        "EVENTDATE": base - rng.integers(0, days_back + 1, n).astype("timedelta64[D]"),
+        "COUNTERID": rng.integers(100000, 1000000, n),
+        "CLIENTIP": (
+            rng.choice(len(_IP_PREFIXES), n, p=_IP_PREFIX_WEIGHTS),
+            rng.integers(1, 255, n),
+            rng.integers(1, 255, n),
+        ),
+        "SEARCHENGINEID": rng.choice(SEARCH_ENGINE_IDS, n, p=SEARCH_ENGINE_WEIGHTS),
+        "SEARCHPHRASE": (phrase_codes, [""] + UK_SEARCH_PHRASES),
+        "RESOLUTIONWIDTH": np.array(RESOLUTIONS)[rng.integers(0, len(RESOLUTIONS), n)],
+        "TITLE": (rng.integers(0, len(UK_PAGE_TITLES), n), UK_PAGE_TITLES),
+        "ISREFRESH": (rng.random(n) < REFRESH_RATE).astype(np.int8),
+        "DONTCOUNTHITS": (rng.random(n) < DONTCOUNT_RATE).astype(np.int8),
+    }
+
+
+def _fragments(strings):
+    """Byte strings as a zero-padded (len, width) uint8 lookup table"""
+    encoded = [v.encode() for v in strings]
+    table = np.zeros((len(encoded), max(map(len, encoded))), dtype=np.uint8)
+    for i, v in enumerate(encoded):
+        table[i, :len(v)] = np.frombuffer(v, dtype=np.uint8)
+    return table
+
+
+_PREFIX_TABLE = _fragments(_IP_PREFIXES)
+_OCTET_TABLE = _fragments([""] + [str(i) for i in range(1, 255)])
+_OCTET_DOT_TABLE = _fragments([""] + [f"{i}." for i in range(1, 255)])
+
+
+def _pack(parts):
+    """
+    Concatenate per-row fragments without a Python loop
+    
+    Every part is an (n, w) uint8 matrix (or a literal) padded with zero
+    bytes; the row-major concatenation with the padding dropped is the
+    packed text. Returns (bytes, per-row lengths).
+    """
+    n = next(len(p) for p in parts if not isinstance(p, bytes))
+    matrix = np.concatenate([
+        np.broadcast_to(np.frombuffer(p, dtype=np.uint8), (n, len(p))) if isinstance(p, bytes) else p
+        for p in parts
+    ], axis=1)
+    keep = matrix != 0
+    return matrix[keep].tobytes(), keep.sum(axis=1)
+
+
+def _digits(values, width):
+    """Fixed-width non-negative integers as an (n, width) ASCII matrix"""
+    powers = 10 ** np.arange(width - 1, -1, -1)
+    return (values[:, None] // powers % 10 + ord("0")).astype(np.uint8)
+
+
+def _client_ip_parts(columns):
+    prefix, third, fourth = columns["CLIENTIP"]
+    return [_PREFIX_TABLE[prefix], _OCTET_DOT_TABLE[third], _OCTET_TABLE[fourth]]
+
+
+def _categorical(values):
+    categories, codes = np.unique(values, return_inverse=True)
+    return codes, categories
+
+
+def to_ndjson(columns):
+    """Columns -> compact NDJSON bytes, one event per line, in the record field order"""
+    date_codes, dates = _categorical(columns["EVENTDATE"])
+    date_table = _fragments(np.datetime_as_string(dates, unit="D").tolist())
+    resolution_codes, resolutions = _categorical(columns["RESOLUTIONWIDTH"])
+    engine_codes, engines = _categorical(columns["SEARCHENGINEID"])
+    phrase_codes, phrases = columns["SEARCHPHRASE"]
+    title_codes, titles = columns["TITLE"]
+    data, _ = _pack([
+        b'{"EVENTDATE":"', date_table[date_codes],
+        b'","COUNTERID":', _digits(columns["COUNTERID"], 6),
+        b',"CLIENTIP":"', *_client_ip_parts(columns),
+        b'","SEARCHENGINEID":', _fragments([str(v) for v in engines])[engine_codes],
+        b',"SEARCHPHRASE":', _fragments([json.dumps(v) for v in phrases])[phrase_codes],
+        b',"RESOLUTIONWIDTH":', _fragments([str(v) for v in resolutions])[resolution_codes],
+        b',"TITLE":', _fragments([json.dumps(v) for v in titles])[title_codes],
+        b',"ISREFRESH":', (columns["ISREFRESH"] + ord("0")).astype(np.uint8)[:, None],
+        b',"DONTCOUNTHITS":', (columns["DONTCOUNTHITS"] + ord("0")).astype(np.uint8)[:, None],
+        b'}\n',
+    ])
+    return data
+
+
+def to_arrow(columns):
+    """Columns -> pyarrow Table with dictionary-encoded strings"""
+    import pyarrow as pa
+    
+    def dictionary(codes, categories):
+        return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(categories))
+    
+    data, lengths = _pack(_client_ip_parts(columns))
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+    client_ips = pa.StringArray.from_buffers(len(lengths), pa.py_buffer(offsets), pa.py_buffer(data))
+    return pa.table({
+        "EVENTDATE": pa.array(columns["EVENTDATE"], pa.date32()),
+        "COUNTERID": columns["COUNTERID"],
+        "CLIENTIP": client_ips,
+        "SEARCHENGINEID": columns["SEARCHENGINEID"],
+        "SEARCHPHRASE": dictionary(*columns["SEARCHPHRASE"]),
+        "RESOLUTIONWIDTH": columns["RESOLUTIONWIDTH"],
+        "TITLE": dictionary(*columns["TITLE"]),
+        "ISREFRESH": columns["ISREFRESH"],
+        "DONTCOUNTHITS": columns["DONTCOUNTHITS"],
+    })
+
+
+def _write_file(task):
+    """Worker: generate one file in CHUNK_RECORDS steps; returns (path, records, bytes)"""
+    path, records, seed, fmt, days_back, base_date = task
+    rng = np.random.default_rng(seed)
+    tmp = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+    chunks = [min(CHUNK_RECORDS, records - i) for i in range(0, records, CHUNK_RECORDS)]
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = None
+        for n in chunks:
+            table = to_arrow(generate_columns(n, rng, days_back, base_date))
+            writer = writer or pq.ParquetWriter(tmp, table.schema, compression="zstd")
+            writer.write_table(table)
+        if writer:
+            writer.close()
+    else:
+        opener = gzip.open if fmt == "ndjson.gz" else open
+        kwargs = {"compresslevel": GZIP_LEVEL} if fmt == "ndjson.gz" else {}
+        with opener(tmp, "wb", **kwargs) as f:
+            for n in chunks:
+                f.write(to_ndjson(generate_columns(n, rng, days_back, base_date)))
+    # Rename into place so directory watchers only ever see complete files
+    os.replace(tmp, path)
+    return path, records, os.path.getsize(path)
+
+
+def generate_files(output_dir="json_data", total_records=10_000_000, records_per_file=1_000_000,
+                   fmt="ndjson", workers=None, seed=None, days_back=30, base_date=None):
+    """
+    Write total_records events across files using worker processes
+    
+    Args:
+        output_dir: Destination directory
+        total_records: Events to generate in total
+        records_per_file: Events per output file
+        fmt: "ndjson", "ndjson.gz" or "parquet" (needs pyarrow)
+        workers: Worker processes (defaults to CPU count)
+        seed: Seed for reproducible output; each file gets its own child
+            SeedSequence, so output does not depend on the worker count
+        base_date: Latest EVENTDATE (defaults to today)
+    
+    Returns:
+        List of (path, records, bytes)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {list(FORMATS)}")
+    if fmt == "parquet":
+        import pyarrow  # noqa: F401 - fail before spawning workers
+    os.makedirs(output_dir, exist_ok=True)
+    num_files = max(1, -(-total_records // records_per_file))
+    seeds = np.random.SeedSequence(seed).spawn(num_files)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    tasks = [
+        (os.path.join(output_dir, f"uk_customers_{stamp}_{i + 1:04d}{FORMATS[fmt]}"),
+         min(records_per_file, total_records - i * records_per_file), seeds[i], fmt, days_back, base_date)
+        for i in range(num_files)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_write_file, tasks))
+
+
 def save_json_files(output_dir="json_data", num_files=5, records_per_file=100):
     """Generate and save JSON files"""
     os.makedirs(output_dir, exist_ok=True)
@@ -158,19 +375,47 @@ def save_json_files(output_dir="json_data", num_files=5, records_per_file=100):
     return files_created
 
 
-if __name__ == "__main__":
-    print("Generating UK Customer Data JSON Files...")
-    print("=" * 50)
+def main():
+    parser = argparse.ArgumentParser(description="Generate UK customer web analytics events")
+    parser.add_argument("--records", type=int, default=None,
+                        help="Use the vectorized generator for this many events")
+    parser.add_argument("--records-per-file", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--base-date", type=date.fromisoformat, default=None,
+                        help="Latest EVENTDATE, YYYY-MM-DD (defaults to today)")
+    parser.add_argument("--output-dir", default="json_data")
+    args = parser.parse_args()
     
-    # Generate 5 files with 100 records each (500 total)
-    files = save_json_files(
-        output_dir="json_data",
-        num_files=5,
-        records_per_file=100
-    )
+    if args.records is None:
+        print("Generating UK Customer Data JSON Files...")
+        print("=" * 50)
     
-    print("=" * 50)
-    print(f"Generated {len(files)} JSON files")
-    print("\nSample record:")
-    sample = generate_customer_event(datetime.now())
-    print(json.dumps(sample, indent=2))
+        # Generate 5 files with 100 records each (500 total)
+        files = save_json_files(
+            output_dir=args.output_dir,
+            num_files=5,
+            records_per_file=100
+        )
+    
+        print("=" * 50)
+        print(f"Generated {len(files)} JSON files")
+        print("\nSample record:")
+        sample = generate_customer_event(datetime.now())
+        print(json.dumps(sample, indent=2))
+        return
+    
+    start = time.perf_counter()
+    files = generate_files(args.output_dir, args.records, args.records_per_file, args.format,
+                           args.workers, args.seed, base_date=args.base_date)
+    elapsed = time.perf_counter() - start
+    total_bytes = sum(f[2] for f in files)
+    for path, records, size in files:
+        print(f"Created: {path} ({records:,} records, {size / 1e6:,.1f} MB)")
+    print(f"Generated {args.records:,} events in {len(files)} files, {total_bytes / 1e6:,.1f} MB "
+          f"in {elapsed:.2f}s ({args.records / elapsed:,.0f} events/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Security identifier check digits: CUSIP, ISIN and SEDOL
+
+Scalar helpers compute and validate single identifiers. The batch
+validators work on whole arrays at once: identifiers are packed into a
+fixed-width uint8 matrix and the check-digit arithmetic runs column by
+column in NumPy, so validating millions of identifiers takes well under
+a second.
+
+    CUSIP  8 chars + modulus-10 "double-add-double" check digit
+    ISIN   2-letter country + 9-char NSIN + Luhn check digit over the
+           letters-expanded-to-digits string
+    SEDOL  6 chars (no vowels) + weighted (1,3,1,7,3,9) modulus-10 check digit
+"""
+
+import numpy as np
+
+CUSIP_LENGTH = 9
+ISIN_LENGTH = 12
+SEDOL_LENGTH = 7
+SEDOL_WEIGHTS = np.array([1, 3, 1, 7, 3, 9], dtype=np.int16)
+
+
+def _lookup_table(extra=None, exclude=""):
+    """ASCII -> character value (0-9 digits, 10-35 letters), -1 for invalid characters."""
+    table = np.full(256, -1, dtype=np.int16)
+    for i, c in enumerate("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"):
+        if c not in exclude:
+            table[ord(c)] = i
+    for c, v in (extra or {}).items():
+        table[ord(c)] = v
+    return table
+
+
+CUSIP_VALUES = _lookup_table({"*": 36, "@": 37, "#": 38})
+ISIN_VALUES = _lookup_table()
+SEDOL_VALUES = _lookup_table(exclude="AEIOU")
+
+
+def _as_matrix(values, width):
+    """
+    Pack identifiers into an (n, width) uint8 matrix.
+
+    Returns (matrix, length_ok) where length_ok flags entries that are
+    exactly `width` ASCII characters long.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind == "S":
+        packed = values
+    else:
+        try:
+            packed = np.array(values, dtype="S")
+        except UnicodeEncodeError:
+            packed = np.array([str(v).encode("ascii", "replace") for v in values], dtype="S")
+    n = len(packed)
+    size = max(packed.dtype.itemsize, 1)
+    raw = packed.view(np.uint8).reshape(n, size) if n else np.zeros((0, size), dtype=np.uint8)
+    matrix = np.zeros((n, max(width, size)), dtype=np.uint8)
+    matrix[:, :size] = raw
+    length_ok = (matrix[:, :width] != 0).all(axis=1) & (matrix[:, width:] == 0).all(axis=1)
+    return matrix[:, :width], length_ok
+
+
+def _digit_sum(x):
+    return x // 10 + x % 10
+
+
+def cusip_check_digits(matrix):
+    """Check digits (as ASCII codes) for an (n, 8) uint8 matrix of CUSIP bases."""
+    values = CUSIP_VALUES[matrix]
+    values[:, 1::2] *= 2
+    total = _digit_sum(values).sum(axis=1)
+    return ((10 - total % 10) % 10 + ord("0")).astype(np.uint8)
+
+
+def _luhn_tables():
+    """
+    Per-character Luhn contribution for both doubling phases, plus the
+    number of decimal digits each character expands to (letters are 10-35).
+    """
+    contribution = np.zeros((2, 36), dtype=np.uint8)
+    width = np.zeros(36, dtype=np.uint8)
+    for v in range(36):
+        digits = [int(d) for d in str(v)]
+        width[v] = len(digits)
+        for phase in (0, 1):
+            double = bool(phase)
+            for d in reversed(digits):
+                contribution[phase, v] += _digit_sum(d * 2) if double else d
+                double = not double
+    return contribution.ravel(), width
+
+
+LUHN_CONTRIBUTION, LUHN_WIDTH = _luhn_tables()
+
+
+def _luhn_total(values, double):
+    """
+    Luhn digit total over character values expanded to decimal digits.
+
+    Whether a character starts in the doubling phase depends only on how
+    many digits sit to its right, so a reversed cumulative sum of the
+    expansion widths gives every phase at once.
+    """
+    values = np.where(values < 0, 0, values).astype(np.uint8)
+    widths = LUHN_WIDTH[values]
+    to_right = np.cumsum(widths[:, ::-1], axis=1, dtype=np.uint8)[:, ::-1] - widths
+    index = ((to_right + np.uint8(double)) & 1) * np.uint8(36) + values
+    return LUHN_CONTRIBUTION[index].sum(axis=1, dtype=np.int64)
+
+
+def isin_check_digits(matrix):
+    """Check digits (as ASCII codes) for an (n, 11) uint8 matrix of ISIN bodies."""
+    total = _luhn_total(ISIN_VALUES[matrix], double=True)
+    return ((10 - total % 10) % 10 + ord("0")).astype(np.uint8)
+
+
+def sedol_check_digits(matrix):
+    """Check digits (as ASCII codes) for an (n, 6) uint8 matrix of SEDOL bases."""
+    total = (SEDOL_VALUES[matrix] * SEDOL_WEIGHTS).sum(axis=1)
+    return ((10 - total % 10) % 10 + ord("0")).astype(np.uint8)
+
+
+def validate_cusips(values):
+    """Boolean array: True where the value is a well-formed CUSIP with a correct check digit."""
+    matrix, ok = _as_matrix(values, CUSIP_LENGTH)
+    ok &= (CUSIP_VALUES[matrix[:, :8]] >= 0).all(axis=1)
+    return ok & (cusip_check_digits(matrix[:, :8]) == matrix[:, 8])
+
+
+def validate_isins(values):
+    """Boolean array: True where the value is a well-formed ISIN with a correct check digit."""
+    matrix, ok = _as_matrix(values, ISIN_LENGTH)
+    country = ISIN_VALUES[matrix[:, :2]]
+    ok &= ((country >= 10).all(axis=1) & (ISIN_VALUES[matrix[:, 2:11]] >= 0).all(axis=1))
+    return ok & (isin_check_digits(matrix[:, :11]) == matrix[:, 11])
+
+
+def validate_sedols(values):
+    """Boolean array: True where the value is a well-formed SEDOL with a correct check digit."""
+    matrix, ok = _as_matrix(values, SEDOL_LENGTH)
+    ok &= (SEDOL_VALUES[matrix[:, :6]] >= 0).all(axis=1)
+    return ok & (sedol_check_digits(matrix[:, :6]) == matrix[:, 6])
+
+
+def _scalar_check(func, base, width):
+    matrix, ok = _as_matrix([base], width)
+    if not ok[0]:
+        raise ValueError(f"Expected {width} characters, got '{base}'")
+    return chr(func(matrix)[0])
+
+
+def cusip_check_digit(base):
+    if (CUSIP_VALUES[np.frombuffer(base.encode(), dtype=np.uint8)] < 0).any():
+        raise ValueError(f"Invalid CUSIP characters in '{base}'")
+    return _scalar_check(cusip_check_digits, base, 8)
+
+
+def isin_check_digit(body):
+    if (ISIN_VALUES[np.frombuffer(body.encode(), dtype=np.uint8)] < 0).any():
+        raise ValueError(f"Invalid ISIN characters in '{body}'")
+    return _scalar_check(isin_check_digits, body, 11)
+
+
+def sedol_check_digit(base):
+    if (SEDOL_VALUES[np.frombuffer(base.encode(), dtype=np.uint8)] < 0).any():
+        raise ValueError(f"Invalid SEDOL characters in '{base}'")
+    return _scalar_check(sedol_check_digits, base, 6)
+
+
+def is_valid_cusip(value):
+    return bool(validate_cusips([value])[0])
+
+
+def is_valid_isin(value):
+    return bool(validate_isins([value])[0])
+
+
+def is_valid_sedol(value):
+    return bool(validate_sedols([value])[0])
+
+
+def isin_from_cusip(cusip, country="US"):
+    body = f"{country}{cusip}"
+    return body + isin_check_digit(body)
+
+
+def validate_identifiers(isin=None, cusip=None, sedol=None):
+    """Return a list of human-readable problems with the given identifiers (empty if all valid)."""
+    errors = []
+    if isin and not is_valid_isin(isin):
+        errors.append(f"ISIN '{isin}' is not valid (12 characters, country prefix, Luhn check digit)")
+    if cusip and not is_valid_cusip(cusip):
+        errors.append(f"CUSIP '{cusip}' is not valid (9 characters, modulus-10 check digit)")
+    if sedol and not is_valid_sedol(sedol):
+        errors.append(f"SEDOL '{sedol}' is not valid (7 characters, no vowels, weighted check digit)")
+    if isin and cusip and not errors and isin[:2] in ("US", "CA") and isin[2:11] != cusip:
+        errors.append(f"ISIN '{isin}' does not embed CUSIP '{cusip}'")
+    return errors
+
+
+def _benchmark(n=2_000_000, seed=0):
+    import time
+    rng = np.random.default_rng(seed)
+    alphabet = np.frombuffer(b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+
+    cusips = np.empty((n, 9), dtype=np.uint8)
+    cusips[:, :8] = alphabet[rng.integers(0, 36, size=(n, 8))]
+    cusips[:, 8] = cusip_check_digits(cusips[:, :8])
+    isins = np.empty((n, 12), dtype=np.uint8)
+    isins[:, :2] = np.frombuffer(b"US", dtype=np.uint8)
+    isins[:, 2:11] = cusips
+    isins[:, 11] = isin_check_digits(isins[:, :11])
+    sedol_alphabet = np.frombuffer(b"0123456789BCDFGHJKLMNPQRSTVWXYZ", dtype=np.uint8)
+    sedols = np.empty((n, 7), dtype=np.uint8)
+    sedols[:, :6] = sedol_alphabet[rng.integers(0, len(sedol_alphabet), size=(n, 6))]
+    sedols[:, 6] = sedol_check_digits(sedols[:, :6])
+
+    print(f"Validating {n:,} identifiers of each type")
+    for label, func, matrix, width in (("CUSIP", validate_cusips, cusips, 9),
+                                       ("ISIN", validate_isins, isins, 12),
+                                       ("SEDOL", validate_sedols, sedols, 7)):
+        values = matrix.view(f"S{width}").ravel()
+        start = time.perf_counter()
+        valid = func(values)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<6} {elapsed:6.3f}s  {n / elapsed:>14,.0f} ids/sec  ({valid.sum():,} valid)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,350 @@
+"""
+Continuous ingest daemon for json_data/
+
+Watches a directory for finished JSON/NDJSON files, plain or gzipped
+(inotify on Linux, size/mtime polling elsewhere), streams each one to the
+Interactive Table with bounded concurrency and moves it to done/ once
+every row is acknowledged, or to failed/ if streaming raised.
+
+Ingest lag is reported per file as the time from the file's last write
+(mtime) to the commit acknowledgement of its final offset token, with
+running p50/p95.
+
+Usage:
+    python ingest_daemon.py --dir json_data --concurrency 4
+    python ingest_daemon.py --fake --demo --duration 30
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import queue
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from parallel_ingest import make_offset_token, wait_for_commit
+from snowpipe_streaming_ingest import (
+    CONFIG,
+    DEFAULT_BATCH_SIZE,
+    iter_batches,
+    iter_json_records,
+    open_table_channel,
+)
+
+DEFAULT_CONCURRENCY = 4
+POLL_INTERVAL = 1.0
+LATENCY_WINDOW = 1000        # most recent files kept for percentiles
+REPORT_INTERVAL = 10.0
+INGEST_SUFFIXES = (".json", ".ndjson", ".json.gz", ".ndjson.gz")
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_ingest_file(name):
+    return not name.startswith(".") and name.endswith(INGEST_SUFFIXES)
+
+
+class InotifyWatcher:
+    """Reports files closed after writing, or renamed into the directory."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.directory = directory
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def poll(self, timeout):
+        """Paths of files completed since the last call (waits up to timeout)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths, offset = [], 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; fall back to a directory scan
+                paths.extend(scan_directory(self.directory))
+            elif name and is_ingest_file(os.fsdecode(name)):
+                paths.append(os.path.join(self.directory, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Reports a file once its size and mtime are unchanged across two scans."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pending = {}
+
+    def poll(self, timeout):
+        time.sleep(timeout)
+        ready = []
+        for path in scan_directory(self.directory):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if self.pending.get(path) == signature:
+                ready.append(path)
+                del self.pending[path]
+            else:
+                self.pending[path] = signature
+        return ready
+
+    def close(self):
+        pass
+
+
+def scan_directory(directory):
+    with os.scandir(directory) as entries:
+        return sorted(e.path for e in entries if e.is_file() and is_ingest_file(e.name))
+
+
+def make_watcher(directory, force_poll=False):
+    if not force_poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except OSError as e:
+            print(f"⚠️ inotify unavailable ({e}), polling every {POLL_INTERVAL}s")
+    return PollingWatcher(directory)
+
+
+class LatencyTracker:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.files = 0
+        self.rows = 0
+        self.failed = 0
+
+    def record(self, latency, rows):
+        with self.lock:
+            self.samples.append(latency)
+            self.files += 1
+            self.rows += rows
+
+    def record_failure(self):
+        with self.lock:
+            self.failed += 1
+
+    def percentile(self, q):
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self):
+        return {
+            "files": self.files,
+            "rows": self.rows,
+            "failed": self.failed,
+            "latency_p50": self.percentile(0.50),
+            "latency_p95": self.percentile(0.95),
+        }
+
+
+class IngestDaemon:
+    """
+    Directory watcher plus a fixed pool of channel workers.
+
+    Args:
+        client: Ingest SDK client (or FakeStreamingIngestClient)
+        directory: Directory to watch
+        concurrency: Files streamed at once; one channel per worker
+        metrics_path: Optional JSON file rewritten with the latest metrics
+    """
+
+    def __init__(self, client, directory="json_data", table_name=None, concurrency=DEFAULT_CONCURRENCY,
+                 batch_size=DEFAULT_BATCH_SIZE, done_dir=None, failed_dir=None, force_poll=False,
+                 metrics_path=None):
+        self.client = client
+        self.directory = directory
+        self.table_name = table_name or CONFIG["table"]
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.done_dir = done_dir or os.path.join(directory, "done")
+        self.failed_dir = failed_dir or os.path.join(directory, "failed")
+        self.force_poll = force_poll
+        self.metrics_path = metrics_path
+        self.queue = queue.Queue(maxsize=concurrency * 2)
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.metrics = LatencyTracker()
+        for d in (directory, self.done_dir, self.failed_dir):
+            os.makedirs(d, exist_ok=True)
+
+    def _claim(self, path):
+        with self.lock:
+            if path in self.in_flight:
+                return False
+            self.in_flight.add(path)
+            return True
+
+    def _release(self, path):
+        with self.lock:
+            self.in_flight.discard(path)
+
+    def _enqueue(self, path):
+        if not self._claim(path):
+            return
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(path, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        self._release(path)
+
+    def _stream_file(self, channel, path):
+        name = os.path.basename(path)
+        written_at = os.stat(path).st_mtime
+        rows = 0
+        token = None
+        for batch in iter_batches(iter_json_records(path), self.batch_size):
+            rows += len(batch)
+            token = make_offset_token(name, rows)
+            channel.insert_rows(batch, offset_token=token)
+        if token and not wait_for_commit(channel, token):
+            raise TimeoutError(f"{name}: rows not acknowledged")
+        return rows, time.time() - written_at
+
+    def _worker(self, i):
+        channel_name = f"{self.table_name}_daemon_{i}"
+        channel = open_table_channel(self.client, self.table_name, channel_name)
+        while True:
+            try:
+                path = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    break
+                continue
+            try:
+                rows, latency = self._stream_file(channel, path)
+                os.replace(path, os.path.join(self.done_dir, os.path.basename(path)))
+                self.metrics.record(latency, rows)
+                print(f"✅ {os.path.basename(path)}: {rows:,} rows, lag {latency * 1000:,.0f} ms")
+            except Exception as e:
+                self.metrics.record_failure()
+                print(f"❌ {os.path.basename(path)}: {e}")
+                if os.path.exists(path):
+                    os.replace(path, os.path.join(self.failed_dir, os.path.basename(path)))
+                # A failed channel may be invalidated; start the next file on a fresh one
+                channel = open_table_channel(self.client, self.table_name, channel_name)
+            finally:
+                self._release(path)
+        channel.close()
+
+    def _write_metrics(self):
+        snapshot = self.metrics.snapshot()
+        if self.metrics_path:
+            tmp = self.metrics_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self.metrics_path)
+        return snapshot
+
+    def report(self):
+        m = self._write_metrics()
+        if m["files"]:
+            print(f"📊 {m['files']:,} files / {m['rows']:,} rows ingested, {m['failed']} failed, "
+                  f"lag p50 {m['latency_p50'] * 1000:,.0f} ms, p95 {m['latency_p95'] * 1000:,.0f} ms")
+
+    def run(self, duration=None):
+        """Watch and ingest until stop() is called, a signal arrives or duration elapses."""
+        watcher = make_watcher(self.directory, self.force_poll)
+        workers = [threading.Thread(target=self._worker, args=(i,), daemon=True)
+                   for i in range(self.concurrency)]
+        for t in workers:
+            t.start()
+        print(f"👀 Watching {self.directory} ({type(watcher).__name__}), {self.concurrency} channels")
+        # Files that arrived while the daemon was down
+        for path in scan_directory(self.directory):
+            self._enqueue(path)
+        deadline = time.monotonic() + duration if duration else None
+        next_report = time.monotonic() + REPORT_INTERVAL
+        try:
+            while not self.stop_event.is_set():
+                if deadline and time.monotonic() >= deadline:
+                    break
+                for path in watcher.poll(POLL_INTERVAL if isinstance(watcher, PollingWatcher) else 0.5):
+                    if os.path.exists(path):
+                        self._enqueue(path)
+                if time.monotonic() >= next_report:
+                    self.report()
+                    next_report += REPORT_INTERVAL
+        finally:
+            self.stop_event.set()
+            for t in workers:
+                t.join()
+            watcher.close()
+            self.report()
+        return self.metrics.snapshot()
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+
+def run_demo_writer(directory, stop_event, interval=2.0, records_per_file=500):
+    """Write generator output into the watched directory until stopped."""
+    from generate_uk_customer_data import save_json_files
+    while not stop_event.wait(interval):
+        save_json_files(output_dir=directory, num_files=1, records_per_file=records_per_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Continuous Snowpipe Streaming ingest daemon")
+    parser.add_argument("--dir", default="json_data")
+    parser.add_argument("--table", default=None)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--poll", action="store_true", help="Force the polling watcher")
+    parser.add_argument("--metrics-file", default=None, help="Rewrite this JSON file with the latest metrics")
+    parser.add_argument("--duration", type=float, default=None, help="Exit after this many seconds")
+    parser.add_argument("--fake", action="store_true", help="Use the local fake client")
+    parser.add_argument("--demo", action="store_true", help="Also write generated files into --dir")
+    args = parser.parse_args()
+
+    if args.fake:
+        from fake_streaming_client import FakeStreamingIngestClient
+        ingest_client = FakeStreamingIngestClient()
+    else:
+        from snowpipe_streaming_ingest import create_streaming_client
+        ingest_client = create_streaming_client()
+
+    daemon = IngestDaemon(ingest_client, args.dir, args.table, args.concurrency, args.batch_size,
+                          force_poll=args.poll, metrics_path=args.metrics_file)
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    if args.demo:
+        threading.Thread(target=run_demo_writer, args=(args.dir, daemon.stop_event), daemon=True).start()
+    daemon.run(args.duration)
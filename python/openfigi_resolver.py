@@ -0,0 +1,216 @@
+"""
+Batched, parallel OpenFIGI resolution engine
+
+Resolves ticker lists against the OpenFIGI v3 mapping API using the
+largest job count the API allows per request, a bounded pool of
+concurrent requests and a shared token-bucket rate limiter. Throttled or
+failed requests are retried with exponential backoff instead of
+recursing.
+
+OpenFIGI limits (v3):
+    without API key:  10 jobs/request, 25 requests per 60 seconds
+    with API key:    100 jobs/request, 25 requests per 6 seconds
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+OPENFIGI_URL = "https://api.openfigi.com/v3/mapping"
+
+MAX_JOBS_PER_REQUEST = 10
+MAX_JOBS_PER_REQUEST_WITH_KEY = 100
+RATE_LIMIT = (25, 60.0)            # requests, per seconds
+RATE_LIMIT_WITH_KEY = (25, 6.0)
+
+DEFAULT_WORKERS = 4
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+REQUEST_TIMEOUT = 30
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `capacity` tokens refilled over `period` seconds."""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self, seconds):
+        """Push the bucket into debt after the server signals a rate limit."""
+        with self.lock:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+def build_jobs(tickers, exch_code="US"):
+    return [{"idType": "TICKER", "idValue": t['symbol'], "exchCode": exch_code} for t in tickers]
+
+
+def extract_isin(figi_result):
+    """Pick the share-class identifier for a single mapping result (None if no match)."""
+    isin = None
+    if isinstance(figi_result, dict) and 'data' in figi_result:
+        for item in figi_result['data']:
+            if item.get('shareClassFIGI'):
+                isin = item.get('shareClassFIGI')[:12]
+            if 'compositeFIGI' in item:
+                for d in figi_result.get('data', []):
+                    if d.get('securityType') == 'Common Stock':
+                        isin = d.get('shareClassFIGI', '')[:12] if d.get('shareClassFIGI') else None
+    return isin
+
+
+def _retry_after(response, attempt):
+    """Seconds to wait before retrying, preferring the server's own hint."""
+    for header in ("ratelimit-reset", "Retry-After"):
+        value = response.headers.get(header) if response is not None else None
+        if value:
+            try:
+                return max(float(value), 0.0) + random.uniform(0, 0.5)
+            except ValueError:
+                pass
+    return min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+class OpenFigiResolver:
+    """
+    Resolve tickers to FIGI/ISIN mapping results.
+
+    Args:
+        api_key: OpenFIGI API key (defaults to $OPENFIGI_API_KEY). Raises the
+            per-request job count and the rate limit.
+        max_workers: Number of requests in flight at once
+        url: Mapping endpoint (point at the local stub server for benchmarks)
+        rate_limit: (requests, seconds) override for the token bucket
+    """
+
+    def __init__(self, api_key=None, max_workers=DEFAULT_WORKERS, url=OPENFIGI_URL,
+                 rate_limit=None, jobs_per_request=None):
+        self.api_key = api_key if api_key is not None else os.getenv("OPENFIGI_API_KEY")
+        self.url = url
+        self.max_workers = max_workers
+        self.jobs_per_request = jobs_per_request or (
+            MAX_JOBS_PER_REQUEST_WITH_KEY if self.api_key else MAX_JOBS_PER_REQUEST
+        )
+        capacity, period = rate_limit or (RATE_LIMIT_WITH_KEY if self.api_key else RATE_LIMIT)
+        self.bucket = TokenBucket(capacity, period)
+        self.local = threading.local()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failed_batches": 0}
+        self.stats_lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["Content-Type"] = "application/json"
+            if self.api_key:
+                session.headers["X-OPENFIGI-APIKEY"] = self.api_key
+            self.local.session = session
+        return session
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def lookup_batch(self, tickers):
+        """POST one mapping request, retrying throttles and transient errors."""
+        jobs = build_jobs(tickers)
+        for attempt in range(MAX_RETRIES + 1):
+            self.bucket.acquire()
+            self._count("requests")
+            response = None
+            try:
+                response = self._session().post(self.url, json=jobs, timeout=REQUEST_TIMEOUT)
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code == 429:
+                    self._count("throttled")
+                    self.bucket.drain(_retry_after(response, attempt))
+                    wait = 0
+                elif response.status_code >= 500:
+                    wait = _retry_after(None, attempt)
+                else:
+                    print(f"Error: {response.status_code} - {response.text}")
+                    break
+            except requests.RequestException as e:
+                print(f"Request failed ({e}), retrying...")
+                wait = _retry_after(None, attempt)
+            if attempt < MAX_RETRIES:
+                self._count("retries")
+                time.sleep(wait)
+        self._count("failed_batches")
+        return [{"error": "API error"}] * len(tickers)
+
+    def resolve(self, tickers, progress=True):
+        """
+        Resolve every ticker, returning mapping results in input order.
+
+        Batches are dispatched to a bounded thread pool; the token bucket
+        keeps the combined request rate inside the API limit.
+        """
+        batches = [tickers[i:i + self.jobs_per_request]
+                   for i in range(0, len(tickers), self.jobs_per_request)]
+        results = [None] * len(batches)
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.lookup_batch, batch): i for i, batch in enumerate(batches)}
+            for future in futures:
+                results[futures[future]] = future.result()
+                done += 1
+                if progress:
+                    print(f"Processed batch {done}/{len(batches)}...")
+        return [r for batch_results in results for r in batch_results]
+
+
+def resolve_tickers(tickers, api_key=None, max_workers=DEFAULT_WORKERS, url=OPENFIGI_URL, cache=None):
+    """
+    Resolve tickers and return [{'symbol', 'name', 'isin'}] in input order.
+
+    With a FigiCache, only symbols that are missing or expired in the cache
+    are sent to OpenFIGI; fresh answers (including "no match") are written
+    back so the next run can skip them.
+    """
+    jobs = build_jobs(tickers)
+    isins = {}
+    pending = tickers
+    if cache is not None:
+        from figi_cache import cache_key
+        keys = [cache_key(job) for job in jobs]
+        hits = cache.get_many(keys)
+        isins = {key[1]: hit[0] for key, hit in hits.items()}
+        pending = [t for t, key in zip(tickers, keys) if key not in hits]
+        print(f"Cache: {len(hits)} hits, {len(pending)} to resolve")
+
+    if pending:
+        resolver = OpenFigiResolver(api_key=api_key, max_workers=max_workers, url=url)
+        figi_results = resolver.resolve(pending)
+        fresh = [(t, r, extract_isin(r)) for t, r in zip(pending, figi_results)]
+        for t, _, isin in fresh:
+            isins[t['symbol']] = isin
+        if cache is not None:
+            cache.put_many([(cache_key(job), isin, r)
+                            for job, (_, r, isin) in zip(build_jobs(pending), fresh)])
+        print(f"OpenFIGI: {resolver.stats['requests']} requests, "
+              f"{resolver.stats['throttled']} throttled, {resolver.stats['failed_batches']} failed batches")
+
+    return [{'symbol': t['symbol'], 'name': t['name'], 'isin': isins.get(t['symbol'])} for t in tickers]
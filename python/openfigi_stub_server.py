@@ -0,0 +1,184 @@
+"""
+Local OpenFIGI stub server for offline benchmarking
+
+Serves POST /v3/mapping with deterministic fake FIGI results, a
+configurable per-request latency and an optional server-side rate limit
+that answers 429 like the real API.
+
+Usage:
+    python openfigi_stub_server.py --serve --port 8765
+    python openfigi_stub_server.py --benchmark --csv ../data/EQUITY/nyse_listed.csv
+    python openfigi_stub_server.py --incremental --csv ../data/EQUITY/nyse_listed.csv
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS = "BCDFGHJKLMNPQRSTVWXYZ0123456789"
+
+
+def fake_figi(value):
+    digest = hashlib.sha1(value.encode()).digest()
+    return "BBG" + "".join(CHARS[b % len(CHARS)] for b in digest[:9])
+
+
+def fake_mapping(job):
+    """Mapping result for one job; roughly 1 in 20 tickers has no match."""
+    value = job.get("idValue", "")
+    if hashlib.sha1(value.encode()).digest()[0] < 13:
+        return {"warning": "No identifier found."}
+    return {"data": [{
+        "figi": fake_figi(value + ":figi"),
+        "name": f"{value} CORP",
+        "ticker": value,
+        "exchCode": job.get("exchCode", "US"),
+        "compositeFIGI": fake_figi(value + ":composite"),
+        "securityType": "Common Stock",
+        "marketSector": "Equity",
+        "shareClassFIGI": fake_figi(value + ":share"),
+    }]}
+
+
+class StubState:
+    def __init__(self, latency, max_jobs, rate_limit):
+        self.latency = latency
+        self.max_jobs = max_jobs
+        self.rate_limit = rate_limit
+        self.window = []
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+
+    def admit(self):
+        """Sliding-window limiter; returns seconds until reset when over the limit."""
+        if not self.rate_limit:
+            return 0
+        limit, period = self.rate_limit
+        now = time.monotonic()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < period]
+            if len(self.window) >= limit:
+                self.throttled += 1
+                return period - (now - self.window[0])
+            self.window.append(now)
+            return 0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            jobs = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"[]")
+            with state.lock:
+                state.requests += 1
+            reset = state.admit()
+            if reset:
+                self._reply(429, {"error": "Too Many Requests"}, {"ratelimit-reset": f"{reset:.2f}"})
+                return
+            if len(jobs) > state.max_jobs:
+                self._reply(413, {"error": f"Too many mapping jobs, max {state.max_jobs}"})
+                return
+            time.sleep(state.latency)
+            self._reply(200, [fake_mapping(job) for job in jobs])
+
+    return Handler
+
+
+def start_stub_server(port=0, latency=0.25, max_jobs=100, rate_limit=None):
+    """Start the stub in a daemon thread; returns (server, mapping_url, state)."""
+    state = StubState(latency, max_jobs, rate_limit)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v3/mapping", state
+
+
+def benchmark(csv_path, latency, workers):
+    from create_nyse_table import load_tickers
+    from openfigi_resolver import OpenFigiResolver, RATE_LIMIT_WITH_KEY
+
+    tickers = load_tickers(csv_path)
+    print(f"Benchmarking {len(tickers)} tickers against stub (latency {latency * 1000:.0f}ms/request)")
+    print(f"{'mode':<34}{'requests':>10}{'seconds':>10}{'tickers/sec':>14}")
+
+    runs = [
+        ("sequential, 10 jobs/request", 1, 10),
+        (f"{workers} workers, 100 jobs/request", workers, 100),
+    ]
+    for label, max_workers, jobs in runs:
+        server, url, state = start_stub_server(latency=latency, rate_limit=RATE_LIMIT_WITH_KEY)
+        resolver = OpenFigiResolver(api_key="stub", max_workers=max_workers, url=url,
+                                    jobs_per_request=jobs)
+        start = time.perf_counter()
+        resolver.resolve(tickers, progress=False)
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        print(f"{label:<34}{state.requests:>10}{elapsed:>10.2f}{len(tickers) / elapsed:>14,.0f}")
+
+
+def benchmark_incremental(csv_path, latency):
+    """Cold run, warm run, then a run against a listing diff, all through the cache."""
+    import os
+    import tempfile
+    from create_nyse_table import load_tickers
+    from figi_cache import FigiCache
+    from openfigi_resolver import RATE_LIMIT_WITH_KEY, resolve_tickers
+
+    tickers = load_tickers(csv_path)
+    new_listings = [{'symbol': f"ZZ{i:03d}", 'name': f"New Listing {i}"} for i in range(25)]
+    changed = tickers[10:] + new_listings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FigiCache(os.path.join(tmp, "figi_cache.sqlite"))
+        runs = [("cold cache", tickers), ("warm cache", tickers),
+                ("listing diff (-10, +25)", changed)]
+        print(f"{'run':<28}{'requests':>10}{'seconds':>10}")
+        for label, listing in runs:
+            server, url, state = start_stub_server(latency=latency, rate_limit=RATE_LIMIT_WITH_KEY)
+            added, removed = cache.diff_listing(listing)
+            start = time.perf_counter()
+            resolve_tickers(listing, api_key="stub", url=url, cache=cache)
+            elapsed = time.perf_counter() - start
+            server.shutdown()
+            print(f"{label:<28}{state.requests:>10}{elapsed:>10.2f}   (+{len(added)} / -{len(removed)} symbols)")
+        cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenFIGI stub server")
+    parser.add_argument("--serve", action="store_true", help="Run the stub in the foreground")
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark the resolver against the stub")
+    parser.add_argument("--incremental", action="store_true", help="Benchmark cached, incremental refreshes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.25, help="Seconds per request")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--csv", default="nyse_listed.csv")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.csv, args.latency, args.workers)
+    elif args.incremental:
+        benchmark_incremental(args.csv, args.latency)
+    else:
+        server, url, _ = start_stub_server(args.port, args.latency)
+        print(f"OpenFIGI stub listening on {url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,341 @@
+"""
+Parallel, resumable Snowpipe Streaming ingest
+
+Shards input across N channels, each driven by its own worker thread:
+
+    file    channel i streams files i, i+N, i+2N, ... and parses them itself
+    record  one reader parses every file and deals fixed-size batches
+            round-robin to the channels through bounded queues
+
+Every batch is sent with an offset token "<file name>:<end record>". The
+committed token of each channel is written to a JSON checkpoint, so a
+restart skips everything a channel already committed instead of
+re-sending whole files. Batch boundaries are deterministic (they never
+span files), which is what lets the reader replay the same assignment on
+resume.
+
+Usage:
+    python parallel_ingest.py json_data/*.json --channels 4 --shard record
+    python parallel_ingest.py --benchmark --records 200000 --channels 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from snowpipe_streaming_ingest import (
+    CONFIG,
+    DEFAULT_BATCH_SIZE,
+    iter_batches,
+    iter_json_records,
+    open_table_channel,
+    peak_rss_mb,
+)
+
+DEFAULT_CHANNELS = 4
+QUEUE_DEPTH = 8              # batches buffered per channel in record mode
+CHECKPOINT_INTERVAL = 1.0    # seconds between checkpoint writes
+COMMIT_POLL_INTERVAL = 0.02
+SHARD_MODES = ("file", "record")
+
+
+def make_offset_token(file_name, end):
+    return f"{file_name}:{end}"
+
+
+def parse_offset_token(token):
+    file_name, end = token.rsplit(":", 1)
+    return file_name, int(end)
+
+
+def wait_for_commit(channel, token, timeout=60.0):
+    """Block until the channel reports token as committed; False on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if channel.get_latest_committed_offset_token() == token:
+            return True
+        time.sleep(COMMIT_POLL_INTERVAL)
+    return False
+
+
+class Checkpoint:
+    """
+    Per-channel committed positions persisted as JSON.
+
+    {"table", "shard", "batch_size", "channel_count", "files": [...],
+     "channels": {name: {"file", "offset"}}}
+
+    Which batches a channel sends depends on the channel count in both
+    shard modes, so a checkpoint only resumes a run with the same count.
+    """
+
+    def __init__(self, path, table, shard, batch_size, files, channel_count):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {
+            "table": table,
+            "shard": shard,
+            "batch_size": batch_size,
+            "channel_count": channel_count,
+            "files": [os.path.basename(f) for f in files],
+            "channels": {},
+        }
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            for key in ("table", "shard", "batch_size", "channel_count", "files"):
+                if saved.get(key) != self.state[key]:
+                    raise ValueError(
+                        f"Checkpoint {path} was written for a different run ({key} differs); "
+                        "delete it to start over"
+                    )
+            self.state["channels"] = saved.get("channels", {})
+
+    def position(self, channel_name):
+        """(file order, end record) committed by a channel, or None."""
+        entry = self.state["channels"].get(channel_name)
+        if not entry or entry.get("file") is None:
+            return None
+        return self.state["files"].index(entry["file"]), entry["offset"]
+
+    def update(self, channel_name, token):
+        with self.lock:
+            entry = self.state["channels"].setdefault(channel_name, {"file": None, "offset": 0})
+            if token:
+                entry["file"], entry["offset"] = parse_offset_token(token)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            payload = json.dumps(self.state, indent=2)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def iter_file_batches(files, batch_size, file_indexes=None):
+    """Yield (file order, file name, end record, rows) for deterministic per-file batches."""
+    for order, path in enumerate(files):
+        if file_indexes is not None and order not in file_indexes:
+            continue
+        name = os.path.basename(path)
+        end = 0
+        for rows in iter_batches(iter_json_records(path), batch_size):
+            end += len(rows)
+            yield order, name, end, rows
+
+
+class ChannelWorker:
+    def __init__(self, client, table_name, channel_name, checkpoint):
+        self.channel_name = channel_name
+        self.channel = open_table_channel(client, table_name, channel_name)
+        self.checkpoint = checkpoint
+        # The server's committed token wins over a stale checkpoint
+        token = self.channel.get_latest_committed_offset_token()
+        if token:
+            checkpoint.update(channel_name, token)
+        self.resume_at = checkpoint.position(channel_name)
+        self.rows = 0
+        self.skipped = 0
+        self.last_token = None
+
+    def skip(self, order, end):
+        return self.resume_at is not None and (order, end) <= self.resume_at
+
+    def send(self, order, name, end, rows):
+        if self.skip(order, end):
+            self.skipped += len(rows)
+            return
+        token = make_offset_token(name, end)
+        self.channel.insert_rows(rows, offset_token=token)
+        self.rows += len(rows)
+        self.last_token = token
+
+    def refresh_checkpoint(self):
+        token = self.channel.get_latest_committed_offset_token()
+        if token:
+            self.checkpoint.update(self.channel_name, token)
+
+    def finish(self, timeout=60.0):
+        if self.last_token and not wait_for_commit(self.channel, self.last_token, timeout):
+            raise TimeoutError(f"{self.channel_name}: {self.last_token} not committed after {timeout}s")
+        self.channel.close()
+        token = self.last_token or self.channel.get_latest_committed_offset_token()
+        self.checkpoint.update(self.channel_name, token)
+
+
+def parallel_ingest(files, client, table_name=None, channels=DEFAULT_CHANNELS, shard="file",
+                    batch_size=DEFAULT_BATCH_SIZE, checkpoint_path=None, queue_depth=QUEUE_DEPTH):
+    """
+    Stream files into table_name over `channels` parallel channels.
+
+    Returns:
+        dict with records, skipped, seconds, records_per_sec, channels, peak_rss_mb
+    """
+    if shard not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode '{shard}', expected one of {SHARD_MODES}")
+    table_name = table_name or CONFIG["table"]
+    files = sorted(files)
+    checkpoint = Checkpoint(checkpoint_path, table_name, shard, batch_size, files, channels)
+    workers = [ChannelWorker(client, table_name, f"{table_name}_channel_{i}", checkpoint)
+               for i in range(channels)]
+
+    stop = threading.Event()
+    errors = []
+
+    def run_file_shard(i):
+        worker = workers[i]
+        for batch in iter_file_batches(files, batch_size, set(range(i, len(files), channels))):
+            if stop.is_set():
+                return
+            worker.send(*batch)
+
+    def run_queue(i, q):
+        worker = workers[i]
+        while True:
+            batch = q.get()
+            if batch is None or stop.is_set():
+                return
+            worker.send(*batch)
+
+    def guarded(target, *args):
+        try:
+            target(*args)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    def checkpointer():
+        while not stop.wait(CHECKPOINT_INTERVAL):
+            for worker in workers:
+                worker.refresh_checkpoint()
+            checkpoint.save()
+
+    start = time.perf_counter()
+    ticker = threading.Thread(target=checkpointer, daemon=True)
+    ticker.start()
+    if shard == "file":
+        threads = [threading.Thread(target=guarded, args=(run_file_shard, i)) for i in range(channels)]
+        for t in threads:
+            t.start()
+    else:
+        queues = [queue.Queue(maxsize=queue_depth) for _ in range(channels)]
+        threads = [threading.Thread(target=guarded, args=(run_queue, i, q)) for i, q in enumerate(queues)]
+        for t in threads:
+            t.start()
+        try:
+            for k, batch in enumerate(iter_file_batches(files, batch_size)):
+                while not stop.is_set():
+                    try:
+                        queues[k % channels].put(batch, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        for q in queues:
+            while True:
+                try:
+                    q.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    if stop.is_set():
+                        break
+    for t in threads:
+        t.join()
+    if not errors:
+        for worker in workers:
+            worker.finish()
+    stop.set()
+    ticker.join()
+    checkpoint.save()
+    if errors:
+        raise errors[0]
+
+    seconds = time.perf_counter() - start
+    records = sum(w.rows for w in workers)
+    return {
+        "records": records,
+        "skipped": sum(w.skipped for w in workers),
+        "seconds": seconds,
+        "records_per_sec": records / seconds if seconds > 0 else float("inf"),
+        "channels": channels,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def write_benchmark_files(directory, records, num_files):
+    from generate_uk_customer_data import generate_batch
+    per_file = -(-records // num_files)
+    sample = generate_batch(min(per_file, 5000))
+    files = []
+    for i in range(num_files):
+        path = os.path.join(directory, f"bench_{i:03d}.ndjson")
+        count = min(per_file, records - i * per_file)
+        with open(path, "w", encoding="utf-8") as f:
+            for j in range(count):
+                f.write(json.dumps(sample[j % len(sample)]) + "\n")
+        files.append(path)
+    return files
+
+
+def benchmark(records, channel_counts, shard, batch_size, latency, num_files):
+    from fake_streaming_client import FakeStreamingIngestClient
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_benchmark_files(tmp, records, num_files)
+        print(f"{records:,} records in {num_files} files, shard={shard}, batch={batch_size}, "
+              f"fake latency {latency * 1000:.0f}ms/insert")
+        print(f"{'channels':>9}{'seconds':>10}{'records/sec':>14}{'speedup':>9}")
+        baseline = None
+        for n in channel_counts:
+            client = FakeStreamingIngestClient(latency=latency)
+            stats = parallel_ingest(files, client, channels=n, shard=shard, batch_size=batch_size)
+            assert client.row_count() == records, "row count mismatch"
+            baseline = baseline or stats["records_per_sec"]
+            print(f"{n:>9}{stats['seconds']:>10.2f}{stats['records_per_sec']:>14,.0f}"
+                  f"{stats['records_per_sec'] / baseline:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel, resumable Snowpipe Streaming ingest")
+    parser.add_argument("files", nargs="*", help="JSON array or NDJSON files")
+    parser.add_argument("--table", default=None)
+    parser.add_argument("--channels", type=int, nargs="+", default=[DEFAULT_CHANNELS])
+    parser.add_argument("--shard", choices=SHARD_MODES, default="file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.json")
+    parser.add_argument("--fake", action="store_true", help="Use the local fake client")
+    parser.add_argument("--benchmark", action="store_true", help="Throughput per channel count against the fake client")
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--num-files", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.records, args.channels, args.shard, args.batch_size, args.latency, args.num_files)
+    elif args.files:
+        if args.fake:
+            from fake_streaming_client import FakeStreamingIngestClient
+            ingest_client = FakeStreamingIngestClient(latency=args.latency)
+        else:
+            from snowpipe_streaming_ingest import create_streaming_client
+            ingest_client = create_streaming_client()
+        result = parallel_ingest(args.files, ingest_client, args.table, args.channels[0], args.shard,
+                                 args.batch_size, args.checkpoint)
+        print(f"✅ {result['records']:,} records over {result['channels']} channels "
+              f"({result['skipped']:,} already committed) in {result['seconds']:.2f}s: "
+              f"{result['records_per_sec']:,.0f} records/sec, peak RSS {result['peak_rss_mb']:.0f} MB")
+    else:
+        parser.print_help()
@@ -0,0 +1,149 @@
+"""
+Local Yahoo Finance chart stub for offline quote tests
+
+Serves GET /v8/finance/chart/<SYMBOL> in the shape GET_STOCK_PRICE
+parses, with deterministic prices that drift slowly over time, a
+configurable per-request latency and 404 for symbols starting with "ZZ".
+
+Usage:
+    python quote_stub_server.py --serve --port 8766
+    python quote_stub_server.py --benchmark --symbols 500
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EXCHANGES = ("NYQ", "NMS", "PCX")
+
+
+def fake_quote(symbol, now=None):
+    """Chart meta for `symbol`: a base price from its hash plus a slow sine drift."""
+    now = time.time() if now is None else now
+    digest = hashlib.sha1(symbol.encode()).digest()
+    base = 10 + int.from_bytes(digest[:4], "big") % 49000 / 100
+    previous_close = round(base, 2)
+    price = round(base * (1 + 0.02 * math.sin(now / 600 + digest[4])), 2)
+    return {"chart": {"result": [{"meta": {
+        "symbol": symbol,
+        "currency": "USD",
+        "exchangeName": EXCHANGES[digest[5] % len(EXCHANGES)],
+        "regularMarketPrice": price,
+        "regularMarketTime": int(now),
+        "previousClose": previous_close,
+        "chartPreviousClose": previous_close,
+        "marketState": "REGULAR",
+    }}], "error": None}}
+
+
+class StubState:
+    def __init__(self, latency):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            with state.lock:
+                state.requests += 1
+            prefix = "/v8/finance/chart/"
+            path = self.path.split("?")[0]
+            if not path.startswith(prefix):
+                self._reply(404, {"error": "Not Found"})
+                return
+            symbol = path[len(prefix):].upper()
+            time.sleep(state.latency)
+            if not symbol or symbol.startswith("ZZ"):
+                self._reply(404, {"chart": {"result": None, "error": {
+                    "code": "Not Found", "description": "No data found, symbol may be delisted"}}})
+                return
+            self._reply(200, fake_quote(symbol))
+
+    return Handler
+
+
+def start_stub_server(port=0, latency=0.15):
+    """Start the stub in a daemon thread; returns (server, chart_url, state)."""
+    state = StubState(latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v8/finance/chart", state
+
+
+def benchmark(count, latency):
+    """Per-symbol serial requests (the old loader) vs QuoteService batches, cold, warm and stale."""
+    import requests
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "streamlit"))
+    from quote_service import QuoteService, chart_fetcher
+
+    symbols = [f"S{i:04d}" for i in range(count)]
+    server, url, state = start_stub_server(latency=latency)
+    print(f"{count} symbols against stub (latency {latency * 1000:.0f}ms/request)")
+    print(f"{'mode':<36}{'requests':>10}{'seconds':>10}")
+
+    serial = symbols[:min(count, 50)]
+    before = state.requests
+    start = time.perf_counter()
+    for symbol in serial:
+        requests.get(f"{url}/{symbol}", timeout=10).json()
+    elapsed = (time.perf_counter() - start) * count / len(serial)
+    print(f"{'one symbol at a time (projected)':<36}{state.requests - before:>10}{elapsed:>10.2f}")
+
+    service = QuoteService(chart_fetcher(url, workers=32), ttl=60, stale_ttl=600)
+    for label in ("get_quotes, cold cache", "get_quotes, warm cache", "get_quotes, stale (revalidating)"):
+        if label.endswith("(revalidating)"):
+            service.ttl = 0   # every cached quote is now stale but servable
+        before = state.requests
+        start = time.perf_counter()
+        quotes = service.get_quotes(symbols)
+        elapsed = time.perf_counter() - start
+        assert all(q.get('price') for q in quotes.values())
+        print(f"{label:<36}{state.requests - before:>10}{elapsed:>10.3f}")
+    while service.pending:
+        time.sleep(0.05)
+    print(f"background refresh of {service.stats['refreshes']} stale quotes finished "
+          f"after {time.perf_counter() - start:.2f}s ({state.requests - before} requests)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Yahoo Finance chart stub")
+    parser.add_argument("--serve", action="store_true", help="Run the stub in the foreground")
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark QuoteService against the stub")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.15, help="Seconds per request")
+    parser.add_argument("--symbols", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.symbols, args.latency)
+    else:
+        server, url, _ = start_stub_server(args.port, args.latency)
+        print(f"Quote stub listening on {url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -9,11 +9,13 @@ This is the ONLY way to insert data into Interactive Tables.
 Regular SQL INSERT/COPY commands do NOT work!
 """
 
+import argparse
+import gzip
 import json
 import os
+import sys
+import time
 from datetime import datetime
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
 
 # Check if snowflake-ingest streaming is available
 try:
@@ -38,9 +40,16 @@ CONFIG = {
     "role": "ACCOUNTADMIN",
 }
 
+READ_CHUNK_SIZE = 1 << 20  # characters read per refill of the incremental parser
+DEFAULT_BATCH_SIZE = 1000  # rows per insert_rows call
+NUMBER_CHARS = "0123456789.eE+-"  # what a JSON number can still continue with
+
 
 def load_private_key(path: str, passphrase: str = None):
     """Load private key for Snowflake authentication"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.backends import default_backend
+    
     with open(path, "rb") as key_file:
         private_key = serialization.load_pem_private_key(
             key_file.read(),
@@ -50,7 +59,162 @@ def load_private_key(path: str, passphrase: str = None):
     return private_key
 
 
-def stream_json_to_interactive_table(json_file_path: str, table_name: str = None):
+def _iter_json_array(f, chunk_size: int):
+    """Yield the elements of a top-level JSON array, decoding one element at a time"""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+    eof = False
+    while True:
+        # Skip whitespace and separators, refilling the buffer as needed
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+        if pos >= len(buf):
+            raise ValueError("Unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+            # A number running into the end of the buffer may go on in the next
+            # chunk ("45000000000." then "0"), so it is only complete at EOF
+            follow = end
+            while follow < len(buf) and buf[follow] in NUMBER_CHARS:
+                follow += 1
+            complete = eof or follow < len(buf)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if complete:
+            yield record
+            pos = end
+        else:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+
+def iter_json_records(json_file_path: str, chunk_size: int = READ_CHUNK_SIZE):
+    """
+    Incrementally parse records from a JSON array or NDJSON file
+    (optionally gzip-compressed, by .gz suffix)
+    
+    Only the record being decoded (plus one read chunk) is held in memory,
+    so file size does not bound what can be ingested.
+    
+    Args:
+        json_file_path: Path to a JSON array file or newline-delimited JSON
+        chunk_size: Characters read per buffer refill
+    
+    Yields:
+        One decoded record at a time
+    """
+    opener = gzip.open if json_file_path.endswith(".gz") else open
+    with opener(json_file_path, "rt", encoding="utf-8") as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        if head.startswith("["):
+            yield from _iter_json_array(f, chunk_size)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def iter_batches(records, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Group an iterable of records into lists of at most batch_size"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def create_streaming_client():
+    """Create an Ingest SDK client from CONFIG using keypair authentication"""
+    private_key = load_private_key(
+        CONFIG["private_key_path"], 
+        CONFIG["private_key_passphrase"]
+    )
+    return SnowflakeStreamingIngestClient(
+        account=CONFIG["account"],
+        user=CONFIG["user"],
+        private_key=private_key,
+        role=CONFIG["role"],
+    )
+
+
+def open_table_channel(client, table_name: str, channel_name: str = None):
+    """Open a channel to CONFIG's database/schema.table_name"""
+    return client.open_channel(
+        name=channel_name or f"{table_name}_channel",
+        database_name=CONFIG["database"],
+        schema_name=CONFIG["schema"],
+        table_name=table_name,
+    )
+
+
+def insert_batch(channel, batch):
+    """Send a batch through insert_rows, falling back to insert_row on older clients"""
+    if hasattr(channel, "insert_rows"):
+        channel.insert_rows(batch)
+    else:
+        for record in batch:
+            channel.insert_row(record)
+
+
+def stream_records(channel, records, batch_size: int = DEFAULT_BATCH_SIZE, progress_every: int = 100_000):
+    """
+    Feed records to an open channel in bounded batches
+    
+    Returns:
+        dict with records, batches, seconds, records_per_sec and peak_rss_mb
+    """
+    start = time.perf_counter()
+    sent = batches = 0
+    next_report = progress_every
+    for batch in iter_batches(records, batch_size):
+        insert_batch(channel, batch)
+        sent += len(batch)
+        batches += 1
+        if progress_every and sent >= next_report:
+            elapsed = time.perf_counter() - start
+            print(f"   Streamed {sent:,} records ({sent / elapsed:,.0f} records/sec)...")
+            next_report += progress_every
+    seconds = time.perf_counter() - start
+    return {
+        "records": sent,
+        "batches": batches,
+        "seconds": seconds,
+        "records_per_sec": sent / seconds if seconds > 0 else float("inf"),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def stream_json_to_interactive_table(json_file_path: str, table_name: str = None,
+                                     batch_size: int = DEFAULT_BATCH_SIZE, incremental: bool = True):
     """
     Stream JSON data directly to an Interactive Table
     
@@ -58,8 +222,11 @@ def stream_json_to_interactive_table(json_file_path: str, table_name: str = None
     Regular SQL INSERT/COPY does not work!
     
     Args:
-        json_file_path: Path to JSON file containing records
+        json_file_path: Path to JSON array or NDJSON file containing records
         table_name: Target table name (defaults to CONFIG["table"])
+        batch_size: Rows per insert_rows call
+        incremental: Parse records as they are streamed (constant memory);
+            False loads the whole file with json.load first
     """
     
     if not STREAMING_SDK_AVAILABLE:
@@ -82,48 +249,28 @@ def stream_json_to_interactive_table(json_file_path: str, table_name: str = None
     
     table_name = table_name or CONFIG["table"]
     
-    # Load JSON data
-    with open(json_file_path, 'r') as f:
-        records = json.load(f)
-    
-    print(f"📂 Loaded {len(records)} records from {json_file_path}")
+    if incremental:
+        records = iter_json_records(json_file_path)
+        print(f"📂 Streaming records from {json_file_path}")
+    else:
+        with open(json_file_path, 'r') as f:
+            records = json.load(f)
+        print(f"📂 Loaded {len(records)} records from {json_file_path}")
     
     try:
-        # Load private key
-        private_key = load_private_key(
-            CONFIG["private_key_path"], 
-            CONFIG["private_key_passphrase"]
-        )
-        
-        # Create streaming client
-        client = SnowflakeStreamingIngestClient(
-            account=CONFIG["account"],
-            user=CONFIG["user"],
-            private_key=private_key,
-            role=CONFIG["role"],
-        )
-        
-        # Open a channel to the Interactive Table
-        channel = client.open_channel(
-            name=f"{table_name}_channel",
-            database_name=CONFIG["database"],
-            schema_name=CONFIG["schema"],
-            table_name=table_name,
-        )
+        client = create_streaming_client()
+        channel = open_table_channel(client, table_name)
         
         # Stream records to the Interactive Table
         print(f"🚀 Streaming to {CONFIG['database']}.{CONFIG['schema']}.{table_name}...")
-        
-        for i, record in enumerate(records):
-            channel.insert_row(record)
-            
-            if (i + 1) % 100 == 0:
-                print(f"   Streamed {i + 1}/{len(records)} records...")
+        stats = stream_records(channel, records, batch_size)
         
         # Flush and close
         channel.close()
         
-        print(f"✅ Successfully streamed {len(records)} records to Interactive Table: {table_name}")
+        print(f"✅ Successfully streamed {stats['records']:,} records to Interactive Table: {table_name}")
+        print(f"   {stats['records_per_sec']:,.0f} records/sec, peak RSS {stats['peak_rss_mb']:.0f} MB")
+        return stats
         
     except FileNotFoundError:
         print(f"""
@@ -189,7 +336,36 @@ def demo_interactive_table():
     """)
 
 
+def parse_benchmark(json_file_path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Run the incremental parser and batcher without a channel; reports records/sec and peak RSS"""
+    class NullChannel:
+        def insert_rows(self, rows):
+            pass
+    
+    print(f"📂 Parsing {json_file_path} ({os.path.getsize(json_file_path) / 1e6:,.1f} MB)")
+    stats = stream_records(NullChannel(), iter_json_records(json_file_path), batch_size)
+    print(f"✅ {stats['records']:,} records in {stats['seconds']:.2f}s: "
+          f"{stats['records_per_sec']:,.0f} records/sec, peak RSS {stats['peak_rss_mb']:.0f} MB")
+    return stats
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snowpipe Streaming ingest for Interactive Tables")
+    parser.add_argument("files", nargs="*", help="JSON array or NDJSON files to stream")
+    parser.add_argument("--table", default=None, help="Target table (defaults to CONFIG['table'])")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--parse-only", action="store_true",
+                        help="Parse and batch without sending, to measure parser throughput and memory")
+    args = parser.parse_args()
+    
+    if args.files:
+        for path in args.files:
+            if args.parse_only:
+                parse_benchmark(path, args.batch_size)
+            else:
+                stream_json_to_interactive_table(path, args.table, args.batch_size)
+        sys.exit(0)
+    
     demo_interactive_table()
     
     # If you have JSON files to stream
@@ -200,3 +376,5 @@ if __name__ == "__main__":
             print(f"\n📁 Found {len(json_files)} JSON files in json_data/")
             print("To stream them to the Interactive Table, run:")
             print(f'    stream_json_to_interactive_table("json_data/{json_files[0]}")')
+            print("or keep ingesting everything that lands in json_data/ with:")
+            print("    python ingest_daemon.py --dir json_data")
@@ -0,0 +1,256 @@
+-- ============================================
+-- SETTLEMENT PROJECTION
+-- Incrementally maintained settlement rows for the Settlement Details tab
+-- ============================================
+-- The tab used to rebuild EQUITY_TRADES UNION ALL BOND_TRADES, each joined
+-- to SECURITY_MASTER_REFERENCE, on every filter change and filtered status
+-- client-side after LIMIT 1000. TRADE_SETTLEMENTS holds one row per trade
+-- with its business-day settlement date and status already resolved,
+-- indexed by (TRADE_DATE, EXCHANGE, SETTLEMENT_STATUS), and TRADE_DATES is
+-- the small date dimension behind the Trade Date filter.
+--
+-- REFRESH_TRADE_SETTLEMENTS() merges trades created since the projection's
+-- CREATED_AT watermark (the trade tables are hybrid tables, which do not
+-- support streams) and flips Pending rows to Settled once their settlement
+-- date arrives. A task runs it every minute; the app's Refresh button runs
+-- it on demand. The watermark only sees new trades, and the trade tables
+-- have no updated-at column, so a second task runs REFRESH_TRADE_SETTLEMENTS(TRUE)
+-- hourly: it re-reads every trade and the MERGE rewrites only the rows
+-- whose status or details changed (e.g. a trade cancelled after it merged).
+--
+-- Settlement dates come from streamlit/settlement_calendar.py (upload it to
+-- STREAMLIT_STAGE first, install STEP 7) via LOAD_SETTLEMENT_CALENDAR, over
+-- the same 1970-2099 span the module has holidays for. A trade whose date
+-- still falls outside the calendar gets SETTLEMENT_STATUS 'Unknown' rather
+-- than passing for Pending.
+-- ============================================
+
+USE ROLE ACCOUNTADMIN;
+USE WAREHOUSE ADHOC_WH;
+USE SCHEMA SECURITY_MASTER_DB.TRADES;
+
+-- ============================================
+-- STEP 1: Settlement calendar tables
+-- ============================================
+
+-- (asset class, exchange) -> settlement market and cycle; EXCHANGE '' is the asset class default
+CREATE OR REPLACE TABLE SETTLEMENT_CONVENTIONS (
+    ASSET_CLASS VARCHAR(50) NOT NULL,
+    EXCHANGE VARCHAR(50) NOT NULL,
+    MARKET VARCHAR(10) NOT NULL,
+    CYCLE_DAYS NUMBER(2) NOT NULL
+);
+
+-- Every calendar day -> settlement date, per market and cycle
+CREATE OR REPLACE TABLE SETTLEMENT_CALENDAR (
+    MARKET VARCHAR(10) NOT NULL,
+    CYCLE_DAYS NUMBER(2) NOT NULL,
+    TRADE_DATE DATE NOT NULL,
+    SETTLEMENT_DATE DATE NOT NULL
+)
+CLUSTER BY (MARKET, TRADE_DATE);
+
+CREATE OR REPLACE PROCEDURE LOAD_SETTLEMENT_CALENDAR(FIRST_DATE DATE, LAST_DATE DATE)
+RETURNS VARCHAR
+LANGUAGE PYTHON
+RUNTIME_VERSION = '3.11'
+PACKAGES = ('snowflake-snowpark-python', 'numpy', 'pandas')
+IMPORTS = ('@SECURITY_MASTER_DB.GOLDEN_RECORD.STREAMLIT_STAGE/settlement_calendar.py')
+HANDLER = 'load'
+AS
+$$
+import numpy as np
+import pandas as pd
+
+import settlement_calendar as sc
+
+def load(session, first_date, last_date):
+    asset_classes = sorted({asset_class for _, asset_class in sc.SETTLEMENT_CYCLES} | set(sc.DEFAULT_MARKETS))
+    conventions = pd.DataFrame(
+        [(a, e, *sc.convention(a, e)) for a in asset_classes for e in [''] + sorted(sc.EXCHANGE_MARKETS)],
+        columns=['ASSET_CLASS', 'EXCHANGE', 'MARKET', 'CYCLE_DAYS'])
+    days = np.arange(np.datetime64(first_date, 'D'), np.datetime64(last_date, 'D') + 1)
+    calendar = pd.concat([
+        pd.DataFrame({'MARKET': market, 'CYCLE_DAYS': cycle, 'TRADE_DATE': days,
+                      'SETTLEMENT_DATE': sc.add_business_days(days, cycle, market)})
+        for market, cycle in sorted(set(zip(conventions['MARKET'], conventions['CYCLE_DAYS'])))
+    ])
+    calendar['TRADE_DATE'] = calendar['TRADE_DATE'].dt.date
+    calendar['SETTLEMENT_DATE'] = calendar['SETTLEMENT_DATE'].dt.date
+    session.write_pandas(conventions, 'SETTLEMENT_CONVENTIONS', overwrite=True)
+    session.write_pandas(calendar, 'SETTLEMENT_CALENDAR', overwrite=True)
+    return f"{len(conventions)} conventions, {len(calendar)} calendar days"
+$$;
+
+-- settlement_calendar.FIRST_YEAR..LAST_YEAR
+CALL LOAD_SETTLEMENT_CALENDAR('1970-01-01', '2099-12-31');
+
+-- ============================================
+-- STEP 2: Projection and date dimension (hybrid tables)
+-- ============================================
+
+CREATE OR REPLACE HYBRID TABLE TRADE_SETTLEMENTS (
+    ASSET_CLASS VARCHAR(20) NOT NULL,
+    TRADE_ID VARCHAR(50) NOT NULL,
+    ORDER_ID NUMBER,
+    TRADE_DATE DATE,
+    TRADE_TIME VARCHAR(8),
+    CREATED_AT TIMESTAMP_NTZ,
+    SETTLEMENT_DATE DATE,
+    SETTLEMENT_STATUS VARCHAR(20),
+    SIDE VARCHAR(10),
+    TICKER VARCHAR(20),
+    ISSUER VARCHAR(500),
+    EXCHANGE VARCHAR(50),
+    QUANTITY NUMBER(38, 4),
+    PRICE NUMBER(38, 6),
+    AMOUNT_USD NUMBER(38, 2),
+    PRIMARY KEY (ASSET_CLASS, TRADE_ID),
+    INDEX IDX_SETTLEMENT_FILTERS (TRADE_DATE, EXCHANGE, SETTLEMENT_STATUS),
+    INDEX IDX_SETTLEMENT_WATERMARK (ASSET_CLASS, CREATED_AT),
+    INDEX IDX_SETTLEMENT_PENDING (SETTLEMENT_STATUS, SETTLEMENT_DATE)
+);
+
+CREATE OR REPLACE HYBRID TABLE TRADE_DATES (
+    TRADE_DATE DATE NOT NULL PRIMARY KEY,
+    EQUITY_TRADES NUMBER DEFAULT 0,
+    BOND_TRADES NUMBER DEFAULT 0
+);
+
+-- ============================================
+-- STEP 3: Incremental refresh
+-- ============================================
+
+CREATE OR REPLACE PROCEDURE REFRESH_TRADE_SETTLEMENTS(FULL_RELOAD BOOLEAN DEFAULT FALSE)
+RETURNS VARCHAR
+LANGUAGE SQL
+AS
+$$
+DECLARE
+    equity_mark TIMESTAMP_NTZ;
+    bond_mark TIMESTAMP_NTZ;
+    merged INTEGER DEFAULT 0;
+    settled INTEGER DEFAULT 0;
+BEGIN
+    -- Re-reading trades AT the watermark picks up ties; the MERGE makes that harmless
+    IF (NOT FULL_RELOAD) THEN
+        SELECT MAX(CREATED_AT) INTO :equity_mark FROM TRADE_SETTLEMENTS WHERE ASSET_CLASS = 'Equity';
+        SELECT MAX(CREATED_AT) INTO :bond_mark FROM TRADE_SETTLEMENTS WHERE ASSET_CLASS = 'Bond';
+    END IF;
+
+    CREATE OR REPLACE TEMPORARY TABLE SETTLEMENT_DELTA AS
+    WITH trades AS (
+        SELECT 'Equity' AS ASSET_CLASS, t.TRADE_ID, t.ORDER_ID, t.TRADE_DATE, t.CREATED_AT, t.STATUS, t.SIDE,
+            t.SYMBOL AS TICKER, g.ISSUER, g.PRIMARY_EXCHANGE AS EXCHANGE, t.QUANTITY, t.PRICE,
+            t.TOTAL_VALUE AS AMOUNT_USD
+        FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
+        LEFT JOIN SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_REFERENCE g
+            ON t.SYMBOL = g.PRIMARY_TICKER AND g.ASSET_CLASS = 'Equity'
+        WHERE :equity_mark IS NULL OR t.CREATED_AT >= :equity_mark
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY t.TRADE_ID ORDER BY g.LAST_MODIFIED_AT DESC NULLS LAST) = 1
+        UNION ALL
+        SELECT 'Bond', t.TRADE_ID, t.ORDER_ID, t.TRADE_DATE, t.CREATED_AT, t.STATUS, t.SIDE,
+            g.PRIMARY_TICKER, g.ISSUER, g.PRIMARY_EXCHANGE, t.FACE_VALUE, t.PRICE, t.TOTAL_VALUE
+        FROM SECURITY_MASTER_DB.TRADES.BOND_TRADES t
+        LEFT JOIN SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_REFERENCE g
+            ON t.CUSIP = g.CUSIP AND g.ASSET_CLASS = 'Fixed Income'
+        WHERE :bond_mark IS NULL OR t.CREATED_AT >= :bond_mark
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY t.TRADE_ID ORDER BY g.LAST_MODIFIED_AT DESC NULLS LAST) = 1
+    )
+    SELECT t.*,
+        TO_CHAR(t.CREATED_AT, 'HH24:MI:SS') AS TRADE_TIME,
+        k.SETTLEMENT_DATE,
+        CASE
+            WHEN t.STATUS = 'CANCELLED' THEN 'Cancelled'
+            WHEN k.SETTLEMENT_DATE IS NULL THEN 'Unknown'
+            WHEN CURRENT_DATE() >= k.SETTLEMENT_DATE THEN 'Settled'
+            ELSE 'Pending'
+        END AS SETTLEMENT_STATUS
+    FROM trades t
+    LEFT JOIN SETTLEMENT_CONVENTIONS exact
+        ON exact.ASSET_CLASS = t.ASSET_CLASS AND exact.EXCHANGE = UPPER(t.EXCHANGE)
+    JOIN SETTLEMENT_CONVENTIONS fallback
+        ON fallback.ASSET_CLASS = t.ASSET_CLASS AND fallback.EXCHANGE = ''
+    LEFT JOIN SETTLEMENT_CALENDAR k
+        ON k.MARKET = COALESCE(exact.MARKET, fallback.MARKET)
+        AND k.CYCLE_DAYS = COALESCE(exact.CYCLE_DAYS, fallback.CYCLE_DAYS)
+        AND k.TRADE_DATE = t.TRADE_DATE;
+
+    BEGIN TRANSACTION;
+
+    MERGE INTO TRADE_SETTLEMENTS s
+    USING SETTLEMENT_DELTA d
+        ON s.ASSET_CLASS = d.ASSET_CLASS AND s.TRADE_ID = d.TRADE_ID
+    -- A full reload re-reads every trade; rewrite only the rows that changed
+    WHEN MATCHED AND (
+        s.SETTLEMENT_STATUS IS DISTINCT FROM d.SETTLEMENT_STATUS OR s.SETTLEMENT_DATE IS DISTINCT FROM d.SETTLEMENT_DATE
+        OR s.ORDER_ID IS DISTINCT FROM d.ORDER_ID OR s.TRADE_DATE IS DISTINCT FROM d.TRADE_DATE
+        OR s.CREATED_AT IS DISTINCT FROM d.CREATED_AT OR s.SIDE IS DISTINCT FROM d.SIDE
+        OR s.TICKER IS DISTINCT FROM d.TICKER OR s.ISSUER IS DISTINCT FROM d.ISSUER
+        OR s.EXCHANGE IS DISTINCT FROM d.EXCHANGE OR s.QUANTITY IS DISTINCT FROM d.QUANTITY
+        OR s.PRICE IS DISTINCT FROM d.PRICE OR s.AMOUNT_USD IS DISTINCT FROM d.AMOUNT_USD
+    ) THEN UPDATE SET
+        ORDER_ID = d.ORDER_ID, TRADE_DATE = d.TRADE_DATE, TRADE_TIME = d.TRADE_TIME, CREATED_AT = d.CREATED_AT,
+        SETTLEMENT_DATE = d.SETTLEMENT_DATE, SETTLEMENT_STATUS = d.SETTLEMENT_STATUS, SIDE = d.SIDE,
+        TICKER = d.TICKER, ISSUER = d.ISSUER, EXCHANGE = d.EXCHANGE, QUANTITY = d.QUANTITY, PRICE = d.PRICE,
+        AMOUNT_USD = d.AMOUNT_USD
+    WHEN NOT MATCHED THEN INSERT (
+        ASSET_CLASS, TRADE_ID, ORDER_ID, TRADE_DATE, TRADE_TIME, CREATED_AT, SETTLEMENT_DATE, SETTLEMENT_STATUS,
+        SIDE, TICKER, ISSUER, EXCHANGE, QUANTITY, PRICE, AMOUNT_USD
+    ) VALUES (
+        d.ASSET_CLASS, d.TRADE_ID, d.ORDER_ID, d.TRADE_DATE, d.TRADE_TIME, d.CREATED_AT, d.SETTLEMENT_DATE,
+        d.SETTLEMENT_STATUS, d.SIDE, d.TICKER, d.ISSUER, d.EXCHANGE, d.QUANTITY, d.PRICE, d.AMOUNT_USD
+    );
+    merged := SQLROWCOUNT;
+
+    -- Recount only the dates the delta touched
+    MERGE INTO TRADE_DATES d
+    USING (
+        SELECT TRADE_DATE, COUNT_IF(ASSET_CLASS = 'Equity') AS EQUITY_TRADES, COUNT_IF(ASSET_CLASS = 'Bond') AS BOND_TRADES
+        FROM TRADE_SETTLEMENTS
+        WHERE TRADE_DATE IN (SELECT DISTINCT TRADE_DATE FROM SETTLEMENT_DELTA)
+        GROUP BY TRADE_DATE
+    ) c
+        ON d.TRADE_DATE = c.TRADE_DATE
+    WHEN MATCHED THEN UPDATE SET EQUITY_TRADES = c.EQUITY_TRADES, BOND_TRADES = c.BOND_TRADES
+    WHEN NOT MATCHED THEN INSERT (TRADE_DATE, EQUITY_TRADES, BOND_TRADES)
+        VALUES (c.TRADE_DATE, c.EQUITY_TRADES, c.BOND_TRADES);
+
+    UPDATE TRADE_SETTLEMENTS
+    SET SETTLEMENT_STATUS = 'Settled'
+    WHERE SETTLEMENT_STATUS = 'Pending' AND SETTLEMENT_DATE <= CURRENT_DATE();
+    settled := SQLROWCOUNT;
+
+    COMMIT;
+
+    DROP TABLE IF EXISTS SETTLEMENT_DELTA;
+    RETURN 'merged ' || merged || ', settled ' || settled;
+END;
+$$;
+
+-- Initial load
+CALL REFRESH_TRADE_SETTLEMENTS(TRUE);
+
+CREATE OR REPLACE TASK REFRESH_TRADE_SETTLEMENTS_TASK
+    WAREHOUSE = ADHOC_WH
+    SCHEDULE = '1 MINUTE'
+    AS
+    CALL REFRESH_TRADE_SETTLEMENTS(FALSE);
+
+ALTER TASK REFRESH_TRADE_SETTLEMENTS_TASK RESUME;
+
+-- Picks up changes to trades already merged (status updates, amendments)
+CREATE OR REPLACE TASK RECONCILE_TRADE_SETTLEMENTS_TASK
+    WAREHOUSE = ADHOC_WH
+    SCHEDULE = '60 MINUTE'
+    AS
+    CALL REFRESH_TRADE_SETTLEMENTS(TRUE);
+
+ALTER TASK RECONCILE_TRADE_SETTLEMENTS_TASK RESUME;
+
+-- ============================================
+-- VERIFICATION
+-- ============================================
+-- SELECT SETTLEMENT_STATUS, COUNT(*) FROM TRADE_SETTLEMENTS GROUP BY 1;       -- expect no 'Unknown'
+-- SELECT * FROM TRADE_DATES ORDER BY TRADE_DATE DESC LIMIT 10;
+-- SELECT DAYNAME(SETTLEMENT_DATE), COUNT(*) FROM TRADE_SETTLEMENTS GROUP BY 1;   -- no Sat/Sun
@@ -0,0 +1,505 @@
+"""
+FIX execution reports: encoders and columnar parsers
+
+Execution reports are plain dicts keyed by REPORT_FIELDS:
+
+    report = {'EXEC_ID': 'TRD-1A2B3C4D5E6F7A8B', 'ORDER_ID': 'ORD-5E6F7A8B', 'SIDE': 'BUY',
+              'SYMBOL': 'AAPL', 'SECURITY_ID': 'AAPL', 'ID_SOURCE': 'M', 'SECURITY_TYPE': 'CS',
+              'QUANTITY': 100, 'PRICE': 190.5, 'AMOUNT': 19050.0, 'TRADE_DATE': '2026-02-17', ...}
+
+and encode two ways:
+
+    encode_fixml(report)              <ExecRpt .../> element (FIXML 5.0 SP2)
+    fixml_document(reports)           a whole document, several reports in a <Batch>
+    encode_tagvalue(report, seq)      classic 8=FIX.4.4|9=...|35=8|...|10=ccc| bytes
+    tagvalue_log(reports)             a concatenated session log
+
+Both formats parse back into one DataFrame per call, a column per field,
+which is what reconciliation and replay want:
+
+    parse_tagvalue(data)              any number of messages in one buffer;
+                                      VALID checks BodyLength and CheckSum
+    parse_fixml(documents)            ExecRpt elements of many documents
+    iter_tagvalue(chunks)             frames from a byte stream, messages split
+                                      across chunk boundaries carried over
+    read_stage(session, stage)        frames from every file on a stage, either format
+
+Tag=value parsing does not visit messages field by field in Python:
+separators, tags and message boundaries are found with NumPy over the
+raw bytes, and only the values of mapped tags become strings. Checksums
+come from a cumulative byte sum over the buffer. Large buffers go through
+in ~1 MB pieces cut at message boundaries (PARSE_BYTES), which keeps the
+index arrays in cache.
+"""
+
+import datetime
+import itertools
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+import pandas as pd
+
+FIX_VERSION = 'FIX.4.4'
+FIXML_NAMESPACE = 'http://www.fixprotocol.org/FIXML-5-0-SP2'
+SOH = '\x01'
+EQUITY_FIX_STAGE = '@SECURITY_MASTER_DB.TRADES.FIX_STAGE'
+BOND_FIX_STAGE = '@SECURITY_MASTER_DB.TRADES.BOND_ORDERS'
+STAGE_NAME = re.compile(r'@[A-Za-z0-9_$.]+(/[A-Za-z0-9_$./=-]*)?')
+SENDER = 'SECMASTER'
+TARGET = 'EXCHANGE'
+STAGE_WORKERS = 8
+FILES_PER_CHUNK = 500
+CHUNK_BYTES = 8 * 1024 * 1024
+PARSE_BYTES = 1024 * 1024       # parse_tagvalue works through larger buffers this much at a time
+
+REPORT_FIELDS = ('EXEC_ID', 'ORDER_ID', 'SIDE', 'SYMBOL', 'SECURITY_ID', 'ID_SOURCE', 'SECURITY_TYPE',
+                 'EXCHANGE', 'ISSUER', 'QUANTITY', 'PRICE', 'YIELD', 'AMOUNT', 'CURRENCY',
+                 'TRADE_DATE', 'SETTLEMENT_DATE', 'TRANSACT_TIME')
+FRAME_COLUMNS = REPORT_FIELDS + ('SENDER', 'TARGET', 'SEQ_NUM', 'VALID', 'SOURCE')
+NUMERIC_FIELDS = ('QUANTITY', 'PRICE', 'YIELD', 'AMOUNT')
+
+SIDE_CODES = {'BUY': '1', 'SELL': '2'}
+SIDES = {code: side for side, code in SIDE_CODES.items()}
+NO_SYMBOL = '[N/A]'     # tag 55 is required; bonds identified by CUSIP carry this
+
+# Tag -> report field, in the order the encoder writes them after the header
+TAGS = {
+    37: 'ORDER_ID', 17: 'EXEC_ID', 54: 'SIDE', 55: 'SYMBOL', 48: 'SECURITY_ID', 22: 'ID_SOURCE',
+    167: 'SECURITY_TYPE', 207: 'EXCHANGE', 106: 'ISSUER', 32: 'QUANTITY', 31: 'PRICE', 236: 'YIELD',
+    381: 'AMOUNT', 15: 'CURRENCY', 75: 'TRADE_DATE', 64: 'SETTLEMENT_DATE', 60: 'TRANSACT_TIME',
+    49: 'SENDER', 56: 'TARGET', 34: 'SEQ_NUM',
+}
+
+
+# ---- encoding ---------------------------------------------------------------------------
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _date(value, separator='-'):
+    """'YYYY-MM-DD' (FIXML) or 'YYYYMMDD' (tag=value) from a date or an ISO string."""
+    if isinstance(value, (datetime.date, pd.Timestamp)):
+        return value.strftime(f'%Y{separator}%m{separator}%d')
+    text = str(value)[:10]
+    return text if separator else text.replace('-', '')
+
+
+def _timestamp(value, fixml=True):
+    if not isinstance(value, (datetime.datetime, pd.Timestamp)):
+        value = pd.Timestamp(value)
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ' if fixml else '%Y%m%d-%H:%M:%S')
+
+
+def encode_fixml(report, sender=SENDER, target=TARGET):
+    """One FIXML ExecRpt element for a fill report."""
+    sent = _timestamp(report['TRANSACT_TIME'])
+    quantity = report['QUANTITY']
+    price = report['PRICE']
+    attributes = [('Sym', report.get('SYMBOL'))]
+    if report.get('ID_SOURCE') == '1':
+        attributes.append(('CUSIP', report.get('SECURITY_ID')))
+    attributes += [('SecTyp', report.get('SECURITY_TYPE')), ('Exch', report.get('EXCHANGE')),
+                   ('ID', report.get('SECURITY_ID')), ('Src', report.get('ID_SOURCE')), ('Issr', report.get('ISSUER'))]
+    instrument = ''.join(f' {name}={quoteattr(str(value))}' for name, value in attributes if value)
+    yield_element = (f'\n        <Yield Typ="CURRENT" Yld="{report["YIELD"]}"/>'
+                     if report.get('YIELD') is not None else '')
+    return f'''    <ExecRpt ExecID={quoteattr(_text(report['EXEC_ID']))} ExecTyp="F" OrdStat="2" Side="{SIDE_CODES[report['SIDE']]}" LeavesQty="0" CumQty="{quantity}" AvgPx="{price}" TrdDt="{_date(report['TRADE_DATE'])}" TxnTm="{sent}" SettlDt="{_date(report['SETTLEMENT_DATE'])}">
+        <Hdr SID="{sender}" TID="{target}" Snt="{sent}"/>
+        <OrdID ID={quoteattr(_text(report['ORDER_ID']))}/>
+        <Instrmt{instrument}/>{yield_element}
+        <OrdQty Qty="{quantity}"/>
+        <Px Px="{price}"/>
+        <TrdCapRpt LastQty="{quantity}" LastPx="{price}"/>
+        <Amt Typ="SMTL" Amt="{report['AMOUNT']}" Ccy="{report.get('CURRENCY') or 'USD'}"/>
+        <Comm Typ="3" Comm="0.00" Ccy="{report.get('CURRENCY') or 'USD'}"/>
+        <Pty ID="{sender}" R="1"/>
+        <Pty ID="{target}" R="17"/>
+    </ExecRpt>'''
+
+
+def fixml_document(reports, sender=SENDER, target=TARGET):
+    """FIXML document with one ExecRpt, or a <Batch> of them."""
+    elements = [encode_fixml(report, sender, target) for report in reports]
+    body = elements[0] if len(elements) == 1 else '<Batch>\n' + '\n'.join(elements) + '\n</Batch>'
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<FIXML xmlns="{FIXML_NAMESPACE}" v="5.0SP2">
+{body}
+</FIXML>'''
+
+
+def encode_tagvalue(report, seq_num, sender=SENDER, target=TARGET, sending_time=None):
+    """One tag=value ExecutionReport (35=8) with BodyLength and CheckSum filled in."""
+    transact = _timestamp(report['TRANSACT_TIME'], fixml=False)
+    fields = [
+        f"35=8", f"49={sender}", f"56={target}", f"34={seq_num}", f"52={sending_time or transact}",
+        f"37={report['ORDER_ID']}", f"17={report['EXEC_ID']}", "150=F", "39=2",
+        f"54={SIDE_CODES[report['SIDE']]}", f"55={report.get('SYMBOL') or NO_SYMBOL}",
+        f"48={report['SECURITY_ID']}", f"22={report['ID_SOURCE']}", f"167={report['SECURITY_TYPE']}",
+    ]
+    if report.get('EXCHANGE'):
+        fields.append(f"207={report['EXCHANGE']}")
+    if report.get('ISSUER'):
+        fields.append(f"106={report['ISSUER']}")
+    quantity = report['QUANTITY']
+    fields += [f"38={quantity}", f"32={quantity}", f"31={report['PRICE']}", "151=0", f"14={quantity}",
+               f"6={report['PRICE']}"]
+    if report.get('YIELD') is not None:
+        fields += ["235=CURRENT", f"236={report['YIELD']}"]
+    fields += [f"381={report['AMOUNT']}", f"15={report.get('CURRENCY') or 'USD'}",
+               f"75={_date(report['TRADE_DATE'], '')}", f"64={_date(report['SETTLEMENT_DATE'], '')}",
+               f"60={transact}"]
+    # Tag=value is single-byte: characters outside latin-1 (an issuer's '€', say) go out as '?'
+    body = (SOH.join(fields) + SOH).encode('latin-1', errors='replace')
+    head = f"8={FIX_VERSION}{SOH}9={len(body)}{SOH}".encode('latin-1')
+    checksum = (sum(head) + sum(body)) % 256
+    return head + body + f"10={checksum:03d}{SOH}".encode('latin-1')
+
+
+def tagvalue_log(reports, first_seq_num=1, sender=SENDER, target=TARGET):
+    """Concatenated tag=value messages with consecutive sequence numbers."""
+    return b''.join(encode_tagvalue(report, seq_num, sender, target)
+                    for seq_num, report in enumerate(reports, first_seq_num))
+
+
+# ---- parsing ----------------------------------------------------------------------------
+
+def _finish(columns, count, date_format, time_format, source):
+    """Typed frame from raw string columns."""
+    frame = pd.DataFrame({name: columns.get(name, np.full(count, None, dtype=object))
+                          for name in FRAME_COLUMNS})
+    frame['SIDE'] = frame['SIDE'].map(SIDES)
+    frame['SYMBOL'] = frame['SYMBOL'].replace(NO_SYMBOL, None)
+    for name in NUMERIC_FIELDS:
+        frame[name] = pd.to_numeric(frame[name], errors='coerce')
+    frame['SEQ_NUM'] = pd.to_numeric(frame['SEQ_NUM'], errors='coerce').astype('Int64')
+    for name in ('TRADE_DATE', 'SETTLEMENT_DATE'):
+        frame[name] = pd.to_datetime(frame[name], format=date_format, errors='coerce')
+    frame['TRANSACT_TIME'] = pd.to_datetime(frame['TRANSACT_TIME'], format=time_format, errors='coerce')
+    frame['VALID'] = frame['VALID'].astype(bool)
+    if source is not None:
+        frame['SOURCE'] = source
+    return frame
+
+
+def _split_fields(buffer):
+    """
+    Every tag=value field in a byte buffer, located without a Python loop.
+
+    Returns (tags, value_starts, value_ends, tag_starts) for the fields that
+    have a numeric tag. The tag is the run of digits right before the first
+    '=' of the field, so newlines or log prefixes in front of 8=FIX do no harm.
+    """
+    ends = np.flatnonzero(buffer == 1)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    equals = np.append(np.flatnonzero(buffer == 61), len(buffer))
+    eq = equals[np.searchsorted(equals, starts)]
+    tags = np.zeros(len(ends), dtype=np.int64)
+    digits = np.zeros(len(ends), dtype=np.int64)
+    run = eq < ends
+    scale = 1
+    for k in range(1, 6):
+        position = eq - k
+        digit = buffer[np.maximum(position, 0)].astype(np.int64) - 48
+        run &= (position >= starts) & (digit >= 0) & (digit <= 9)
+        tags += np.where(run, digit * scale, 0)
+        digits += run
+        scale *= 10
+    keep = digits > 0
+    return tags[keep], eq[keep] + 1, ends[keep], (eq - digits)[keep]
+
+
+def _field_values(buffer, starts, ends, rows, count, as_number=False):
+    """
+    Column of `count` rows from the byte ranges [starts, ends) of `buffer`.
+
+    The values are cut out as one fixed-width byte matrix, so decoding and
+    float conversion run inside NumPy. Rows without a value are None (NaN
+    for numbers).
+    """
+    width = max(int((ends - starts).max()) if len(starts) else 1, 1)
+    index = starts[:, None] + np.arange(width)
+    chars = np.where(index < ends[:, None], buffer[np.minimum(index, len(buffer) - 1)], 0).astype(np.uint8)
+    raw = chars.view(f'S{width}').ravel()
+    if as_number:
+        column = np.full(count, np.nan)
+        try:
+            column[rows] = raw.astype(np.float64)
+        except ValueError:
+            column[rows] = pd.to_numeric(pd.Series(raw).str.decode('latin-1'), errors='coerce')
+        return column
+    try:
+        decoded = raw.astype(str)
+    except UnicodeDecodeError:
+        decoded = np.char.decode(raw, 'latin-1')
+    column = np.full(count, None, dtype=object)
+    column[rows] = decoded
+    return column
+
+
+def _message_cuts(data, size):
+    """Offsets splitting `data` into pieces of about `size` bytes, each cut right after a CheckSum field."""
+    cuts = [0]
+    while len(data) - cuts[-1] > size:
+        trailer = data.find(b'\x0110=', cuts[-1] + size)
+        end = data.find(b'\x01', trailer + 1) if trailer != -1 else -1
+        if end == -1:
+            break
+        cuts.append(end + 1)
+    if cuts[-1] < len(data):
+        cuts.append(len(data))
+    return cuts
+
+
+def parse_tagvalue(data, source=None, piece_bytes=PARSE_BYTES):
+    """
+    Every ExecutionReport in a tag=value buffer, one row per message.
+
+    Args:
+        data: bytes or str; anything between messages (newlines, log prefixes) is skipped
+        source: Value for the SOURCE column (a file name, say)
+        piece_bytes: Larger buffers are parsed this many bytes at a time, cut at
+            message boundaries; the per-field index arrays of a ~1 MB piece stay
+            in cache, which makes the whole parse about half again as fast
+
+    Returns:
+        DataFrame of FRAME_COLUMNS; VALID is False where BodyLength or CheckSum is wrong
+    """
+    if isinstance(data, str):
+        data = data.encode('latin-1', errors='replace')
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    cuts = _message_cuts(data, piece_bytes)
+    pieces = [_parse_messages(buffer[start:end]) for start, end in zip(cuts[:-1], cuts[1:])]
+    pieces = [(columns, count) for columns, count in pieces if count]
+    if not pieces:
+        return _finish({}, 0, '%Y%m%d', '%Y%m%d-%H:%M:%S', source)
+    columns = {name: np.concatenate([piece[name] for piece, _ in pieces]) for name in pieces[0][0]}
+    return _finish(columns, sum(count for _, count in pieces), '%Y%m%d', '%Y%m%d-%H:%M:%S', source)
+
+
+def _parse_messages(buffer):
+    """Raw columns and message count of one uint8 buffer of tag=value messages."""
+    tags, value_starts, value_ends, tag_starts = _split_fields(buffer)
+    message = np.cumsum(tags == 8) - 1          # every BeginString opens a message
+    inside = message >= 0
+    tags, value_starts, value_ends, tag_starts, message = (
+        tags[inside], value_starts[inside], value_ends[inside], tag_starts[inside], message[inside])
+    count = int(message[-1]) + 1 if len(message) else 0
+    if not count:
+        return {}, 0
+    numeric = {'QUANTITY', 'PRICE', 'YIELD', 'AMOUNT', 'SEQ_NUM'}
+    # Fields grouped by tag once (a radix sort on 16 bits); tags above 65535 are never mapped
+    by_tag = np.argsort(np.minimum(tags, 65535).astype(np.uint16), kind='stable')
+    sorted_tags = tags[by_tag]
+
+    def fields(tag):
+        low, high = np.searchsorted(sorted_tags, (tag, tag + 1))
+        return by_tag[low:high]
+
+    def values(tag, as_number=False):
+        selected = fields(tag)
+        return _field_values(buffer, value_starts[selected], value_ends[selected], message[selected], count,
+                             as_number)
+
+    columns = {name: values(tag, name in numeric) for tag, name in TAGS.items()}
+
+    # BodyLength counts from after the 9= field up to the CheckSum field; CheckSum is
+    # the byte sum, modulo 256, of everything before it (a uint8 running sum wraps at 256)
+    begin = np.zeros(count, dtype=np.int64)
+    begin[message[fields(8)]] = tag_starts[fields(8)]
+    body_start = np.full(count, -1, dtype=np.int64)
+    body_start[message[fields(9)]] = value_ends[fields(9)] + 1
+    trailer = np.full(count, -1, dtype=np.int64)
+    trailer[message[fields(10)]] = tag_starts[fields(10)]
+    complete = (trailer > begin) & (body_start > begin)
+    byte_sums = np.concatenate((np.zeros(1, dtype=np.uint8), np.cumsum(buffer, dtype=np.uint8)))
+    sums = byte_sums[np.where(complete, trailer, 0)] - byte_sums[np.where(complete, begin, 0)]
+    columns['VALID'] = (complete & (sums == values(10, True)) & (trailer - body_start == values(9, True)))
+    return columns, count
+
+
+def iter_tagvalue(chunks, min_bytes=CHUNK_BYTES, source=None):
+    """
+    Frames from a stream of byte chunks (a file read in blocks, say).
+
+    Buffers at least `min_bytes` before parsing; a message cut by a chunk
+    boundary is carried into the next frame.
+    """
+    buffer = b''
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) < min_bytes:
+            continue
+        cut = buffer.rfind(b'\x0110=')
+        while cut != -1 and len(buffer) < cut + 8:
+            cut = buffer.rfind(b'\x0110=', 0, cut)
+        if cut == -1:
+            continue
+        complete, buffer = buffer[:cut + 8], buffer[cut + 8:]
+        yield parse_tagvalue(complete, source)
+    if buffer.strip():
+        yield parse_tagvalue(buffer, source)
+
+
+def read_fix_log(path, chunk_size=CHUNK_BYTES):
+    """Frames from a tag=value log file, read in `chunk_size` blocks."""
+    with open(path, 'rb') as f:
+        yield from iter_tagvalue(iter(lambda: f.read(chunk_size), b''), chunk_size, source=str(path))
+
+
+def parse_fixml(documents, sources=None):
+    """
+    Every ExecRpt in `documents` (FIXML str or bytes), one row per report.
+
+    Args:
+        sources: SOURCE value per document (defaults to None)
+    """
+    rows = []
+    for document, source in zip(documents, sources if sources is not None else itertools.repeat(None)):
+        root = ET.fromstring(document)
+        ns = root.tag[:root.tag.index('}') + 1] if root.tag.startswith('{') else ''
+        for report in root.iter(f'{ns}ExecRpt'):
+            get = report.attrib.get
+            header = report.find(f'{ns}Hdr')
+            order = report.find(f'{ns}OrdID')
+            instrument = report.find(f'{ns}Instrmt')
+            amount = report.find(f'{ns}Amt')
+            yld = report.find(f'{ns}Yield')
+            instrument = instrument.attrib if instrument is not None else {}
+            rows.append((
+                get('ExecID'), order.get('ID') if order is not None else None, get('Side'),
+                instrument.get('Sym'), instrument.get('ID'), instrument.get('Src'), instrument.get('SecTyp'),
+                instrument.get('Exch'), instrument.get('Issr'),
+                get('CumQty'), get('AvgPx'), yld.get('Yld') if yld is not None else None,
+                amount.get('Amt') if amount is not None else None, amount.get('Ccy') if amount is not None else None,
+                get('TrdDt'), get('SettlDt'), get('TxnTm'),
+                header.get('SID') if header is not None else None, header.get('TID') if header is not None else None,
+                None, True, source,
+            ))
+    columns = {name: np.array([row[i] for row in rows], dtype=object) for i, name in enumerate(FRAME_COLUMNS)}
+    return _finish(columns, len(rows), '%Y-%m-%d', '%Y-%m-%dT%H:%M:%SZ', None)
+
+
+def parse_any(content, source=None):
+    """FIXML or tag=value, told apart by the first non-blank byte."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    if content.lstrip()[:1] == b'<':
+        return parse_fixml([content], [source])
+    return parse_tagvalue(content, source)
+
+
+def _sql_string(value):
+    """`value` as a single-quoted SQL string literal (LIST's PATTERN cannot be a bind variable)."""
+    return "'" + str(value).replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def read_stage(session, stage, pattern=None, files_per_chunk=FILES_PER_CHUNK, workers=STAGE_WORKERS):
+    """
+    Frames for every FIX file on `stage` ('@DB.SCHEMA.STAGE'), `files_per_chunk` files at a time.
+
+    Files are downloaded concurrently with session.file.get_stream; each
+    frame's SOURCE column names the file a report came from.
+    """
+    if not STAGE_NAME.fullmatch(stage):
+        raise ValueError(f"Not a stage name: {stage!r}")
+    listing = session.sql(f"LIST {stage}" + (f" PATTERN = {_sql_string(pattern)}" if pattern else "")).collect()
+    # LIST returns names prefixed with the lower-cased stage name
+    names = [row['name'].split('/', 1)[1] for row in listing]
+    if not names:
+        yield _finish({}, 0, None, None, None)
+        return
+
+    def fetch(name):
+        return name, session.file.get_stream(f"{stage}/{name}").read()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fix-stage") as pool:
+        for i in range(0, len(names), files_per_chunk):
+            files = list(pool.map(fetch, names[i:i + files_per_chunk]))
+            yield pd.concat([parse_any(content, name) for name, content in files], ignore_index=True)
+
+
+# ---- reconciliation ---------------------------------------------------------------------
+
+def reconcile(reports, trades, tolerance=1e-6):
+    """
+    Match parsed execution reports against booked trades.
+
+    Args:
+        reports: Frame from the parsers
+        trades: TRADE_ID, QUANTITY, PRICE (face value as QUANTITY for bonds)
+
+    Returns:
+        One row per TRADE_ID with STATUS MATCHED, BREAK (quantity or price
+        differ), MISSING_REPORT (booked, no report) or MISSING_TRADE
+    """
+    fix = (reports.loc[reports['VALID'].astype(bool), ['EXEC_ID', 'QUANTITY', 'PRICE', 'SOURCE']]
+           .drop_duplicates('EXEC_ID', keep='last')
+           .rename(columns={'EXEC_ID': 'TRADE_ID', 'QUANTITY': 'FIX_QUANTITY', 'PRICE': 'FIX_PRICE'}))
+    booked = trades[['TRADE_ID', 'QUANTITY', 'PRICE']].rename(
+        columns={'QUANTITY': 'BOOKED_QUANTITY', 'PRICE': 'BOOKED_PRICE'})
+    merged = booked.merge(fix, on='TRADE_ID', how='outer', indicator=True)
+    agree = (np.isclose(merged['FIX_QUANTITY'].astype(float), merged['BOOKED_QUANTITY'].astype(float), atol=tolerance)
+             & np.isclose(merged['FIX_PRICE'].astype(float), merged['BOOKED_PRICE'].astype(float), atol=tolerance))
+    merged['STATUS'] = np.select(
+        [merged['_merge'] == 'left_only', merged['_merge'] == 'right_only', agree],
+        ['MISSING_REPORT', 'MISSING_TRADE', 'MATCHED'], 'BREAK')
+    return merged.drop(columns='_merge')
+
+
+def _benchmark(messages=200_000):
+    import time
+
+    rng = np.random.default_rng(7)
+    now = datetime.datetime(2026, 2, 17, 14, 30)
+    symbols = np.array(['AAPL', 'MSFT', 'NVDA', 'AMZN', 'JPM', 'XOM'])
+    reports = []
+    for i in range(messages):
+        if i % 5:
+            symbol = symbols[i % len(symbols)]
+            reports.append({'EXEC_ID': f'TRD-{i:08X}', 'ORDER_ID': f'ORD-{i:08X}', 'SIDE': 'BUY' if i % 2 else 'SELL',
+                            'SYMBOL': symbol, 'SECURITY_ID': symbol, 'ID_SOURCE': 'M', 'SECURITY_TYPE': 'CS',
+                            'EXCHANGE': 'XNYS', 'QUANTITY': int(rng.integers(1, 1000)),
+                            'PRICE': round(float(rng.uniform(10, 500)), 2), 'AMOUNT': 1000.0,
+                            'TRADE_DATE': '2026-02-17', 'SETTLEMENT_DATE': '2026-02-18', 'TRANSACT_TIME': now})
+        else:
+            reports.append({'EXEC_ID': f'TRD-{i:08X}', 'ORDER_ID': f'BND-{i:08X}', 'SIDE': 'BUY', 'SYMBOL': None,
+                            'SECURITY_ID': '037833DX5', 'ID_SOURCE': '1', 'SECURITY_TYPE': 'CORP',
+                            'ISSUER': 'Apple Inc. "A&B"', 'QUANTITY': 100000, 'PRICE': 98.75, 'YIELD': 4.2,
+                            'AMOUNT': 98750.0, 'TRADE_DATE': '2026-02-17', 'SETTLEMENT_DATE': '2026-02-18',
+                            'TRANSACT_TIME': now})
+
+    def timed(label, count, func):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<38} {elapsed:6.2f} s  {count / elapsed:>10,.0f} msg/s")
+        return result
+
+    print(f"{messages:,} execution reports")
+    log = timed("encode tag=value", messages, lambda: tagvalue_log(reports))
+    frame = timed("parse tag=value (one call)", messages, lambda: parse_tagvalue(log))
+    assert len(frame) == messages and frame['VALID'].all()
+    block = 1 << 20
+    streamed = timed("parse tag=value (1 MB chunks)", messages, lambda: pd.concat(list(iter_tagvalue(
+        (log[i:i + block] for i in range(0, len(log), block)), min_bytes=block)), ignore_index=True))
+    assert len(streamed) == messages and streamed['VALID'].all()
+    corrupted = bytearray(log[:10_000])
+    corrupted[200] ^= 1
+    assert not parse_tagvalue(bytes(corrupted))['VALID'].all()
+
+    count = messages // 10
+    documents = timed("encode FIXML (one file per report)", count,
+                      lambda: [fixml_document([r]) for r in reports[:count]])
+    parsed = timed("parse FIXML (one file per report)", count, lambda: parse_fixml(documents))
+    batch = timed("encode FIXML (one <Batch>)", count, lambda: fixml_document(reports[:count]))
+    timed("parse FIXML (one <Batch>)", count, lambda: parse_fixml([batch]))
+    assert parsed['EXEC_ID'].tolist() == frame['EXEC_ID'][:count].tolist()
+    assert (parsed['ISSUER'].dropna() == 'Apple Inc. "A&B"').all()
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,754 @@
+"""
+Simulated exchange: price-time priority order books and matching
+
+The Stock/ETF ticket used to book every order at once as CONFIRMED at the
+preview price, whatever its price type or duration. Orders now go to a
+matching engine and only fills are booked:
+
+    engine = MatchingEngine()
+    make_market(engine, 'AAPL', 190.25)          # simulated liquidity around a price
+    order = engine.submit('AAPL', 'BUY', 100, LIMIT, DAY, limit=190.20)
+    order.status, order.filled, order.average_price
+    engine.take_executions()                     # fills of client orders since the last call
+
+One OrderBook per symbol. Each side keeps its price levels in a heap of
+integer ticks, with a FIFO deque of orders and the open quantity per
+level, so the best price is O(1) to read, a new level is O(log n) to add
+and a cancel is O(1): the order is zeroed in place and skipped when
+matching reaches it. Levels left empty are dropped lazily from the heap.
+
+Price types and time in force, as offered by the ticket:
+
+    MARKET         matches whatever is there; never rests
+    LIMIT          matches up to its limit, the rest rests per time in force
+    STOP           becomes MARKET once a trade prints at or through the stop
+    STOP_LIMIT     becomes LIMIT at the same trigger
+    TRAILING_STOP  stop follows the best price since entry by an amount or percent
+
+    DAY / GTC      rest until end_of_day() / until cancelled
+    IOC            the unmatched rest is cancelled
+    FOK            rejected unless the whole quantity can match at once
+    OPG / CLS      wait for the opening / closing call auction, which
+                   crosses them with the book at one price (the price that
+                   executes the most volume); anything unexecuted is cancelled
+
+Stops wait in per-side heaps keyed by trigger price. Trailing stops move
+with the market, so they are kept in a list and rechecked whenever the
+last price changes.
+
+The engine is single-threaded; the app serialises calls through `lock`.
+replay() runs a recorded flow offline with the cyclic garbage collector
+paused; the benchmark replays a million simulated actions that way.
+"""
+
+import datetime
+import gc
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+TICK = 0.01
+MARKET, LIMIT, STOP, STOP_LIMIT, TRAILING_STOP = 'MARKET', 'LIMIT', 'STOP', 'STOP_LIMIT', 'TRAILING_STOP'
+DAY, GTC, IOC, FOK, OPG, CLS = 'DAY', 'GTC', 'IOC', 'FOK', 'OPG', 'CLS'
+ORDER_TYPES = (MARKET, LIMIT, STOP, STOP_LIMIT, TRAILING_STOP)
+TIME_IN_FORCE = (DAY, GTC, IOC, FOK, OPG, CLS)
+STOP_TYPES = (STOP, STOP_LIMIT, TRAILING_STOP)
+_CONTINUOUS = (DAY, GTC, IOC, FOK)
+
+NEW, PARTIALLY_FILLED, FILLED = 'NEW', 'PARTIALLY_FILLED', 'FILLED'
+CANCELED, REJECTED = 'CANCELED', 'REJECTED'
+WAITING_TRIGGER, WAITING_AUCTION = 'WAITING_TRIGGER', 'WAITING_AUCTION'
+WORKING = (NEW, PARTIALLY_FILLED, WAITING_TRIGGER, WAITING_AUCTION)
+
+# The ticket's labels
+PRICE_TYPES = {'Market': MARKET, 'Limit': LIMIT, 'Stop': STOP, 'Stop Limit': STOP_LIMIT,
+               'Trailing Stop $': TRAILING_STOP, 'Trailing Stop %': TRAILING_STOP}
+DURATIONS = {'Good for Day': DAY, 'Good till Canceled (GTC)': GTC, 'Fill or Kill': FOK,
+             'Immediate or Cancel': IOC, 'On the Open': OPG, 'On the Close': CLS}
+ACTIONS = {'Buy': 'BUY', 'Buy to Cover': 'BUY', 'Sell': 'SELL', 'Sell Short': 'SELL'}
+
+OPEN_TIME = datetime.time(9, 30)
+CLOSE_TIME = datetime.time(16, 0)
+MAKER_LEVELS = 5
+MAKER_SIZE = 500            # shares at the best level, growing by as much per level out
+MAKER_SPREAD_BPS = 2.0
+MAX_FILLS = 100_000         # fills kept for fills_frame() in a long-running app
+CLIENT_HISTORY = 1_000      # finished client orders kept for client_frame() and status lookups
+
+_NO_LIMIT_BUY = 1 << 62     # market orders in the auction curves
+_NO_LIMIT_SELL = 0
+
+
+def to_ticks(price):
+    return None if price is None else int(round(price / TICK))
+
+
+class Order:
+    """
+    One order in the engine. Prices are held in ticks; the *_price properties give dollars.
+
+    `client` is opaque to the engine (the app keeps its order key and
+    security name there); fills of orders with a client are reported by
+    take_executions().
+    """
+
+    __slots__ = ('order_id', 'symbol', 'is_buy', 'order_type', 'tif', 'quantity', 'remaining', 'limit',
+                 'stop', 'trail_amount', 'trail_percent', 'extreme', 'status', 'filled', 'notional',
+                 'client', 'reason', 'created_at')
+
+    def __init__(self, order_id, symbol, is_buy, order_type, tif, quantity, limit, stop, trail_amount,
+                 trail_percent, client, created_at):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.is_buy = is_buy
+        self.order_type = order_type
+        self.tif = tif
+        self.quantity = quantity
+        self.remaining = quantity
+        self.limit = limit
+        self.stop = stop
+        self.trail_amount = trail_amount
+        self.trail_percent = trail_percent
+        self.extreme = None
+        self.status = NEW
+        self.filled = 0
+        self.notional = 0
+        self.client = client
+        self.reason = None
+        self.created_at = created_at
+
+    @property
+    def side(self):
+        return 'BUY' if self.is_buy else 'SELL'
+
+    @property
+    def limit_price(self):
+        return None if self.limit is None else self.limit * TICK
+
+    @property
+    def stop_price(self):
+        return None if self.stop is None else self.stop * TICK
+
+    @property
+    def average_price(self):
+        return self.notional * TICK / self.filled if self.filled else None
+
+    @property
+    def working(self):
+        return self.status in WORKING
+
+
+class OrderBook:
+    """Both sides of one symbol plus its waiting stops and auction orders."""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bid_levels = {}    # tick -> deque of orders, oldest first
+        self.bid_depth = {}     # tick -> open quantity
+        self.bid_heap = []      # -tick, so the best bid is on top
+        self.ask_levels = {}
+        self.ask_depth = {}
+        self.ask_heap = []
+        self.buy_stops = []     # (stop tick, order id, order): lowest trigger first
+        self.sell_stops = []    # (-stop tick, order id, order): highest trigger first
+        self.trailing = []
+        self.trailing_seen = None
+        self.auctions = {OPG: [], CLS: []}
+        self.last = None        # last trade (or marked) price in ticks
+
+    def best_bid(self):
+        return self._best(self.bid_heap, self.bid_levels, self.bid_depth, -1)
+
+    def best_ask(self):
+        return self._best(self.ask_heap, self.ask_levels, self.ask_depth, 1)
+
+    @staticmethod
+    def _best(heap, levels, depth, sign):
+        while heap:
+            tick = heap[0] * sign
+            if depth[tick] > 0:
+                return tick
+            heapq.heappop(heap)
+            del levels[tick], depth[tick]
+        return None
+
+    def depth(self, levels=10):
+        """Top `levels` of each side: SIDE, PRICE, QUANTITY, ORDERS."""
+        rows = []
+        for side, book_levels, depth, reverse in (('BID', self.bid_levels, self.bid_depth, True),
+                                                  ('ASK', self.ask_levels, self.ask_depth, False)):
+            ticks = sorted((t for t, q in depth.items() if q > 0), reverse=reverse)[:levels]
+            rows += [{'SIDE': side, 'PRICE': t * TICK, 'QUANTITY': depth[t],
+                      'ORDERS': sum(1 for o in book_levels[t] if o.remaining)} for t in ticks]
+        return pd.DataFrame(rows, columns=['SIDE', 'PRICE', 'QUANTITY', 'ORDERS'])
+
+
+class MatchingEngine:
+    """
+    Order books for any number of symbols.
+
+    Args:
+        max_fills: Fills kept for fills_frame() (None keeps all)
+        client_history: Finished client orders kept; older ones are evicted (working ones never are)
+    """
+
+    def __init__(self, max_fills=None, client_history=CLIENT_HISTORY):
+        self.books = {}
+        self.live = {}              # order id -> working order
+        self.client_orders = {}     # order id -> order with a client, kept a while after it finishes
+        self.client_history = client_history
+        self._prune_at = 2 * client_history
+        self.fills = deque(maxlen=max_fills)
+        self.executions = deque()   # (fill id, order, price tick, quantity) for client orders
+        self.maker_orders = {}      # symbol -> ids of the simulated market maker's quotes
+        self.lock = threading.RLock()
+        self.opened = None          # date of the last opening auction
+        self.closed = None
+        self._order_ids = itertools.count(1)
+        self._fill_ids = itertools.count(1)
+        self.stats = dict.fromkeys(('orders', 'cancelled', 'rejected', 'triggered', 'auctions'), 0)
+
+    def book(self, symbol):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+        return book
+
+    # ---- order entry --------------------------------------------------------------------
+
+    def submit(self, symbol, side, quantity, order_type=LIMIT, tif=DAY, limit=None, stop=None,
+               trail_amount=None, trail_percent=None, client=None):
+        """
+        Enter an order and match it as far as its type and time in force allow.
+
+        Args:
+            side: 'BUY' or 'SELL'
+            limit / stop: Prices in dollars (LIMIT, STOP_LIMIT / STOP, STOP_LIMIT)
+            trail_amount / trail_percent: TRAILING_STOP distance in dollars / percent
+
+        Returns:
+            The Order; REJECTED with a reason when it cannot be accepted
+        """
+        order = Order(next(self._order_ids), symbol, side == 'BUY', order_type, tif, int(quantity),
+                      None if limit is None else int(round(limit / TICK)),
+                      None if stop is None else int(round(stop / TICK)),
+                      trail_amount, trail_percent, client, time.time())
+        if client is not None:
+            self.client_orders[order.order_id] = order
+            if len(self.client_orders) > self._prune_at:
+                self._prune_clients()
+        self.stats['orders'] += 1
+        book = self.books.get(symbol) or self.book(symbol)
+        # Plain limit and market orders, nearly all of the flow, need no further checks
+        if not (order.quantity > 0 and tif in _CONTINUOUS and (order_type == MARKET or (order_type == LIMIT and order.limit))):
+            reason = self._validate(order, book)
+            if reason:
+                order.status, order.reason = REJECTED, reason
+                self.stats['rejected'] += 1
+                return order
+
+        if tif == OPG or tif == CLS:
+            order.status = WAITING_AUCTION
+            book.auctions[tif].append(order)
+            self.live[order.order_id] = order
+        elif order_type in STOP_TYPES:
+            self._park_stop(book, order)
+        else:
+            self._execute(book, order)
+        if book.buy_stops or book.sell_stops or book.trailing:
+            self._check_stops(book)
+        return order
+
+    def _prune_clients(self):
+        """Evict the oldest finished client orders beyond client_history."""
+        finished = [order_id for order_id, o in self.client_orders.items() if not o.working]
+        for order_id in finished[:len(finished) - self.client_history]:
+            del self.client_orders[order_id]
+        self._prune_at = len(self.client_orders) + self.client_history
+
+    def _validate(self, order, book):
+        if order.quantity <= 0:
+            return "Quantity must be positive"
+        if order.order_type not in ORDER_TYPES or order.tif not in TIME_IN_FORCE:
+            return f"Unknown order type {order.order_type} / time in force {order.tif}"
+        if order.order_type in (LIMIT, STOP_LIMIT) and not order.limit:
+            return "Limit price required"
+        if order.order_type in (STOP, STOP_LIMIT) and not order.stop:
+            return "Stop price required"
+        if order.order_type == TRAILING_STOP and not (order.trail_amount or order.trail_percent):
+            return "Trail amount or percent required"
+        if order.order_type in STOP_TYPES and order.tif in (OPG, CLS):
+            return "Stop orders cannot take part in an auction"
+        if order.order_type == TRAILING_STOP and book.last is None:
+            return "No last price to trail from"
+        return None
+
+    def cancel(self, order_id):
+        """Cancel a working order; returns it, or None if it is not working."""
+        order = self.live.pop(order_id, None)
+        if order is None:
+            return None
+        if order.status in (NEW, PARTIALLY_FILLED):
+            book = self.books[order.symbol]
+            depth = book.bid_depth if order.is_buy else book.ask_depth
+            depth[order.limit] -= order.remaining
+        # Stops and auction orders are dropped from their heaps and lists when reached
+        order.remaining = 0
+        order.status = CANCELED
+        self.stats['cancelled'] += 1
+        return order
+
+    # ---- matching -----------------------------------------------------------------------
+
+    def _execute(self, book, order):
+        if order.tif == FOK and not self._can_fill(book, order):
+            order.status, order.reason = REJECTED, "Fill or Kill: not enough liquidity to fill in full"
+            self.stats['rejected'] += 1
+            return
+        limit = order.limit
+        if order.is_buy:
+            opposite = book.ask_heap
+            crosses = opposite and (limit is None or opposite[0] <= limit)
+        else:
+            opposite = book.bid_heap
+            crosses = opposite and (limit is None or -opposite[0] >= limit)
+        # Empty levels linger on the heap, so the true best is never better than the top:
+        # a top that does not cross means nothing does
+        if crosses:
+            self._match(book, order)
+            if not order.remaining:
+                order.status = FILLED
+                return
+        if limit is None or order.tif == IOC or order.tif == FOK:
+            order.remaining = 0
+            order.status = CANCELED
+            order.reason = "No liquidity for the rest" if limit is None else "Immediate or Cancel: rest cancelled"
+            return
+        # Rest in the book
+        if order.is_buy:
+            levels, depth, heap, key = book.bid_levels, book.bid_depth, book.bid_heap, -limit
+        else:
+            levels, depth, heap, key = book.ask_levels, book.ask_depth, book.ask_heap, limit
+        queue = levels.get(limit)
+        if queue is None:
+            queue = levels[limit] = deque()
+            depth[limit] = 0
+            heapq.heappush(heap, key)
+        queue.append(order)
+        depth[limit] += order.remaining
+        order.status = PARTIALLY_FILLED if order.filled else NEW
+        self.live[order.order_id] = order
+
+    def _match(self, book, order):
+        """Trade `order` against the opposite side, best price first, oldest first within a price."""
+        is_buy = order.is_buy
+        if is_buy:
+            levels, depth, heap, sign = book.ask_levels, book.ask_depth, book.ask_heap, 1
+        else:
+            levels, depth, heap, sign = book.bid_levels, book.bid_depth, book.bid_heap, -1
+        limit = order.limit
+        remaining = order.remaining
+        fills, executions, live = self.fills, self.executions, self.live
+        fill_ids = self._fill_ids
+        symbol = book.symbol
+        client = order.client
+        filled = notional = 0
+        while remaining and heap:
+            tick = heap[0] * sign
+            level_depth = depth[tick]
+            if not level_depth:
+                heapq.heappop(heap)
+                del levels[tick], depth[tick]
+                continue
+            if limit is not None and (tick > limit if is_buy else tick < limit):
+                break
+            queue = levels[tick]
+            while remaining and queue:
+                resting = queue[0]
+                available = resting.remaining
+                if not available:
+                    queue.popleft()
+                    continue
+                quantity = available if available < remaining else remaining
+                fill_id = next(fill_ids)
+                if is_buy:
+                    fills.append((fill_id, symbol, tick, quantity, order.order_id, resting.order_id, 'BUY'))
+                else:
+                    fills.append((fill_id, symbol, tick, quantity, resting.order_id, order.order_id, 'SELL'))
+                remaining -= quantity
+                level_depth -= quantity
+                filled += quantity
+                notional += quantity * tick
+                resting.filled += quantity
+                resting.notional += quantity * tick
+                if quantity == available:
+                    resting.remaining = 0
+                    resting.status = FILLED
+                    queue.popleft()
+                    del live[resting.order_id]
+                else:
+                    resting.remaining = available - quantity
+                    resting.status = PARTIALLY_FILLED
+                if resting.client is not None:
+                    executions.append((fill_id, resting, tick, quantity))
+                if client is not None:
+                    executions.append((fill_id, order, tick, quantity))
+            depth[tick] = level_depth
+            book.last = tick
+        order.remaining = remaining
+        order.filled += filled
+        order.notional += notional
+
+    def _can_fill(self, book, order):
+        """Whether the opposite side holds `order.remaining` within its limit (for Fill or Kill)."""
+        if order.is_buy:
+            depth, heap, sign = book.ask_depth, book.ask_heap, 1
+        else:
+            depth, heap, sign = book.bid_depth, book.bid_heap, -1
+        limit = order.limit
+        popped, total = [], 0
+        while total < order.remaining and heap:
+            key = heapq.heappop(heap)
+            popped.append(key)
+            tick = key * sign
+            if limit is not None and (tick > limit if order.is_buy else tick < limit):
+                break
+            total += depth[tick]
+        for key in popped:
+            heapq.heappush(heap, key)
+        return total >= order.remaining
+
+    # ---- stops --------------------------------------------------------------------------
+
+    def _park_stop(self, book, order):
+        order.status = WAITING_TRIGGER
+        self.live[order.order_id] = order
+        if order.order_type == TRAILING_STOP:
+            order.extreme = book.last
+            order.stop = self._trail_stop(order)
+            book.trailing.append(order)
+        elif order.is_buy:
+            heapq.heappush(book.buy_stops, (order.stop, order.order_id, order))
+        else:
+            heapq.heappush(book.sell_stops, (-order.stop, order.order_id, order))
+
+    @staticmethod
+    def _trail_stop(order):
+        if order.trail_percent:
+            distance = order.extreme * order.trail_percent / 100
+        else:
+            distance = order.trail_amount / TICK
+        return int(round(order.extreme + distance if order.is_buy else order.extreme - distance))
+
+    def _check_stops(self, book):
+        """Trigger every stop the last price has reached; triggered orders can move the price again."""
+        while book.last is not None:
+            last = book.last
+            if book.buy_stops and book.buy_stops[0][0] <= last:
+                order = heapq.heappop(book.buy_stops)[2]
+            elif book.sell_stops and -book.sell_stops[0][0] >= last:
+                order = heapq.heappop(book.sell_stops)[2]
+            elif book.trailing and book.trailing_seen != last:
+                book.trailing_seen = last
+                triggered, waiting = [], []
+                for order in book.trailing:
+                    if order.status != WAITING_TRIGGER:
+                        continue
+                    order.extreme = max(order.extreme, last) if not order.is_buy else min(order.extreme, last)
+                    order.stop = self._trail_stop(order)
+                    (triggered if (last >= order.stop if order.is_buy else last <= order.stop) else waiting).append(order)
+                book.trailing = waiting
+                for order in triggered:
+                    self._trigger(book, order)
+                continue
+            else:
+                return
+            if order.status == WAITING_TRIGGER:
+                self._trigger(book, order)
+
+    def _trigger(self, book, order):
+        del self.live[order.order_id]
+        self.stats['triggered'] += 1
+        if order.order_type != STOP_LIMIT:
+            order.limit = None
+        self._execute(book, order)
+
+    def mark(self, symbol, price):
+        """Set the reference price of `symbol` (no trade) and trigger any stops it reaches."""
+        book = self.book(symbol)
+        book.last = to_ticks(price)
+        self._check_stops(book)
+
+    # ---- auctions and the trading day ---------------------------------------------------
+
+    def auction(self, kind, symbols=None):
+        """Run the OPG or CLS call auction in `symbols` (default all); returns shares executed."""
+        return sum(self._auction(self.books[s], kind) for s in (symbols or list(self.books)) if s in self.books)
+
+    def _auction(self, book, kind):
+        orders = [o for o in book.auctions[kind] if o.status == WAITING_AUCTION]
+        book.auctions[kind] = []
+        if not orders:
+            return 0
+        # Demand and supply at every candidate price, auction orders and the resting book together
+        bids = [(t, q) for t, q in book.bid_depth.items() if q > 0]
+        asks = [(t, q) for t, q in book.ask_depth.items() if q > 0]
+        buy_ticks = np.array([o.limit if o.limit is not None else _NO_LIMIT_BUY for o in orders if o.is_buy]
+                             + [t for t, _ in bids], dtype=np.int64)
+        buy_quantity = np.array([o.remaining for o in orders if o.is_buy] + [q for _, q in bids], dtype=np.int64)
+        sell_ticks = np.array([o.limit if o.limit is not None else _NO_LIMIT_SELL for o in orders if not o.is_buy]
+                              + [t for t, _ in asks], dtype=np.int64)
+        sell_quantity = np.array([o.remaining for o in orders if not o.is_buy] + [q for _, q in asks],
+                                 dtype=np.int64)
+        candidates = np.concatenate((buy_ticks, sell_ticks, [book.last] if book.last is not None else []))
+        candidates = np.unique(candidates[(candidates > _NO_LIMIT_SELL) & (candidates < _NO_LIMIT_BUY)]).astype(np.int64)
+        price, volume = None, 0
+        if len(candidates):
+            order = np.argsort(buy_ticks)
+            cumulative = np.concatenate(([0], np.cumsum(buy_quantity[order])))
+            demand = cumulative[-1] - cumulative[np.searchsorted(buy_ticks[order], candidates, 'left')]
+            order = np.argsort(sell_ticks)
+            cumulative = np.concatenate(([0], np.cumsum(sell_quantity[order])))
+            supply = cumulative[np.searchsorted(sell_ticks[order], candidates, 'right')]
+            executable = np.minimum(demand, supply)
+            volume = int(executable.max())
+            if volume:
+                # Most volume, then least imbalance, then closest to the last price
+                reference = book.last if book.last is not None else candidates.mean()
+                best = np.lexsort((np.abs(candidates - reference), np.abs(demand - supply), -executable))[0]
+                price = int(candidates[best])
+        if volume:
+            self._uncross(book, orders, price, volume)
+            book.last = price
+        for o in orders:
+            if o.remaining:
+                # The unexecuted rest is cancelled; a partial fill stays on the order, as after IOC
+                o.remaining = 0
+                o.status = CANCELED
+                o.reason = "Partly executed in the auction, rest cancelled" if o.filled else "Not executed in the auction"
+            self.live.pop(o.order_id, None)
+        self.stats['auctions'] += 1
+        self._check_stops(book)
+        return volume
+
+    def _uncross(self, book, orders, price, volume):
+        """Fill `volume` shares at `price`: market orders first, then by limit, then by time."""
+        def eligible(is_buy, levels, depth):
+            side = [o for o in orders if o.is_buy == is_buy and
+                    (o.limit is None or (o.limit >= price if is_buy else o.limit <= price))]
+            for tick, queue in levels.items():
+                if depth[tick] > 0 and (tick >= price if is_buy else tick <= price):
+                    side += [o for o in queue if o.remaining]
+            return sorted(side, key=lambda o: (o.limit is not None, -(o.limit or 0) if is_buy else (o.limit or 0),
+                                               o.order_id))
+
+        buys = eligible(True, book.bid_levels, book.bid_depth)
+        sells = eligible(False, book.ask_levels, book.ask_depth)
+        b = s = 0
+        while volume and b < len(buys) and s < len(sells):
+            buy, sell = buys[b], sells[s]
+            quantity = min(buy.remaining, sell.remaining, volume)
+            fill_id = next(self._fill_ids)
+            self.fills.append((fill_id, book.symbol, price, quantity, buy.order_id, sell.order_id, None))
+            for o in (buy, sell):
+                o.remaining -= quantity
+                o.filled += quantity
+                o.notional += quantity * price
+                if o.status in (NEW, PARTIALLY_FILLED):     # resting in the book
+                    (book.bid_depth if o.is_buy else book.ask_depth)[o.limit] -= quantity
+                if not o.remaining:
+                    o.status = FILLED
+                    self.live.pop(o.order_id, None)
+                elif o.status != WAITING_AUCTION:
+                    o.status = PARTIALLY_FILLED
+                if o.client is not None:
+                    self.executions.append((fill_id, o, price, quantity))
+            volume -= quantity
+            b += not buy.remaining
+            s += not sell.remaining
+
+    def end_of_day(self):
+        """Cancel day orders (and auction orders whose auction never ran); GTC orders stay."""
+        expired = [o.order_id for o in self.live.values() if o.tif in (DAY, OPG, CLS)]
+        for order_id in expired:
+            self.cancel(order_id)
+        return len(expired)
+
+    def run_session(self, now, trading_day=True):
+        """
+        Opening auction, closing auction and end of day, each once per trading day.
+
+        Args:
+            now: Exchange local time (naive datetime)
+            trading_day: Whether the exchange is open on now's date
+        """
+        today = now.date()
+        if not trading_day:
+            return
+        if now.time() >= OPEN_TIME and self.opened != today:
+            self.opened = today
+            self.auction(OPG)
+        if now.time() >= CLOSE_TIME and self.closed != today:
+            self.closed = today
+            self.auction(CLS)
+            self.end_of_day()
+
+    # ---- reporting ----------------------------------------------------------------------
+
+    def take_executions(self):
+        """Fills of client orders since the previous call: (fill id, order, price, quantity)."""
+        executions = [(fill_id, order, tick * TICK, quantity) for fill_id, order, tick, quantity in self.executions]
+        self.executions.clear()
+        return executions
+
+    def client_frame(self, working_only=False):
+        """Orders with a client, newest first."""
+        rows = [{
+            'ORDER_ID': o.order_id, 'SYMBOL': o.symbol, 'SIDE': o.side, 'TYPE': o.order_type, 'TIF': o.tif,
+            'QUANTITY': o.quantity, 'FILLED': o.filled, 'LIMIT': o.limit_price, 'STOP': o.stop_price,
+            'AVG_PRICE': o.average_price, 'STATUS': o.status, 'REASON': o.reason,
+            'CREATED_AT': pd.to_datetime(o.created_at, unit='s'),
+        } for o in reversed(self.client_orders.values()) if o.working or not working_only]
+        return pd.DataFrame(rows, columns=['ORDER_ID', 'SYMBOL', 'SIDE', 'TYPE', 'TIF', 'QUANTITY', 'FILLED',
+                                           'LIMIT', 'STOP', 'AVG_PRICE', 'STATUS', 'REASON', 'CREATED_AT'])
+
+    def fills_frame(self):
+        frame = pd.DataFrame(list(self.fills), columns=['FILL_ID', 'SYMBOL', 'PRICE', 'QUANTITY', 'BUY_ORDER_ID',
+                                                        'SELL_ORDER_ID', 'AGGRESSOR'])
+        frame['PRICE'] = frame['PRICE'] * TICK
+        return frame
+
+
+def make_market(engine, symbol, reference, levels=MAKER_LEVELS, size=MAKER_SIZE, spread_bps=MAKER_SPREAD_BPS):
+    """
+    Replace the simulated market maker's quotes in `symbol` with a ladder around `reference`.
+
+    New quotes can trade with client orders resting through them; the
+    reference then becomes the last price, which can trigger stops.
+    """
+    for order_id in engine.maker_orders.pop(symbol, ()):
+        engine.cancel(order_id)
+    center = to_ticks(reference)
+    half_spread = max(1, int(round(center * spread_bps / 20_000)))
+    ids = []
+    for level in range(levels):
+        quantity = size * (level + 1)
+        for side, tick in (('BUY', center - half_spread - level), ('SELL', center + half_spread + level)):
+            if tick > 0:
+                order = engine.submit(symbol, side, quantity, LIMIT, GTC, limit=tick * TICK)
+                if order.working:
+                    ids.append(order.order_id)
+    engine.maker_orders[symbol] = ids
+    engine.mark(symbol, reference)
+
+
+def replay(engine, flow):
+    """
+    Run a recorded order flow through `engine`, with cyclic garbage collection paused.
+
+    The engine makes no reference cycles, so reference counting frees
+    everything; pausing the collector keeps it from rescanning every live
+    order as the book grows.
+
+    Args:
+        flow: Iterable of ('NEW', ref, symbol, side, quantity, order_type, tif, limit, stop)
+              and ('CANCEL', ref) tuples; refs are the flow's own order ids
+
+    Returns:
+        dict ref -> Order
+    """
+    orders = {}
+    submit, cancel = engine.submit, engine.cancel
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        for action in flow:
+            if action[0] == 'CANCEL':
+                order = orders.get(action[1])
+                if order is not None:
+                    cancel(order.order_id)
+            else:
+                _, ref, symbol, side, quantity, order_type, tif, limit, stop = action
+                orders[ref] = submit(symbol, side, quantity, order_type, tif, limit, stop)
+    finally:
+        if collecting:
+            gc.enable()
+    return orders
+
+
+def simulated_flow(actions=1_000_000, symbols=20, seed=7):
+    """
+    Random order flow for replay(): symbols random-walk from $100, orders cluster around
+    the walk; 62% limit, 6% market, 18% cancels, 6% IOC, 3% FOK, 3% GTC, 2% stops.
+    """
+    rng = np.random.default_rng(seed)
+    names = [f"SYM{i:02d}" for i in range(symbols)]
+    symbol = rng.integers(0, symbols, actions)
+    steps = np.where(rng.random(actions) < 0.5, -1, 1) * (rng.random(actions) < 0.1)
+    mid = np.zeros(actions, dtype=np.int64)
+    for s in range(symbols):
+        mask = symbol == s
+        mid[mask] = 10_000 + np.cumsum(steps[mask])
+    buy = rng.random(actions) < 0.5
+    offset = np.rint(rng.normal(0, 6, actions)).astype(np.int64)
+    limit = np.maximum(1, mid + np.where(buy, offset - 3, offset + 3)) * TICK
+    stop = np.maximum(1, mid + np.where(buy, 5 + np.abs(offset), -5 - np.abs(offset))) * TICK
+    kind = rng.choice(7, actions, p=[0.62, 0.06, 0.18, 0.06, 0.03, 0.03, 0.02])
+    quantity = rng.integers(1, 10, actions) * 100
+    target = (rng.random(actions) * np.maximum(np.arange(actions), 1)).astype(np.int64)
+    types = [(LIMIT, DAY), (MARKET, DAY), None, (LIMIT, IOC), (LIMIT, FOK), (LIMIT, GTC), (STOP, GTC)]
+
+    flow = []
+    for i, (k, s, b, q, l, st, t) in enumerate(zip(kind.tolist(), symbol.tolist(), buy.tolist(), quantity.tolist(),
+                                                   limit.tolist(), stop.tolist(), target.tolist())):
+        if k == 2:
+            flow.append(('CANCEL', max(t, i - 5000)))      # mostly recent orders
+            continue
+        order_type, tif = types[k]
+        flow.append(('NEW', i, names[s], 'BUY' if b else 'SELL', q, order_type, tif,
+                     l if order_type == LIMIT else None, st if order_type == STOP else None))
+    return names, flow
+
+
+def _benchmark(actions=1_000_000, symbols=20):
+    names, flow = simulated_flow(actions, symbols)
+    engine = MatchingEngine()
+    for name in names:
+        make_market(engine, name, 100.0, levels=20)
+
+    start = time.perf_counter()
+    replay(engine, flow)
+    elapsed = time.perf_counter() - start
+
+    stats = engine.stats
+    print(f"{actions:,} order actions over {symbols} symbols in {elapsed:.2f} s: {actions / elapsed:,.0f} actions/s")
+    print(f"  {stats['orders']:,} orders, {stats['cancelled']:,} cancels, {len(engine.fills):,} fills, "
+          f"{stats['rejected']:,} FOK kills, {stats['triggered']:,} stops triggered, {len(engine.live):,} working")
+
+    single = MatchingEngine()
+    make_market(single, names[0], 100.0, levels=20)
+    start = time.perf_counter()
+    for i in range(100_000):
+        order = single.submit(names[0], 'BUY', 100, LIMIT, DAY, limit=99.0 - (i % 50) * TICK)
+        single.cancel(order.order_id)
+    print(f"  insert + cancel, resting away from the touch: {(time.perf_counter() - start) * 10:.2f} us per pair")
+
+    for name in names:
+        book = engine.books[name]
+        engine.submit(name, 'BUY', 500, LIMIT, OPG, limit=(book.last + 50) * TICK)
+        engine.submit(name, 'SELL', 300, MARKET, OPG)
+    start = time.perf_counter()
+    executed = engine.auction(OPG)
+    print(f"  opening auction: {executed:,} shares in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for book in engine.books.values():
+        bid, ask = book.best_bid(), book.best_ask()
+        assert bid is None or ask is None or bid < ask, "book left crossed"
+
+
+if __name__ == "__main__":
+    _benchmark()
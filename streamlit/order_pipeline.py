@@ -0,0 +1,388 @@
+"""
+Write-behind order pipeline
+
+"Place Order" used to run INSERT, then COPY INTO the FIX stage, then
+clear caches and rerun, all on the click. Now the click only submits:
+
+    ticket = pipeline.submit(Order('equity', key, {...}))   # returns at once
+    ticket.status   # QUEUED -> COMMITTED (or FAILED), ticket.latency once done
+
+A background worker drains the queue in batches. It waits `linger`
+seconds after the first order so that concurrent clicks share a batch,
+and takes up to `max_batch` orders. Each batch is:
+
+    one MERGE per trade table   orders bound as a single JSON array, so
+                                the statement text never changes
+    one FIXML file per stage    every ExecRpt of the batch in a <Batch>
+
+Orders are idempotent. TRADE_ID and ORDER_ID are derived from the
+order's key, which is minted once per previewed order. Submitting the
+same key again returns the existing ticket, and the MERGE only inserts
+TRADE_IDs that are not already booked. So a double click, a rerun or a
+retried batch never books twice. A failed MERGE is retried with backoff
+before its orders are marked FAILED. Once the MERGE succeeds the orders
+are COMMITTED: a FIXML write that still fails after its own retries is
+reported in their `error`, and never un-books them.
+
+Readers learn about commits through `generations`, a counter per trade
+table bumped after each commit. committed_tables() returns the tables
+whose generation moved since it was last called, so the app invalidates
+its caches on its own thread, once per commit for the whole process.
+"""
+
+import collections
+import datetime
+import hashlib
+import io
+import json
+import queue
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from fix_messages import BOND_FIX_STAGE, EQUITY_FIX_STAGE, fixml_document
+
+LINGER = 0.05            # seconds to wait for more orders after the first
+MAX_BATCH = 200
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5      # seconds, doubled per attempt
+LATENCY_WINDOW = 500     # committed orders kept for percentiles
+RECENT_TICKETS = 200
+MAX_TICKETS = 10_000     # finished orders kept for duplicate detection and status lookups
+
+KINDS = {
+    # kind: (merge template, trade table, FIXML stage, file prefix)
+    'equity': ('merge_equity_trades', 'EQUITY_TRADES', EQUITY_FIX_STAGE, 'FIXML_EQUITY'),
+    'bond': ('merge_bond_trades', 'BOND_TRADES', BOND_FIX_STAGE, 'FIXML_BOND'),
+}
+ORDER_PREFIXES = {'equity': 'ORD', 'bond': 'BND'}
+
+QUEUED, COMMITTED, FAILED = 'QUEUED', 'COMMITTED', 'FAILED'
+
+
+def new_order_key():
+    """Idempotency key for one order; mint it when the order is previewed, not when it is placed."""
+    return uuid.uuid4().hex
+
+
+def order_id_for(kind, key):
+    """The ORDER_ID an order with this key is booked under."""
+    return f"{ORDER_PREFIXES[kind]}-{hashlib.sha1(key.encode()).hexdigest().upper()[:8]}"
+
+
+class Order:
+    """
+    One order and its progress through the pipeline.
+
+    Args:
+        kind: 'equity' or 'bond'
+        key: Idempotency key (new_order_key())
+        fields: equity: symbol, security_name, side, quantity, price, total_value
+                bond: bond_id, cusip, issuer_name, side, face_value, price, yield_value, total_value
+                both: trade_date, settlement_date (YYYY-MM-DD) and executed_at (datetime)
+        order_id: ORDER_ID to book under instead of the key's own; the fills of one
+                  order each have a key but share the order's id
+    """
+
+    __slots__ = ('kind', 'key', 'order_id', 'trade_id', 'fields', 'status', 'error', 'attempts',
+                 'submitted_at', 'committed_at', 'batch_file')
+
+    def __init__(self, kind, key, fields, order_id=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown order kind '{kind}', expected one of {tuple(KINDS)}")
+        digest = hashlib.sha1(key.encode()).hexdigest().upper()
+        self.kind = kind
+        self.key = key
+        self.order_id = order_id or f"{ORDER_PREFIXES[kind]}-{digest[:8]}"
+        self.trade_id = f"TRD-{digest[8:24]}"  # 64 bits: every engine fill mints one
+        self.fields = fields
+        self.status = QUEUED
+        self.error = None
+        self.attempts = 0
+        self.submitted_at = None
+        self.committed_at = None
+        self.batch_file = None
+
+    @property
+    def latency(self):
+        """Seconds from submit to commit (None until committed)."""
+        return self.committed_at - self.submitted_at if self.committed_at else None
+
+    def row(self):
+        """The JSON object the MERGE template reads."""
+        f = self.fields
+        row = {'trade_id': self.trade_id, 'trade_date': f['trade_date'], 'settlement_date': f['settlement_date'],
+               'side': f['side'], 'price': float(f['price']), 'total_value': float(f['total_value'])}
+        if self.kind == 'equity':
+            row.update(symbol=f['symbol'], security_name=f['security_name'], quantity=float(f['quantity']))
+        else:
+            row.update(bond_id=f['bond_id'], cusip=f['cusip'], issuer=f['issuer_name'],
+                       face_value=float(f['face_value']), yield_value=float(f['yield_value']))
+        return row
+
+    def execution_report(self):
+        """The fill as a fix_messages report."""
+        f = self.fields
+        report = {'EXEC_ID': self.trade_id, 'ORDER_ID': self.order_id, 'SIDE': f['side'], 'PRICE': f['price'],
+                  'AMOUNT': f['total_value'], 'CURRENCY': 'USD', 'TRADE_DATE': f['trade_date'],
+                  'SETTLEMENT_DATE': f['settlement_date'], 'TRANSACT_TIME': f['executed_at']}
+        if self.kind == 'equity':
+            report.update(SYMBOL=f['symbol'], SECURITY_ID=f['symbol'], ID_SOURCE='M', SECURITY_TYPE='CS',
+                          EXCHANGE='XNYS', QUANTITY=f['quantity'])
+        else:
+            report.update(SECURITY_ID=f['cusip'], ID_SOURCE='1', SECURITY_TYPE='CORP', ISSUER=f['issuer_name'],
+                          QUANTITY=f['face_value'], YIELD=f['yield_value'])
+        return report
+
+
+class OrderPipeline:
+    """
+    Background persistence for orders.
+
+    Args:
+        runner: queries.QueryRunner (its session also writes the FIXML files)
+        linger: Seconds the worker waits for more orders after the first
+        max_batch: Orders per batch
+        max_attempts: Tries per batch before its orders are marked FAILED
+    """
+
+    def __init__(self, runner, linger=LINGER, max_batch=MAX_BATCH, max_attempts=MAX_ATTEMPTS):
+        self.runner = runner
+        self.linger = linger
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.tickets = {}       # key -> Order: every queued order and the newest finished ones
+        self._prune_at = 2 * MAX_TICKETS
+        self.recent = collections.deque(maxlen=RECENT_TICKETS)
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.generations = {table: 0 for _, table, _, _ in KINDS.values()}
+        self.applied = dict(self.generations)
+        self.stats = {'submitted': 0, 'duplicates': 0, 'committed': 0, 'failed': 0, 'batches': 0,
+                      'retries': 0, 'files': 0, 'file_errors': 0, 'last_batch_seconds': 0.0}
+        self.worker = threading.Thread(target=self._run, name="order-pipeline", daemon=True)
+        self.worker.start()
+
+    def submit(self, order):
+        """Queue `order`; an order with a key seen before returns the earlier ticket instead."""
+        with self.lock:
+            existing = self.tickets.get(order.key)
+            if existing is not None:
+                self.stats['duplicates'] += 1
+                return existing
+            order.submitted_at = time.time()
+            self.tickets[order.key] = order
+            if len(self.tickets) > self._prune_at:
+                self._prune_tickets()
+            self.recent.append(order)
+            self.stats['submitted'] += 1
+        self.queue.put(order)
+        return order
+
+    def _prune_tickets(self):
+        """
+        Forget the oldest finished orders beyond MAX_TICKETS; caller holds the lock.
+
+        A forgotten key submitted again is queued again, and its MERGE skips the
+        TRADE_ID already booked, so the trade still books only once.
+        """
+        finished = [key for key, o in self.tickets.items() if o.status != QUEUED]
+        for key in finished[:len(finished) - MAX_TICKETS]:
+            del self.tickets[key]
+        self._prune_at = len(self.tickets) + MAX_TICKETS
+
+    def pending(self):
+        with self.lock:
+            return sum(1 for order in self.recent if order.status == QUEUED)
+
+    def committed_tables(self):
+        """Trade tables written since the previous call (each reported to one caller only)."""
+        with self.lock:
+            tables = [table for table, generation in self.generations.items() if self.applied[table] != generation]
+            self.applied = dict(self.generations)
+        return tables
+
+    def flush(self, timeout=30):
+        """Block until every queued order is committed or failed (for scripts and benchmarks)."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+    # ---- worker -------------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._commit(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _commit(self, batch):
+        start = time.perf_counter()
+        by_kind = collections.defaultdict(list)
+        for order in batch:
+            by_kind[order.kind].append(order)
+        for kind, orders in by_kind.items():
+            template, table, stage, prefix = KINDS[kind]
+            # The MERGE skips TRADE_IDs already booked, so a retry after a partial failure is safe
+            error = self._retry(orders, lambda: self.runner.run(template, json.dumps([o.row() for o in orders]),
+                                                                fetch='collect'))
+            now = time.time()
+            with self.lock:
+                for order in orders:
+                    if error is None:
+                        order.status, order.committed_at = COMMITTED, now
+                        self.latencies.append(order.latency)
+                    else:
+                        order.status, order.error = FAILED, str(error)
+                if error is None:
+                    self.stats['committed'] += len(orders)
+                    self.generations[table] += 1
+                else:
+                    self.stats['failed'] += len(orders)
+            if error is not None:
+                continue
+            # The trades are booked whatever happens to the file: a failed write is
+            # reported on the orders, never turned into a failed booking
+            file_name = self._fixml_name(prefix)
+            error = self._retry((), lambda: self._write_fixml(stage, file_name, orders))
+            with self.lock:
+                for order in orders:
+                    if error is None:
+                        order.batch_file = file_name
+                    else:
+                        order.error = f"FIXML write failed: {error}"
+                self.stats['files' if error is None else 'file_errors'] += 1
+        with self.lock:
+            self.stats['batches'] += 1
+            self.stats['last_batch_seconds'] = time.perf_counter() - start
+
+    def _retry(self, orders, action):
+        """Run `action` up to max_attempts times with backoff, counting tries on `orders`; returns the last error, or None."""
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                for order in orders:
+                    order.attempts = attempt
+                action()
+                return None
+            except Exception as e:
+                error = e
+                if attempt < self.max_attempts:
+                    with self.lock:
+                        self.stats['retries'] += 1
+                    time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        return error
+
+    @staticmethod
+    def _fixml_name(prefix):
+        """
+        File name for one batch, chosen before its first write. The batch id keeps it
+        unique (fills of one order share an ORDER_ID, so that cannot), and a retry
+        overwrites its own earlier attempt rather than adding a second file.
+        """
+        now = datetime.datetime.now()
+        return f"{prefix}_BATCH_{now.strftime('%d-%b-%Y').upper()}_{now.strftime('%H-%M-%S')}_{uuid.uuid4().hex[:12].upper()}.xml"
+
+    def _write_fixml(self, stage, file_name, orders):
+        self.runner.session.file.put_stream(io.BytesIO(fixml_document([o.execution_report() for o in orders]).encode()), f"{stage}/{file_name}",
+                                            auto_compress=False, overwrite=True)
+
+    # ---- reporting ----------------------------------------------------------------------
+
+    def latency_stats(self):
+        """Submit-to-commit latency over recent orders, in milliseconds."""
+        with self.lock:
+            latencies = np.array(self.latencies)
+        if not len(latencies):
+            return {'orders': 0, 'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+        return {'orders': len(latencies), 'mean_ms': latencies.mean() * 1000,
+                'p50_ms': np.percentile(latencies, 50) * 1000, 'p95_ms': np.percentile(latencies, 95) * 1000,
+                'max_ms': latencies.max() * 1000}
+
+    def tickets_frame(self):
+        """Most recent orders first: ORDER_ID, TRADE_ID, KIND, SIDE, STATUS, LATENCY_MS, ATTEMPTS, FILE, ERROR."""
+        with self.lock:
+            rows = [{
+                'ORDER_ID': o.order_id, 'TRADE_ID': o.trade_id, 'KIND': o.kind, 'SIDE': o.fields.get('side'),
+                'SUBMITTED_AT': pd.to_datetime(o.submitted_at, unit='s'), 'STATUS': o.status,
+                'LATENCY_MS': o.latency * 1000 if o.latency is not None else None, 'ATTEMPTS': o.attempts,
+                'FILE': o.batch_file, 'ERROR': o.error,
+            } for o in reversed(self.recent)]
+        return pd.DataFrame(rows, columns=['ORDER_ID', 'TRADE_ID', 'KIND', 'SIDE', 'SUBMITTED_AT', 'STATUS',
+                                           'LATENCY_MS', 'ATTEMPTS', 'FILE', 'ERROR'])
+
+
+def _benchmark(orders=500, statement_latency=0.15):
+    """Serial INSERT + COPY per order vs the pipeline, against a session that only sleeps."""
+    from queries import QueryRunner
+
+    class SleepingSession:
+        def __init__(self):
+            self.statements = 0
+            self.lock = threading.Lock()
+            self.file = self
+
+        def _work(self):
+            with self.lock:
+                self.statements += 1
+            time.sleep(statement_latency)
+
+        def sql(self, query, params=None):
+            self._work()
+            return self
+
+        def put_stream(self, stream, location, auto_compress=False, overwrite=True):
+            self._work()
+
+        def collect(self):
+            return []
+
+    now = datetime.datetime.now()
+    fields = {'symbol': 'AAPL', 'security_name': 'Apple Inc.', 'side': 'BUY', 'quantity': 100, 'price': 190.5,
+              'total_value': 19050.0, 'trade_date': now.strftime('%Y-%m-%d'),
+              'settlement_date': now.strftime('%Y-%m-%d'), 'executed_at': now}
+
+    serial = (2 * statement_latency) * orders
+    session = SleepingSession()
+    pipeline = OrderPipeline(QueryRunner(session))
+    start = time.perf_counter()
+    submit_times = []
+    keys = [new_order_key() for _ in range(orders)]
+    for i, key in enumerate(keys):
+        t = time.perf_counter()
+        pipeline.submit(Order('equity', key, dict(fields)))
+        submit_times.append(time.perf_counter() - t)
+        if i % 50 == 49:
+            time.sleep(0.02)     # clicks arrive over time, not all at once
+    for key in keys[:50]:        # double clicks and reruns
+        pipeline.submit(Order('equity', key, dict(fields)))
+    pipeline.flush()
+    elapsed = time.perf_counter() - start
+    latency = pipeline.latency_stats()
+    print(f"{orders} orders, {statement_latency * 1000:.0f} ms per statement")
+    print(f"  serial INSERT + COPY per order: {serial:.1f} s blocking, {2 * orders} statements")
+    print(f"  pipeline: submit p95 {np.percentile(submit_times, 95) * 1e6:.0f} us, all committed after {elapsed:.2f} s, "
+          f"{session.statements} statements in {pipeline.stats['batches']} batches")
+    print(f"  commit latency p50 {latency['p50_ms']:.0f} ms, p95 {latency['p95_ms']:.0f} ms; "
+          f"{pipeline.stats['duplicates']} duplicate submits ignored, {pipeline.stats['committed']} booked")
+
+
+if __name__ == "__main__":
+    _benchmark()
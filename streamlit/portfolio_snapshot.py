@@ -0,0 +1,90 @@
+"""
+Single-pass portfolio snapshot
+
+The header metrics and the Portfolio tab used to run five queries, each
+scanning EQUITY_TRADES or BOND_TRADES (and joining SP500 twice). This
+runs one statement: EQUITY_TRADES is scanned once with GROUPING SETS for
+the per-sector and headline rollups, BOND_TRADES once for the per-sector
+bond rollup, and the two are returned as one UNION ALL frame tagged by
+LEVEL. split_snapshot() cuts that frame back into the shapes the widgets
+already expect. Per-symbol positions come from positions.PositionBook.
+"""
+
+PORTFOLIO_SNAPSHOT_QUERY = """
+    WITH SP500_SECTORS AS (
+        SELECT SYMBOL, MIN(GICS_SECTOR) AS GICS_SECTOR
+        FROM SECURITY_MASTER_DB.SECURITIES.SP500
+        GROUP BY SYMBOL
+    ),
+    EQUITY AS (
+        SELECT
+            CASE GROUPING(s.GICS_SECTOR) WHEN 0 THEN 'SECTOR' ELSE 'TOTAL' END AS LEVEL,
+            s.GICS_SECTOR AS SECTOR,
+            COUNT(*) AS TRADE_COUNT,
+            COUNT(DISTINCT t.SYMBOL) AS UNIQUE_SYMBOLS,
+            SUM(CASE WHEN t.SIDE = 'BUY' THEN t.QUANTITY ELSE 0 END) AS TOTAL_BOUGHT,
+            SUM(CASE WHEN t.SIDE = 'SELL' THEN t.QUANTITY ELSE 0 END) AS TOTAL_SOLD,
+            SUM(CASE WHEN t.SIDE = 'BUY' THEN t.TOTAL_VALUE ELSE 0 END) AS BUY_VALUE,
+            SUM(CASE WHEN t.SIDE = 'SELL' THEN t.TOTAL_VALUE ELSE 0 END) AS SELL_VALUE,
+            SUM(t.TOTAL_VALUE) AS TOTAL_VALUE,
+            AVG(t.PRICE) AS AVG_PRICE,
+            NULL::FLOAT AS AVG_YIELD
+        FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
+        LEFT JOIN SP500_SECTORS s ON t.SYMBOL = s.SYMBOL
+        GROUP BY GROUPING SETS ((s.GICS_SECTOR), ())
+    ),
+    BONDS AS (
+        SELECT
+            'BOND_SECTOR' AS LEVEL,
+            b.SECTOR,
+            COUNT(*) AS TRADE_COUNT,
+            COUNT(DISTINCT t.CUSIP) AS UNIQUE_SYMBOLS,
+            NULL AS TOTAL_BOUGHT,
+            NULL AS TOTAL_SOLD,
+            SUM(CASE WHEN t.SIDE = 'BUY' THEN t.TOTAL_VALUE ELSE 0 END) AS BUY_VALUE,
+            SUM(CASE WHEN t.SIDE = 'SELL' THEN t.TOTAL_VALUE ELSE 0 END) AS SELL_VALUE,
+            SUM(t.TOTAL_VALUE) AS TOTAL_VALUE,
+            AVG(t.PRICE) AS AVG_PRICE,
+            AVG(t.YIELD) AS AVG_YIELD
+        FROM SECURITY_MASTER_DB.TRADES.BOND_TRADES t
+        JOIN SECURITY_MASTER_DB.FIXED_INCOME.CORPORATE_BONDS b ON t.CUSIP = b.CUSIP
+        GROUP BY b.SECTOR
+    )
+    SELECT * FROM EQUITY
+    UNION ALL
+    SELECT * FROM BONDS
+"""
+
+
+def split_snapshot(snapshot):
+    """
+    Cut the UNION ALL frame into the frames the Portfolio tab renders.
+
+    Returns:
+        dict with
+            quick_metrics     TOTAL_TRADES, UNIQUE_SYMBOLS (one row)
+            sector_breakdown  per S&P 500 sector, largest TOTAL_VALUE first
+            bond_sectors      per bond sector, largest TOTAL_VALUE first
+    """
+    level = snapshot['LEVEL']
+
+    total = snapshot.loc[level == 'TOTAL', ['TRADE_COUNT', 'UNIQUE_SYMBOLS']]
+    quick_metrics = total.rename(columns={'TRADE_COUNT': 'TOTAL_TRADES'}).reset_index(drop=True)
+
+    # Symbols outside the S&P 500 roll up into a NULL sector; the sector view only covers the index
+    sectors = snapshot[(level == 'SECTOR') & snapshot['SECTOR'].notna()]
+    sector_breakdown = sectors.sort_values('TOTAL_VALUE', ascending=False)[
+        ['SECTOR', 'UNIQUE_SYMBOLS', 'TOTAL_VALUE', 'BUY_VALUE', 'SELL_VALUE']
+    ].rename(columns={'SECTOR': 'GICS_SECTOR', 'UNIQUE_SYMBOLS': 'SECURITIES_TRADED'}).reset_index(drop=True)
+
+    bonds = snapshot[level == 'BOND_SECTOR']
+    bond_sectors = bonds.sort_values('TOTAL_VALUE', ascending=False)[
+        ['SECTOR', 'TRADE_COUNT', 'TOTAL_VALUE', 'AVG_YIELD', 'AVG_PRICE']
+    ].rename(columns={'TRADE_COUNT': 'BOND_COUNT'}).reset_index(drop=True)
+
+    return {
+        'quick_metrics': quick_metrics,
+        'sector_breakdown': sector_breakdown,
+        'bond_sectors': bond_sectors,
+    }
+
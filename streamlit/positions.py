@@ -0,0 +1,299 @@
+"""
+Incremental equity position book
+
+Keeps running per-symbol state (net quantity, open lots / cost basis,
+realized P&L and the BUY/SELL totals the Portfolio tab shows) and applies
+only EQUITY_TRADES rows created after the last watermark, instead of
+re-running a GROUP BY over the whole trade table after every order.
+
+Lot accounting is either FIFO (closing trades consume the oldest open
+lots) or average cost (closing trades realize against the running
+average). Shorts are handled symmetrically: a trade larger than the open
+position closes it and opens the remainder on the other side.
+
+The watermark is (CREATED_AT, TRADE_ID), so trades sharing a timestamp
+are neither skipped nor applied twice, even when two sessions refresh at
+once. Trades inserted with a CREATED_AT
+older than the watermark are only picked up by a full load().
+
+Run this file to benchmark incremental updates against full recomputation.
+"""
+
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+LOT_METHODS = ('fifo', 'average')
+REFRESH_INTERVAL = 30  # minimum seconds between incremental refreshes
+
+TRADES_QUERY = """
+    SELECT TRADE_ID, SYMBOL, SIDE, QUANTITY, PRICE, CREATED_AT
+    FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES
+"""
+TRADES_ORDER = " ORDER BY CREATED_AT NULLS FIRST, TRADE_ID"
+DELTA_FILTER = " WHERE CREATED_AT > ? OR (CREATED_AT = ? AND TRADE_ID > ?)"
+
+SUMMARY_COLUMNS = ['SYMBOL', 'TRADE_COUNT', 'TOTAL_BOUGHT', 'TOTAL_SOLD', 'BUY_VALUE', 'SELL_VALUE',
+                   'NET_POSITION', 'AVG_PRICE', 'AVG_COST', 'COST_BASIS', 'REALIZED_PNL']
+
+
+class Position:
+    """Running state for one symbol. Quantities are signed (short < 0)."""
+
+    __slots__ = ('symbol', 'method', 'quantity', 'cost_basis', 'realized', 'lots', 'trade_count',
+                 'bought', 'sold', 'buy_value', 'sell_value', 'price_sum', 'last_price')
+
+    def __init__(self, symbol, method='fifo'):
+        self.symbol = symbol
+        self.method = method
+        self.quantity = 0
+        self.cost_basis = 0.0   # signed cost of the open position
+        self.realized = 0.0
+        self.lots = deque()     # FIFO only: [signed quantity, price], oldest first
+        self.trade_count = 0
+        self.bought = 0
+        self.sold = 0
+        self.buy_value = 0.0
+        self.sell_value = 0.0
+        self.price_sum = 0.0
+        self.last_price = None
+
+    @property
+    def avg_cost(self):
+        return self.cost_basis / self.quantity if self.quantity else None
+
+    def apply(self, side, quantity, price):
+        if side == 'BUY':
+            sign = 1
+            self.bought += quantity
+            self.buy_value += quantity * price
+        elif side == 'SELL':
+            sign = -1
+            self.sold += quantity
+            self.sell_value += quantity * price
+        else:
+            raise ValueError(f"{self.symbol}: unknown side '{side}'")
+        self.trade_count += 1
+        self.price_sum += price
+        self.last_price = price
+        if self.method == 'fifo':
+            self._apply_fifo(sign, quantity, price)
+        else:
+            self._apply_average(sign, quantity, price)
+
+    def _apply_fifo(self, sign, quantity, price):
+        remaining = quantity
+        lots = self.lots
+        while remaining and lots and (lots[0][0] > 0) != (sign > 0):
+            lot = lots[0]
+            direction = 1 if lot[0] > 0 else -1
+            closed = min(remaining, abs(lot[0]))
+            self.realized += (price - lot[1]) * closed * direction
+            self.cost_basis -= lot[1] * closed * direction
+            if closed == abs(lot[0]):
+                lots.popleft()
+            else:
+                lot[0] -= closed * direction
+            remaining -= closed
+        if remaining:
+            lots.append([remaining * sign, price])
+            self.cost_basis += remaining * sign * price
+        self.quantity += quantity * sign
+        if not self.quantity:
+            self.cost_basis = 0.0
+
+    def _apply_average(self, sign, quantity, price):
+        if not self.quantity or (self.quantity > 0) == (sign > 0):
+            self.quantity += quantity * sign
+            self.cost_basis += quantity * sign * price
+            return
+        direction = 1 if self.quantity > 0 else -1
+        avg = self.cost_basis / self.quantity
+        closed = min(quantity, abs(self.quantity))
+        self.realized += (price - avg) * closed * direction
+        self.quantity -= closed * direction
+        self.cost_basis = avg * self.quantity if self.quantity else 0.0
+        remaining = quantity - closed
+        if remaining:
+            self.quantity = remaining * sign
+            self.cost_basis = remaining * sign * price
+
+    def row(self):
+        return {
+            'SYMBOL': self.symbol,
+            'TRADE_COUNT': self.trade_count,
+            'TOTAL_BOUGHT': self.bought,
+            'TOTAL_SOLD': self.sold,
+            'BUY_VALUE': self.buy_value,
+            'SELL_VALUE': self.sell_value,
+            'NET_POSITION': self.quantity,
+            'AVG_PRICE': self.price_sum / self.trade_count if self.trade_count else None,
+            'AVG_COST': self.avg_cost,
+            'COST_BASIS': self.cost_basis,
+            'REALIZED_PNL': self.realized,
+        }
+
+
+class PositionBook:
+    """
+    Per-symbol positions over EQUITY_TRADES.
+
+    Args:
+        method: 'fifo' or 'average'
+        refresh_interval: Minimum seconds between refresh_if_stale() queries
+    """
+
+    def __init__(self, method='fifo', refresh_interval=REFRESH_INTERVAL):
+        if method not in LOT_METHODS:
+            raise ValueError(f"Unknown lot method '{method}', expected one of {LOT_METHODS}")
+        self.method = method
+        self.refresh_interval = refresh_interval
+        self.positions = {}
+        self.watermark = None   # (CREATED_AT, TRADE_ID) of the last applied trade
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+        self.lock = threading.RLock()
+        self.stats = {'full_loads': 0, 'incremental_refreshes': 0, 'trades_applied': 0,
+                      'last_refresh_trades': 0, 'last_refresh_seconds': 0.0}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def apply_trades(self, df):
+        """
+        Apply trades already ordered by (CREATED_AT, TRADE_ID); returns the count.
+
+        Rows at or below the watermark are dropped, so refreshes that
+        overlap (every session shares one book) apply each trade once.
+        """
+        if df.empty:
+            return 0
+        with self.lock:
+            if self.watermark is not None:
+                created_at, trade_id = self.watermark
+                created = df['CREATED_AT']
+                df = df[(created > created_at) | ((created == created_at) & (df['TRADE_ID'] > trade_id))]
+                if df.empty:
+                    return 0
+            positions = self.positions
+            method = self.method
+            for symbol, side, quantity, price in zip(df['SYMBOL'].tolist(), df['SIDE'].tolist(),
+                                                     df['QUANTITY'].tolist(), df['PRICE'].tolist()):
+                position = positions.get(symbol)
+                if position is None:
+                    position = positions[symbol] = Position(symbol, method)
+                position.apply(side, quantity, price)
+            created = df['CREATED_AT']
+            if created.notna().any():
+                last = df[created.notna()].iloc[-1]
+                self.watermark = (pd.Timestamp(last['CREATED_AT']), last['TRADE_ID'])
+            self.stats['trades_applied'] += len(df)
+        return len(df)
+
+    def load(self, session):
+        """Full recomputation from every trade."""
+        start = time.perf_counter()
+        df = session.sql(TRADES_QUERY + TRADES_ORDER).to_pandas()
+        with self.lock:
+            self.positions = {}
+            self.watermark = None
+            applied = self.apply_trades(df)
+            self.loaded_at = self.refreshed_at = time.time()
+            self.stats['full_loads'] += 1
+            self.stats['last_refresh_trades'] = applied
+            self.stats['last_refresh_seconds'] = time.perf_counter() - start
+        return applied
+
+    def refresh(self, session):
+        """Apply trades created since the watermark (a full load on first use)."""
+        if not self.loaded_at:
+            return {'full': True, 'trades': self.load(session)}
+        start = time.perf_counter()
+        if self.watermark is None:
+            # Everything loaded so far had no CREATED_AT; new rows always have one
+            df = session.sql(TRADES_QUERY + " WHERE CREATED_AT IS NOT NULL" + TRADES_ORDER).to_pandas()
+        else:
+            created_at, trade_id = self.watermark
+            created_at = created_at.to_pydatetime()
+            df = session.sql(TRADES_QUERY + DELTA_FILTER + TRADES_ORDER,
+                             params=[created_at, created_at, trade_id]).to_pandas()
+        with self.lock:
+            applied = self.apply_trades(df)
+            self.refreshed_at = time.time()
+            self.stats['incremental_refreshes'] += 1
+            self.stats['last_refresh_trades'] = applied
+            self.stats['last_refresh_seconds'] = time.perf_counter() - start
+        return {'full': False, 'trades': applied}
+
+    def refresh_if_stale(self, session):
+        if time.time() - self.refreshed_at >= self.refresh_interval:
+            return self.refresh(session)
+        return None
+
+    def position(self, symbol):
+        return self.positions.get(symbol)
+
+    def summary(self, top=None):
+        """One row per symbol, largest |BUY_VALUE - SELL_VALUE| first."""
+        with self.lock:
+            df = pd.DataFrame([p.row() for p in self.positions.values()], columns=SUMMARY_COLUMNS)
+        order = (df['BUY_VALUE'] - df['SELL_VALUE']).abs().sort_values(ascending=False).index
+        return df.loc[order[:top] if top else order].reset_index(drop=True)
+
+    def totals(self):
+        with self.lock:
+            positions = list(self.positions.values())
+        return {
+            'symbols': len(positions),
+            'open_positions': sum(1 for p in positions if p.quantity),
+            'realized_pnl': sum(p.realized for p in positions),
+            'cost_basis': sum(p.cost_basis for p in positions),
+            'trades': sum(p.trade_count for p in positions),
+        }
+
+
+def _synthetic_trades(n, start=0, symbols=500, seed=0):
+    import numpy as np
+    rng = np.random.default_rng(seed + start)
+    ids = np.arange(start, start + n)
+    return pd.DataFrame({
+        'TRADE_ID': [f"TRD-{i:010d}" for i in ids],
+        'SYMBOL': np.char.add('S', rng.integers(0, symbols, n).astype(str)),
+        'SIDE': np.where(rng.random(n) < 0.55, 'BUY', 'SELL'),
+        'QUANTITY': rng.integers(1, 1000, n),
+        'PRICE': np.round(rng.uniform(10, 500, n), 2),
+        'CREATED_AT': pd.Timestamp('2024-01-01') + pd.to_timedelta(ids, unit='ms'),
+    })
+
+
+def _benchmark(sizes=(10_000, 100_000, 1_000_000), delta=100):
+    """Cost of applying `delta` new trades vs recomputing positions from scratch."""
+    print(f"{'trades':>10}{'full replay':>14}{'GROUP BY':>12}{'+' + str(delta) + ' trades':>14}")
+    for n in sizes:
+        history = _synthetic_trades(n)
+        new = _synthetic_trades(delta, start=n)
+        for method in LOT_METHODS:
+            book = PositionBook(method)
+            start = time.perf_counter()
+            book.apply_trades(history)
+            full = time.perf_counter() - start
+            start = time.perf_counter()
+            book.apply_trades(new)
+            incremental = time.perf_counter() - start
+            if method == 'fifo':
+                # What the old query did, done locally on the same rows
+                both = pd.concat([history, new])
+                start = time.perf_counter()
+                both.assign(BUY=both['SIDE'] == 'BUY').groupby('SYMBOL').agg(
+                    TRADE_COUNT=('TRADE_ID', 'size'), AVG_PRICE=('PRICE', 'mean'), BUYS=('BUY', 'sum'))
+                group_by = time.perf_counter() - start
+                print(f"{n:>10,}{full * 1000:>12,.0f}ms{group_by * 1000:>10,.0f}ms"
+                      f"{incremental * 1000:>12,.2f}ms  ({method})")
+            else:
+                print(f"{'':>10}{full * 1000:>12,.0f}ms{'':>12}{incremental * 1000:>12,.2f}ms  ({method})")
+
+
+if __name__ == "__main__":
+    _benchmark()
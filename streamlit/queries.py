@@ -0,0 +1,264 @@
+"""
+Named, versioned SQL templates with bound parameters
+
+Every statement the app builds from user input is registered here once,
+with `?` placeholders, and run through a QueryRunner:
+
+    runner = QueryRunner(session)
+    runner.run('lookup_isin_external', isin)                  # DataFrame
+    runner.run('merge_equity_trades', orders_json, fetch='collect')
+
+The text sent to the warehouse is the same for every symbol, date or
+price, so compilation is reused and identical templates with identical
+binds are served from the warehouse result cache; values never enter
+the SQL text, so quoting and injection stop being a concern. Each
+template carries a `/* snowtrade:<name>:v<version> */` tag, which finds
+its runs in QUERY_HISTORY. Bump the version whenever the SQL changes.
+
+The runner keeps latency statistics per template (calls, errors, rows,
+mean, p95, max over a rolling window) for the whole server process;
+query_stats() lists them slowest first.
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+LATENCY_WINDOW = 200    # most recent runs kept per template for percentiles
+
+QUERIES = {}
+
+
+class QueryTemplate:
+    def __init__(self, name, version, sql):
+        self.name = name
+        self.version = version
+        self.sql = f"/* snowtrade:{name}:v{version} */\n{sql.strip()}"
+        self.binds = sql.count('?')
+
+    @property
+    def key(self):
+        return f"{self.name}:v{self.version}"
+
+
+def register(name, version, sql):
+    """Add a template to QUERIES; a name can be registered once."""
+    if name in QUERIES:
+        raise ValueError(f"Query template '{name}' is already registered")
+    QUERIES[name] = QueryTemplate(name, version, sql)
+    return QUERIES[name]
+
+
+def _bind(value):
+    """Plain Python values for the connector: NumPy scalars unwrapped, NaN as NULL."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class _Stats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=LATENCY_WINDOW)
+        self.last_run = None
+
+
+class QueryRunner:
+    """
+    Runs registered templates on a Snowpark session and times them.
+
+    Args:
+        session: Snowpark session
+        registry: Templates by name (defaults to QUERIES)
+    """
+
+    def __init__(self, session, registry=None):
+        self.session = session
+        self.registry = QUERIES if registry is None else registry
+        self.lock = threading.Lock()
+        self.stats = {}         # template key -> _Stats
+
+    def run(self, name, *params, fetch='to_pandas'):
+        """
+        Execute template `name` with `params` bound in order.
+
+        Args:
+            fetch: 'to_pandas' (DataFrame) or 'collect' (list of Rows)
+        """
+        template = self.registry[name]
+        if len(params) != template.binds:
+            raise ValueError(f"Query '{name}' takes {template.binds} parameters, got {len(params)}")
+        start = time.perf_counter()
+        failed = False
+        rows = 0
+        try:
+            result = getattr(self.session.sql(template.sql, params=[_bind(p) for p in params]), fetch)()
+            rows = len(result)
+            return result
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(template.key, time.perf_counter() - start, rows, failed)
+
+    def _record(self, key, seconds, rows, failed):
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = _Stats()
+            stats.calls += 1
+            stats.errors += failed
+            stats.rows += rows
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.recent.append(seconds)
+            stats.last_run = time.time()
+
+    def query_stats(self):
+        """One row per template run so far, slowest mean first."""
+        with self.lock:
+            rows = [{
+                'QUERY': key,
+                'CALLS': s.calls,
+                'ERRORS': s.errors,
+                'ROWS': s.rows,
+                'MEAN_MS': s.total / s.calls * 1000,
+                'P95_MS': float(np.percentile(s.recent, 95)) * 1000,
+                'MAX_MS': s.max * 1000,
+                'LAST_RUN': pd.to_datetime(s.last_run, unit='s'),
+            } for key, s in self.stats.items()]
+        frame = pd.DataFrame(rows, columns=['QUERY', 'CALLS', 'ERRORS', 'ROWS', 'MEAN_MS', 'P95_MS', 'MAX_MS',
+                                            'LAST_RUN'])
+        return frame.sort_values('MEAN_MS', ascending=False, ignore_index=True)
+
+
+# ---- templates --------------------------------------------------------------------------
+
+register('lookup_isin_external', 1, """
+    SELECT
+        RESULT:success::boolean as success,
+        RESULT:name::string as name,
+        RESULT:ticker::string as ticker,
+        RESULT:isin::string as isin,
+        RESULT:cusip::string as cusip,
+        RESULT:sedol::string as sedol,
+        RESULT:figi::string as figi,
+        RESULT:exchange::string as exchange,
+        RESULT:security_type::string as security_type,
+        RESULT:error::string as error
+    FROM (SELECT SECURITY_MASTER_DB.GOLDEN_RECORD.LOOKUP_ISIN_EXTERNAL(?) as RESULT)
+""")
+
+register('insert_security_master_reference', 1, """
+    INSERT INTO SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_REFERENCE
+    (GLOBAL_SECURITY_ID, ISSUER, ASSET_CLASS, PRIMARY_TICKER, PRIMARY_EXCHANGE,
+     ISIN, CUSIP, SEDOL, CURRENCY, STATUS, GOLDEN_SOURCE, LAST_VALIDATED, CREATED_AT, CREATED_BY)
+    SELECT
+        'GSID_' || SECURITY_MASTER_DB.GOLDEN_RECORD.GSID_SEQ.NEXTVAL,
+        ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+        CURRENT_TIMESTAMP(),
+        CURRENT_TIMESTAMP(),
+        CURRENT_USER()
+""")
+
+# The order pipeline books a batch of orders per statement: one JSON array bound,
+# only TRADE_IDs not already booked inserted, so a retried batch never books twice
+register('merge_equity_trades', 1, """
+    MERGE INTO SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
+    USING (
+        SELECT
+            o.value:trade_id::VARCHAR AS TRADE_ID,
+            o.value:trade_date::DATE AS TRADE_DATE,
+            o.value:settlement_date::DATE AS SETTLEMENT_DATE,
+            o.value:symbol::VARCHAR AS SYMBOL,
+            o.value:security_name::VARCHAR AS SECURITY_NAME,
+            o.value:side::VARCHAR AS SIDE,
+            o.value:quantity::NUMBER(18, 4) AS QUANTITY,
+            o.value:price::NUMBER(18, 4) AS PRICE,
+            o.value:total_value::NUMBER(18, 2) AS TOTAL_VALUE
+        FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) o
+    ) s
+    ON t.TRADE_ID = s.TRADE_ID
+    WHEN NOT MATCHED THEN INSERT (
+        TRADE_ID, TRADE_DATE, SETTLEMENT_DATE, SYMBOL, SECURITY_NAME,
+        SIDE, QUANTITY, PRICE, TOTAL_VALUE, CURRENCY, EXCHANGE,
+        COUNTERPARTY, TRADER, STATUS
+    ) VALUES (
+        s.TRADE_ID, s.TRADE_DATE, s.SETTLEMENT_DATE, s.SYMBOL, s.SECURITY_NAME,
+        s.SIDE, s.QUANTITY, s.PRICE, s.TOTAL_VALUE, 'USD', 'NYSE',
+        'INTERNAL', 'CURRENT_USER', 'CONFIRMED'
+    )
+""")
+
+register('merge_bond_trades', 1, """
+    MERGE INTO SECURITY_MASTER_DB.TRADES.BOND_TRADES t
+    USING (
+        SELECT
+            o.value:trade_id::VARCHAR AS TRADE_ID,
+            o.value:trade_date::DATE AS TRADE_DATE,
+            o.value:settlement_date::DATE AS SETTLEMENT_DATE,
+            o.value:bond_id::VARCHAR AS BOND_ID,
+            o.value:cusip::VARCHAR AS CUSIP,
+            o.value:issuer::VARCHAR AS ISSUER,
+            o.value:side::VARCHAR AS SIDE,
+            o.value:face_value::NUMBER(18, 2) AS FACE_VALUE,
+            o.value:price::NUMBER(18, 4) AS PRICE,
+            o.value:yield_value::NUMBER(10, 4) AS YIELD,
+            o.value:total_value::NUMBER(18, 2) AS TOTAL_VALUE
+        FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) o
+    ) s
+    ON t.TRADE_ID = s.TRADE_ID
+    WHEN NOT MATCHED THEN INSERT (
+        TRADE_ID, TRADE_DATE, SETTLEMENT_DATE, BOND_ID, CUSIP, ISSUER,
+        SIDE, FACE_VALUE, PRICE, YIELD, TOTAL_VALUE, CURRENCY,
+        COUNTERPARTY, TRADER, STATUS
+    ) VALUES (
+        s.TRADE_ID, s.TRADE_DATE, s.SETTLEMENT_DATE, s.BOND_ID, s.CUSIP, s.ISSUER,
+        s.SIDE, s.FACE_VALUE, s.PRICE, s.YIELD, s.TOTAL_VALUE, 'USD',
+        'INTERNAL', 'CURRENT_USER', 'CONFIRMED'
+    )
+""")
+
+# Booked side of the FIX reconciliation: trades the app placed (TRD- ids) since a date
+register('booked_trades_since', 1, """
+    SELECT TRADE_ID, QUANTITY, PRICE
+    FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES
+    WHERE TRADE_DATE >= ?::DATE AND TRADE_ID LIKE 'TRD-%'
+    UNION ALL
+    SELECT TRADE_ID, FACE_VALUE AS QUANTITY, PRICE
+    FROM SECURITY_MASTER_DB.TRADES.BOND_TRADES
+    WHERE TRADE_DATE >= ?::DATE AND TRADE_ID LIKE 'TRD-%'
+""")
+
+# Settlement Details reads the projection from sql/setup_settlement_projection.sql;
+# optional filters bind NULL to switch off, each value bound twice
+register('trade_settlements', 1, """
+    SELECT ORDER_ID, ASSET_CLASS, TRADE_DATE, TRADE_TIME, SETTLEMENT_DATE, SETTLEMENT_STATUS,
+        SIDE, TICKER, ISSUER, EXCHANGE, QUANTITY, PRICE, AMOUNT_USD
+    FROM SECURITY_MASTER_DB.TRADES.TRADE_SETTLEMENTS
+    WHERE (?::DATE IS NULL OR TRADE_DATE = ?::DATE)
+      AND (?::VARCHAR IS NULL OR EXCHANGE = ?::VARCHAR)
+      AND (?::VARCHAR IS NULL OR SETTLEMENT_STATUS = ?::VARCHAR)
+      AND (?::VARCHAR IS NULL OR ASSET_CLASS = ?::VARCHAR)
+    ORDER BY ORDER_ID DESC
+    LIMIT 1000
+""")
+
+register('trade_dates', 1, """
+    SELECT TRADE_DATE
+    FROM SECURITY_MASTER_DB.TRADES.TRADE_DATES
+    ORDER BY TRADE_DATE DESC
+""")
+
+register('refresh_trade_settlements', 1, """
+    CALL SECURITY_MASTER_DB.TRADES.REFRESH_TRADE_SETTLEMENTS(?)
+""")
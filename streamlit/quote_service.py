@@ -0,0 +1,231 @@
+"""
+Batched live quote service
+
+get_live_stock_price(symbol) used to run one GET_STOCK_PRICE query per
+symbol, each a warehouse round trip plus a synchronous Yahoo request,
+cached per symbol in st.cache_data. QuoteService serves any number of
+symbols in one call:
+
+    quotes = service.get_quotes(['AAPL', 'MSFT', ...])   # symbol -> quote dict
+
+Symbols that are not cached are fetched together, in batches of
+`batch_size` run concurrently, through the GET_STOCK_PRICES table
+function (which itself fetches its symbols concurrently). One service
+instance is shared by every session of the app.
+
+Cache entries are fresh for `ttl` seconds. After that and up to
+`stale_ttl` they are still served immediately while one background
+refresh per symbol runs (stale-while-revalidate); only older or missing
+symbols make the caller wait, and with get_quotes(..., wait=False) not
+even those. A failed fetch never replaces a cached quote, so a Yahoo
+outage degrades to slightly older prices rather than errors.
+
+Fetchers are callables(symbols) -> {symbol: quote}:
+    snowflake_fetcher(session)   GET_STOCK_PRICES table function
+    chart_fetcher(base_url)      Yahoo-compatible chart endpoint over HTTP,
+                                 e.g. python/quote_stub_server.py offline
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+QUOTE_TTL = 30          # seconds a quote is served as fresh
+QUOTE_STALE_TTL = 300   # seconds a quote may be served while it is refreshed
+BATCH_SIZE = 100        # symbols per fetcher call
+FETCH_WORKERS = 4
+HTTP_TIMEOUT = 10
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart"
+
+QUOTE_FIELDS = ('symbol', 'price', 'previous_close', 'market_state', 'exchange', 'quote_time')
+
+BATCH_QUOTE_QUERY = """
+    SELECT SYMBOL, PRICE, PREVIOUS_CLOSE, MARKET_STATE, EXCHANGE, QUOTE_TIME, ERROR
+    FROM TABLE(SECURITY_MASTER_DB.TRADES.GET_STOCK_PRICES(SPLIT(?, ',')))
+"""
+
+
+def parse_chart(symbol, payload):
+    """Quote dict from a Yahoo v8 chart response (same keys as GET_STOCK_PRICE)."""
+    result = (payload.get('chart', {}).get('result') or [{}])[0]
+    meta = result.get('meta', {})
+    market_time = meta.get('regularMarketTime')
+    return {
+        'symbol': symbol,
+        'price': meta.get('regularMarketPrice'),
+        'previous_close': meta.get('previousClose', meta.get('chartPreviousClose')),
+        'market_state': meta.get('marketState'),
+        'exchange': meta.get('exchangeName'),
+        'quote_time': time.strftime('%H:%M:%S', time.gmtime(market_time)) if market_time else '',
+    }
+
+
+def snowflake_fetcher(session):
+    """Fetch a batch through the GET_STOCK_PRICES table function: one query per batch."""
+    def fetch(symbols):
+        rows = session.sql(BATCH_QUOTE_QUERY, params=[','.join(symbols)]).to_pandas()
+        quotes = {}
+        for row in rows.to_dict('records'):
+            if row.get('ERROR'):
+                quotes[row['SYMBOL']] = {'symbol': row['SYMBOL'], 'error': row['ERROR']}
+            else:
+                quotes[row['SYMBOL']] = {field: row.get(field.upper()) for field in QUOTE_FIELDS}
+        return quotes
+    return fetch
+
+
+def chart_fetcher(base_url=YAHOO_CHART_URL, workers=16, timeout=HTTP_TIMEOUT):
+    """Fetch a batch straight from a Yahoo-compatible chart endpoint, `workers` requests at a time."""
+    import requests
+
+    http = requests.Session()
+    http.mount(base_url, requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote-http")
+
+    def one(symbol):
+        try:
+            response = http.get(f"{base_url}/{symbol}", headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout)
+            if response.status_code == 200:
+                return parse_chart(symbol, response.json())
+            return {'symbol': symbol, 'error': f'API error {response.status_code}'}
+        except Exception as e:
+            return {'symbol': symbol, 'error': str(e)}
+
+    def fetch(symbols):
+        return {quote['symbol']: quote for quote in pool.map(one, symbols)}
+    return fetch
+
+
+class QuoteService:
+    """
+    Shared quote cache with batch fetching.
+
+    Args:
+        fetch: Callable(list of symbols) -> {symbol: quote dict}
+        ttl: Seconds a quote is fresh
+        stale_ttl: Seconds a quote may be served while it is refreshed in the background
+        batch_size: Symbols per fetch call
+        workers: Fetch calls run concurrently
+        on_lookup: Optional callable(hit) told about every symbol requested
+    """
+
+    def __init__(self, fetch, ttl=QUOTE_TTL, stale_ttl=QUOTE_STALE_TTL, batch_size=BATCH_SIZE,
+                 workers=FETCH_WORKERS, on_lookup=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.batch_size = batch_size
+        self.on_lookup = on_lookup
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quotes")
+        self.quotes = {}        # symbol -> (fetched_at, quote)
+        self.pending = {}       # symbol -> future of the batch fetching it
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'hits': 0, 'stale_hits': 0, 'misses': 0,
+                      'fetches': 0, 'symbols_fetched': 0, 'errors': 0, 'refreshes': 0}
+
+    def _fetch_batch(self, symbols):
+        try:
+            quotes = self.fetch(symbols)
+        except Exception as e:
+            quotes = {s: {'symbol': s, 'error': str(e)} for s in symbols}
+        now = time.time()
+        with self.lock:
+            self.stats['fetches'] += 1
+            self.stats['symbols_fetched'] += len(symbols)
+            for symbol in symbols:
+                quote = quotes.get(symbol) or {'symbol': symbol, 'error': 'No quote returned'}
+                if quote.get('error') or quote.get('price') is None:
+                    self.stats['errors'] += 1
+                else:
+                    self.quotes[symbol] = (now, quote)
+                self.pending.pop(symbol, None)
+        return quotes
+
+    def _submit(self, symbols):
+        """Start fetches for symbols nobody is fetching yet; caller holds the lock."""
+        futures = {}
+        todo = [s for s in symbols if s not in self.pending]
+        for i in range(0, len(todo), self.batch_size):
+            batch = todo[i:i + self.batch_size]
+            future = self.executor.submit(self._fetch_batch, batch)
+            for symbol in batch:
+                self.pending[symbol] = future
+        for symbol in symbols:
+            futures[symbol] = self.pending[symbol]
+        return futures
+
+    def get_quotes(self, symbols, wait=True):
+        """
+        Quotes for many symbols at once.
+
+        Args:
+            wait: False returns at once with whatever is cached, however old;
+                  the rest is fetched in the background and left out
+
+        Returns:
+            dict symbol -> quote dict; quotes that could not be fetched and
+            have nothing cached carry an 'error' key instead of a price
+        """
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+        now = time.time()
+        result, missing, revalidate = {}, [], []
+        with self.lock:
+            self.stats['requests'] += 1
+            for symbol in symbols:
+                entry = self.quotes.get(symbol)
+                age = now - entry[0] if entry else None
+                if entry and age < self.ttl:
+                    result[symbol] = entry[1]
+                    self.stats['hits'] += 1
+                elif entry and age < self.stale_ttl:
+                    result[symbol] = entry[1]
+                    self.stats['stale_hits'] += 1
+                    if symbol not in self.pending:
+                        revalidate.append(symbol)
+                else:
+                    missing.append(symbol)
+                    self.stats['misses'] += 1
+            if revalidate:
+                self.stats['refreshes'] += len(revalidate)
+                self._submit(revalidate)
+            futures = self._submit(missing) if missing else {}
+            if not wait:
+                # Better an expired quote than none while the fetch runs
+                result.update((s, self.quotes[s][1]) for s in missing if s in self.quotes)
+        if self.on_lookup is not None:
+            for symbol in symbols:
+                self.on_lookup(symbol not in futures)
+        if not wait:
+            return result
+
+        for symbol, future in futures.items():
+            quote = future.result().get(symbol)
+            if quote is None or quote.get('error') or quote.get('price') is None:
+                # Another caller's batch, or a failure: fall back to whatever is cached
+                with self.lock:
+                    entry = self.quotes.get(symbol)
+                quote = entry[1] if entry else (quote or {'symbol': symbol, 'error': 'No quote returned'})
+            result[symbol] = quote
+        return result
+
+    def get_quote(self, symbol):
+        return self.get_quotes([symbol]).get(symbol.strip().upper())
+
+    def age(self, symbol):
+        """Seconds since the cached quote for `symbol` was fetched, None if not cached."""
+        with self.lock:
+            entry = self.quotes.get(symbol)
+        return time.time() - entry[0] if entry else None
+
+    def clear(self):
+        with self.lock:
+            self.quotes.clear()
+
+
+def quotes_frame(quotes):
+    """One row per symbol: SYMBOL, PRICE, PREVIOUS_CLOSE, MARKET_STATE, EXCHANGE, QUOTE_TIME, ERROR."""
+    rows = [{**{f.upper(): q.get(f) for f in QUOTE_FIELDS}, 'SYMBOL': symbol, 'ERROR': q.get('error')}
+            for symbol, q in quotes.items()]
+    return pd.DataFrame(rows, columns=[f.upper() for f in QUOTE_FIELDS] + ['ERROR'])
@@ -0,0 +1,279 @@
+"""
+In-process security master index
+
+Loads SECURITY_MASTER_REFERENCE, SP500, NYSE_SECURITIES and
+CORPORATE_BONDS once and keeps a hash map per identifier type, so that
+resolving a ticker, ISIN, CUSIP, SEDOL, FIGI or GSID is a dictionary hit
+instead of a warehouse query. Rows describing the same security are
+merged into one record (the golden record wins on conflicts), which
+gives the cross-reference ISIN -> GSID -> CUSIP for free.
+
+The golden record is refreshed incrementally from LAST_MODIFIED_AT; the
+bulk-built reference tables are reloaded when they go stale.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from identifiers import is_valid_cusip, is_valid_isin, is_valid_sedol
+
+# identifier type -> record key
+ID_COLUMNS = {
+    'gsid': 'GLOBAL_SECURITY_ID',
+    'isin': 'ISIN',
+    'cusip': 'CUSIP',
+    'sedol': 'SEDOL',
+    'figi': 'FIGI',
+    'ticker': 'TICKER',
+}
+# Order used to find an existing record for an incoming row. Tickers are
+# shared between an issuer's equity and its bonds, so they only ever
+# identify equity records.
+MATCH_ORDER = ('gsid', 'isin', 'cusip', 'figi', 'sedol', 'ticker')
+TICKER_ASSET_CLASSES = {'Equity', 'ETF'}
+
+REFERENCE_TTL = 900   # seconds before SP500 / NYSE / bond tables are reloaded
+REFRESH_INTERVAL = 60  # minimum seconds between golden record refreshes
+
+SOURCE_QUERIES = {
+    'SP500': """
+        SELECT SYMBOL AS TICKER, SECURITY_NAME AS NAME, 'Equity' AS ASSET_CLASS,
+            GICS_SECTOR, GICS_SUB_INDUSTRY, HEADQUARTERS, CIK, FOUNDED
+        FROM SECURITY_MASTER_DB.SECURITIES.SP500
+    """,
+    'NYSE': """
+        SELECT SYMBOL AS TICKER, COMPANY_NAME AS NAME, 'Equity' AS ASSET_CLASS,
+            ISIN AS LISTING_ID, EXCHANGE
+        FROM SECURITY_MASTER_DB.EQUITY.NYSE_SECURITIES
+    """,
+    'CORPORATE_BONDS': """
+        SELECT BOND_ID, CUSIP, ISIN, FIGI, TICKER, ISSUER_NAME, ISSUER_NAME AS NAME,
+            'Fixed Income' AS ASSET_CLASS, COUPON_RATE, COUPON_FREQUENCY, CURRENT_YIELD, CREDIT_RATING,
+            MATURITY_DATE, PAR_VALUE, CURRENCY, SECTOR
+        FROM SECURITY_MASTER_DB.FIXED_INCOME.CORPORATE_BONDS
+    """,
+}
+
+BOND_NUMERIC_COLUMNS = ('COUPON_RATE', 'COUPON_FREQUENCY', 'CURRENT_YIELD', 'PAR_VALUE')
+
+GOLDEN_RECORD_QUERY = """
+    SELECT GLOBAL_SECURITY_ID, ISSUER AS NAME, ASSET_CLASS, PRIMARY_TICKER AS TICKER,
+        PRIMARY_EXCHANGE AS EXCHANGE, ISIN, CUSIP, SEDOL, CURRENCY, STATUS, GOLDEN_SOURCE,
+        LAST_MODIFIED_AT
+    FROM SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_REFERENCE
+"""
+
+
+def _clean(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def classify_identifier(value):
+    """Best guess at the identifier type of a free-text value."""
+    value = value.upper().strip()
+    if value.startswith('GSID'):
+        return 'gsid'
+    if value.startswith('BBG') and len(value) == 12:
+        return 'figi'
+    if len(value) == 12 and is_valid_isin(value):
+        return 'isin'
+    if len(value) == 9 and is_valid_cusip(value):
+        return 'cusip'
+    if len(value) == 7 and is_valid_sedol(value):
+        return 'sedol'
+    return 'ticker'
+
+
+class SecurityMasterIndex:
+    """
+    Identifier maps over the merged security master.
+
+    Records are plain dicts keyed by upper-case column names (the same
+    keys the source queries return), plus a SOURCES set.
+    """
+
+    def __init__(self, reference_ttl=REFERENCE_TTL, refresh_interval=REFRESH_INTERVAL):
+        self.reference_ttl = reference_ttl
+        self.refresh_interval = refresh_interval
+        self.maps = {id_type: {} for id_type in ID_COLUMNS}
+        self.bonds = {}
+        self.records = []
+        self.watermark = None
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+        self.lock = threading.RLock()
+        self.stats = {'full_loads': 0, 'incremental_refreshes': 0, 'rows_applied': 0,
+                      'hits': 0, 'misses': 0}
+
+    def __len__(self):
+        return len(self.records)
+
+    # ---- building -------------------------------------------------------
+
+    def _find(self, row):
+        asset_class = row.get('ASSET_CLASS')
+        for id_type in MATCH_ORDER:
+            value = row.get(ID_COLUMNS[id_type])
+            if value and (id_type != 'ticker' or asset_class in TICKER_ASSET_CLASSES):
+                record = self.maps[id_type].get(value)
+                if record is not None and record.get('ASSET_CLASS') in (None, asset_class):
+                    return record
+        return None
+
+    def _register(self, record):
+        for id_type, column in ID_COLUMNS.items():
+            value = record.get(column)
+            if not value:
+                continue
+            if id_type == 'ticker' and record.get('ASSET_CLASS') not in TICKER_ASSET_CLASSES:
+                continue
+            self.maps[id_type][value] = record
+        if record.get('BOND_ID') is not None and record.get('CUSIP'):
+            self.bonds[record['CUSIP']] = record
+
+    def _keys(self, record):
+        """(map, key) pairs a record is registered under."""
+        keys = [(self.maps[id_type], record.get(column)) for id_type, column in ID_COLUMNS.items()
+                if record.get(column) and (id_type != 'ticker' or record.get('ASSET_CLASS') in TICKER_ASSET_CLASSES)]
+        if record.get('BOND_ID') is not None and record.get('CUSIP'):
+            keys.append((self.bonds, record['CUSIP']))
+        return keys
+
+    def _merge(self, row, source, authoritative=False):
+        row = {k: _clean(v) for k, v in row.items()}
+        listing_id = row.pop('LISTING_ID', None)
+        if listing_id:
+            # NYSE_SECURITIES.ISIN holds whatever the FIGI resolver returned
+            row['ISIN' if is_valid_isin(listing_id) else 'FIGI'] = listing_id
+        record = self._find(row)
+        if record is None:
+            record = {'SOURCES': set()}
+            self.records.append(record)
+            old_keys = []
+        else:
+            old_keys = self._keys(record)
+        for key, value in row.items():
+            if value is not None and (authoritative or record.get(key) is None):
+                record[key] = value
+        record['SOURCES'].add(source)
+        # Register the new identifiers before dropping stale ones, so a lookup
+        # running alongside an incremental refresh never misses the record
+        self._register(record)
+        new_keys = {(id(m), key) for m, key in self._keys(record)}
+        for m, key in old_keys:
+            if (id(m), key) not in new_keys and m.get(key) is record:
+                del m[key]
+        return record
+
+    def load(self, session):
+        """
+        Full rebuild from all four sources.
+
+        The new index is built aside and swapped in under the lock, so
+        lookups from other sessions see the old index until then, never
+        a half-built one.
+        """
+        frames = {source: session.sql(q).to_pandas() for source, q in SOURCE_QUERIES.items()}
+        golden = session.sql(GOLDEN_RECORD_QUERY).to_pandas()
+        fresh = SecurityMasterIndex(self.reference_ttl, self.refresh_interval)
+        for source, df in frames.items():
+            for row in df.to_dict('records'):
+                fresh._merge(row, source)
+        fresh._apply_golden(golden)
+        with self.lock:
+            self.maps, self.bonds, self.records = fresh.maps, fresh.bonds, fresh.records
+            self.watermark = fresh.watermark
+            self.loaded_at = self.refreshed_at = time.time()
+            self.stats['full_loads'] += 1
+            self.stats['rows_applied'] += fresh.stats['rows_applied']
+        return len(self.records)
+
+    def _count(self, record):
+        with self.lock:
+            self.stats['hits' if record is not None else 'misses'] += 1
+
+    def _apply_golden(self, df):
+        for row in df.to_dict('records'):
+            modified = row.get('LAST_MODIFIED_AT')
+            if modified is not None and not pd.isna(modified):
+                self.watermark = modified if self.watermark is None else max(self.watermark, modified)
+            self._merge(row, 'GOLDEN_RECORD', authoritative=True)
+        self.stats['rows_applied'] += len(df)
+        return len(df)
+
+    def refresh(self, session):
+        """Apply golden record rows modified since the last watermark."""
+        if not self.loaded_at or time.time() - self.loaded_at > self.reference_ttl:
+            self.load(session)
+            return {'full': True, 'rows': len(self.records)}
+        if self.watermark is None:
+            df = session.sql(GOLDEN_RECORD_QUERY).to_pandas()
+        else:
+            df = session.sql(
+                GOLDEN_RECORD_QUERY + " WHERE LAST_MODIFIED_AT > ?",
+                params=[pd.Timestamp(self.watermark).to_pydatetime()],
+            ).to_pandas()
+        with self.lock:
+            applied = self._apply_golden(df)
+            self.refreshed_at = time.time()
+            self.stats['incremental_refreshes'] += 1
+        return {'full': False, 'rows': applied}
+
+    def refresh_if_stale(self, session):
+        if time.time() - self.refreshed_at >= self.refresh_interval:
+            return self.refresh(session)
+        return None
+
+    # ---- lookups --------------------------------------------------------
+
+    def get(self, id_type, value):
+        """Record for an identifier of a known type, or None."""
+        if not value:
+            return None
+        record = self.maps[id_type].get(value.upper().strip())
+        self._count(record)
+        return record
+
+    def bond(self, cusip):
+        """CORPORATE_BONDS record for a CUSIP (issuer equity CUSIPs can collide with bond CUSIPs)."""
+        record = self.bonds.get(cusip.upper().strip()) if cusip else None
+        self._count(record)
+        if record is not None and any(record.get(c) is None for c in BOND_NUMERIC_COLUMNS):
+            # Missing numbers read as NaN, as they did from the CORPORATE_BONDS frame
+            record = {**record, **{c: np.nan for c in BOND_NUMERIC_COLUMNS if record.get(c) is None}}
+        return record
+
+    def lookup(self, value):
+        """Record for an identifier of unknown type (ISIN, CUSIP, SEDOL, FIGI, GSID or ticker)."""
+        if not value:
+            return None
+        guess = classify_identifier(value)
+        record = self.get(guess, value)
+        if record is None:
+            for id_type in MATCH_ORDER:
+                if id_type != guess and value.upper().strip() in self.maps[id_type]:
+                    return self.get(id_type, value)
+        return record
+
+    def xref(self, id_type, value, target):
+        """Translate one identifier into another, e.g. xref('isin', 'US0378331005', 'cusip')."""
+        record = self.get(id_type, value)
+        return record.get(ID_COLUMNS[target]) if record is not None else None
+
+    def name(self, id_type, value, default=None):
+        record = self.get(id_type, value)
+        return record.get('NAME') if record is not None and record.get('NAME') else default
+
+    def summary(self):
+        with self.lock:
+            counts = {id_type: len(m) for id_type, m in self.maps.items()}
+            return {'records': len(self.records), **counts, 'bonds': len(self.bonds), **self.stats,
+                    'watermark': self.watermark}
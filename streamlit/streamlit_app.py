@@ -4,10 +4,47 @@
 # OPTIMIZED FOR PERFORMANCE
 # ============================================
 
+import os
+import sys
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 from snowflake.snowpark.context import get_active_session
 
+# Shared modules live in python/ locally and next to this file on the Streamlit stage
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python"))
+from bond_analytics import bond_analytics
+from fix_messages import BOND_FIX_STAGE, EQUITY_FIX_STAGE, read_stage, reconcile
+from formatting import date, identifier, number, percent, show_frame, usd
+from identifiers import is_valid_isin, validate_identifiers
+from matching_engine import (ACTIONS, CANCELED, DURATIONS, FILLED, MAX_FILLS, OPG, PRICE_TYPES, REJECTED,
+                             WAITING_AUCTION, WAITING_TRIGGER, MatchingEngine, make_market)
+from order_pipeline import COMMITTED, FAILED, Order, OrderPipeline, new_order_key, order_id_for
+from portfolio_snapshot import PORTFOLIO_SNAPSHOT_QUERY, split_snapshot
+from positions import PositionBook
+from queries import QueryRunner
+from quote_service import QuoteService, snowflake_fetcher
+from rate_risk import SCENARIOS, CashFlowCache, RiskBook, curve_shock
+from security_index import SecurityMasterIndex
+from settlement_calendar import calendar, settlement_date
+from table_cache import (
+    BOND_TRADES,
+    CORPORATE_BONDS,
+    EQUITY_TRADES,
+    NYSE_SECURITIES,
+    SECURITY_MASTER_HISTORY,
+    SECURITY_MASTER_REFERENCE,
+    SP500,
+    TRADE_SETTLEMENTS,
+    cache_stats,
+    cached_loader,
+    invalidate_tables,
+    register_cache,
+)
+from trade_blotter import TradeBlotter
+from valuation import ValuationEngine
+
 # Page configuration
 st.set_page_config(
     page_title="SnowTrade App",
@@ -103,12 +140,193 @@ st.markdown('''
 </div>
 ''', unsafe_allow_html=True)
 
+# ============================================
+# SECURITY MASTER INDEX
+# Loaded once per server, refreshed incrementally
+# ============================================
+
+@st.cache_resource
+def get_security_index():
+    index = SecurityMasterIndex()
+    index.load(session)
+    return index
+
+def security_index():
+    index = get_security_index()
+    index.refresh_if_stale(session)
+    return index
+
+# ============================================
+# POSITION BOOKS
+# One per lot method, built once and fed only new trades
+# ============================================
+
+LOT_METHOD_LABELS = {'FIFO': 'fifo', 'Average Cost': 'average'}
+
+@st.cache_resource
+def get_position_books():
+    return {}
+
+def position_book(method=None):
+    method = method or LOT_METHOD_LABELS[st.session_state.get('lot_method', 'FIFO')]
+    books = get_position_books()
+    book = books.get(method)
+    if book is None:
+        book = books[method] = PositionBook(method)
+        book.load(session)
+    else:
+        book.refresh_if_stale(session)
+    return book
+
+def refresh_position_books():
+    for book in get_position_books().values():
+        book.refresh(session)
+
+# ============================================
+# QUERY TEMPLATES
+# Bound parameters, timed per template (queries.py)
+# ============================================
+
+@st.cache_resource
+def get_query_runner():
+    return QueryRunner(session)
+
+def run_query(name, *params, fetch='to_pandas'):
+    return get_query_runner().run(name, *params, fetch=fetch)
+
+# ============================================
+# ORDER PIPELINE
+# Orders are acknowledged on click and booked in batches (order_pipeline.py)
+# ============================================
+
+@st.cache_resource
+def get_order_pipeline():
+    return OrderPipeline(get_query_runner())
+
+def sync_order_pipeline():
+    """Apply batches the pipeline committed since the last rerun, in any session."""
+    tables = get_order_pipeline().committed_tables()
+    if tables:
+        invalidate_tables(*tables)
+        refresh_position_books()
+
+def order_progress(confirmed):
+    """Status line for a placed order: queued, booked (with its commit latency) or failed."""
+    ticket = get_order_pipeline().tickets.get(confirmed['order_key'])
+    if ticket is None:
+        # Finished long enough ago for the pipeline to have forgotten it
+        return True, f"order {confirmed['order_id']} processed"
+    if ticket.status == FAILED:
+        return False, f"Order {confirmed['order_id']} failed: {ticket.error}"
+    if ticket.status == COMMITTED:
+        booked = f"booked as {ticket.trade_id} in {ticket.latency * 1000:,.0f} ms"
+        return True, f"{booked} ({ticket.error})" if ticket.error else booked
+    return True, f"order {ticket.order_id} queued for booking"
+
+sync_order_pipeline()
+
+# ============================================
+# VALUATION
+# Mark-to-market over the position book, re-priced as quotes move
+# ============================================
+
+OPENING_CASH = 100_000_000_000  # fund capital before the first trade
+
+@st.cache_resource
+def get_valuation_engines():
+    return {}
+
+def valuation(method=None):
+    book = position_book(method)
+    engines = get_valuation_engines()
+    engine = engines.get(book.method)
+    if engine is None:
+        engine = engines[book.method] = ValuationEngine(book, get_quote_service(), session, OPENING_CASH)
+        register_cache(f'valuation_bonds_{book.method}', (BOND_TRADES, CORPORATE_BONDS), engine.invalidate_bonds)
+    engine.refresh()
+    return engine
+
+# ============================================
+# RATE RISK
+# Bond cash flows cached by CUSIP; key rates and scenarios from memory
+# ============================================
+
+@st.cache_resource
+def get_cash_flow_cache():
+    cache = CashFlowCache()
+    register_cache('rate_risk_flows', (CORPORATE_BONDS,), cache.clear)
+    return cache
+
+@st.cache_resource
+def get_risk_books():
+    return {}
+
+def rate_risk(engine):
+    """RiskBook over the open bond positions of a ValuationEngine, rebuilt only when the bond rows are reloaded."""
+    key = (engine.book.method, engine.stats['bond_loads'], pd.Timestamp.now().normalize())
+    books = get_risk_books()
+    book = books.get(engine.book.method)
+    if book is None or book.key != key:
+        bonds = engine.bonds if engine.bonds is not None else pd.DataFrame(
+            columns=['CUSIP', 'COUPON_RATE', 'MATURITY_DATE', 'COUPON_FREQUENCY', 'NET_FACE', 'YTM', 'CURRENT_YIELD'])
+        held = bonds[bonds['NET_FACE'] != 0]
+        cache = get_cash_flow_cache()
+        cache.ensure(held)
+        book = RiskBook(pd.DataFrame({
+            'CUSIP': held['CUSIP'], 'FACE': held['NET_FACE'],
+            'YIELD': held['YTM'].fillna(held['CURRENT_YIELD']),
+        }), cache)
+        book.key = key
+        books[engine.book.method] = book
+    return book
+
+# ============================================
+# TRADE BLOTTER
+# Keyset pages shared by all sessions, next page prefetched
+# ============================================
+
+@st.cache_resource
+def get_trade_blotter():
+    blotter = TradeBlotter(session)
+    blotter.on_lookup = register_cache('trade_blotter', (EQUITY_TRADES, SP500, NYSE_SECURITIES), blotter.clear).record
+    return blotter
+
+def blotter_page(key, view, filters):
+    # The cursor stack restarts whenever the filters change
+    state = st.session_state.setdefault(f"{key}_pager", {'filters': None, 'cursors': [None]})
+    if state['filters'] != filters:
+        state['filters'], state['cursors'] = dict(filters), [None]
+    return get_trade_blotter().page(view, filters, state['cursors'][-1]), state
+
+def blotter_nav(key, page, state):
+    nav_col1, nav_col2, nav_col3 = st.columns([1, 1, 4])
+    with nav_col1:
+        if st.button("◀ Newer", key=f"{key}_newer", disabled=len(state['cursors']) == 1, use_container_width=True):
+            state['cursors'].pop()
+            st.rerun()
+    with nav_col2:
+        if st.button("Older ▶", key=f"{key}_older", disabled=not page.has_next, use_container_width=True):
+            state['cursors'].append(page.next_cursor)
+            st.rerun()
+    with nav_col3:
+        first = (len(state['cursors']) - 1) * get_trade_blotter().page_size + 1
+        timing = "cached" if page.cached else f"{page.seconds * 1000:,.0f} ms"
+        st.caption(f"Page {len(state['cursors'])} · rows {first:,}–{first + len(page.rows) - 1:,} · {timing}")
+
+# Blotter pages render the same money columns in both tabs
+TRADE_FORMATS = {'TOTAL_VALUE': usd(2), 'PRICE': usd(2, thousands=False), 'QUANTITY': number(0)}
+
+def date_range_filters(key):
+    dates = st.date_input("Trade Dates", value=(), key=key)
+    dates = tuple(dates) if isinstance(dates, (tuple, list)) else (dates,)
+    return {'date_from': dates[0] if dates else None, 'date_to': dates[1] if len(dates) > 1 else None}
+
 # ============================================
 # OPTIMIZED DATA LOADING FUNCTIONS
 # Increased TTL, added LIMIT clauses
 # ============================================
 
-@st.cache_data(ttl=900)
+@cached_loader(ttl=900, tables=(SP500,))
 def load_securities():
     return session.sql("""
         SELECT SYMBOL, SECURITY_NAME, GICS_SECTOR, GICS_SUB_INDUSTRY, HEADQUARTERS
@@ -116,43 +334,12 @@ def load_securities():
         ORDER BY SYMBOL
     """).to_pandas()
 
-@st.cache_data(ttl=300)
-def get_portfolio_summary_fast():
-    return session.sql("""
-        SELECT SYMBOL, COUNT(*) as TRADE_COUNT,
-            SUM(CASE WHEN SIDE = 'BUY' THEN QUANTITY ELSE 0 END) as TOTAL_BOUGHT,
-            SUM(CASE WHEN SIDE = 'SELL' THEN QUANTITY ELSE 0 END) as TOTAL_SOLD,
-            SUM(CASE WHEN SIDE = 'BUY' THEN TOTAL_VALUE ELSE 0 END) as BUY_VALUE,
-            SUM(CASE WHEN SIDE = 'SELL' THEN TOTAL_VALUE ELSE 0 END) as SELL_VALUE,
-            SUM(CASE WHEN SIDE = 'BUY' THEN QUANTITY ELSE 0 END) - SUM(CASE WHEN SIDE = 'SELL' THEN QUANTITY ELSE 0 END) as NET_POSITION,
-            AVG(PRICE) as AVG_PRICE
-        FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES
-        GROUP BY SYMBOL
-        ORDER BY ABS(BUY_VALUE - SELL_VALUE) DESC
-        LIMIT 100
-    """).to_pandas()
-
-@st.cache_data(ttl=300)
-def get_sector_breakdown_fast():
-    return session.sql("""
-        SELECT s.GICS_SECTOR, COUNT(DISTINCT t.SYMBOL) as SECURITIES_TRADED,
-            SUM(t.TOTAL_VALUE) as TOTAL_VALUE,
-            SUM(CASE WHEN t.SIDE = 'BUY' THEN t.TOTAL_VALUE ELSE 0 END) as BUY_VALUE,
-            SUM(CASE WHEN t.SIDE = 'SELL' THEN t.TOTAL_VALUE ELSE 0 END) as SELL_VALUE
-        FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
-        JOIN SECURITY_MASTER_DB.SECURITIES.SP500 s ON t.SYMBOL = s.SYMBOL
-        GROUP BY s.GICS_SECTOR
-        ORDER BY TOTAL_VALUE DESC
-    """).to_pandas()
+@cached_loader(ttl=300, tables=(EQUITY_TRADES, BOND_TRADES, SP500, CORPORATE_BONDS))
+def get_portfolio_snapshot():
+    # One round trip for the header metrics and every Portfolio tab rollup
+    return split_snapshot(session.sql(PORTFOLIO_SNAPSHOT_QUERY).to_pandas())
 
-@st.cache_data(ttl=300)
-def get_quick_metrics():
-    return session.sql("""
-        SELECT COUNT(*) as TOTAL_TRADES, COUNT(DISTINCT SYMBOL) as UNIQUE_SYMBOLS
-        FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES
-    """).to_pandas()
-
-@st.cache_data(ttl=900)
+@cached_loader(ttl=900, tables=(SP500,))
 def get_tradeable_securities():
     return session.sql("""
         SELECT DISTINCT SYMBOL, SECURITY_NAME, GICS_SECTOR
@@ -160,23 +347,107 @@ def get_tradeable_securities():
         ORDER BY SYMBOL
     """).to_pandas()
 
-@st.cache_data(ttl=120)
+@st.cache_resource
+def get_quote_service():
+    # One quote cache for every session; stale quotes are served while they refresh
+    service = QuoteService(snowflake_fetcher(session))
+    service.on_lookup = register_cache('quote_service', (), service.clear).record
+    return service
+
 def get_live_stock_price(symbol):
-    import json
-    try:
-        result = session.sql(f"""
-            SELECT SECURITY_MASTER_DB.TRADES.GET_STOCK_PRICE('{symbol}') as PRICE_DATA
-        """).to_pandas()
-        if not result.empty:
-            price_data = result.iloc[0]['PRICE_DATA']
-            if isinstance(price_data, str):
-                return json.loads(price_data)
-            return price_data
-    except Exception as e:
-        return {"error": str(e)}
-    return None
-
-@st.cache_data(ttl=900)
+    return get_quote_service().get_quote(symbol)
+
+# ============================================
+# MATCHING ENGINE
+# Stock/ETF orders work in a simulated book; each fill is booked through the order pipeline
+# ============================================
+
+@st.cache_resource
+def get_matching_engine():
+    return MatchingEngine(max_fills=MAX_FILLS)
+
+def book_engine_fills(engine):
+    """Queue the client fills since the last call, one trade per fill under its order's ORDER_ID."""
+    from datetime import datetime
+
+    for fill_id, order, price, quantity in engine.take_executions():
+        now = datetime.now()
+        client = order.client
+        ticket = get_order_pipeline().submit(Order('equity', f"{client['order_key']}:{fill_id}", {
+            'symbol': order.symbol,
+            'security_name': client['security_name'],
+            'side': order.side,
+            'quantity': quantity,
+            'price': price,
+            'total_value': quantity * price,
+            'trade_date': now.strftime('%Y-%m-%d'),
+            'settlement_date': settlement_date(now, 'Equity', 'NYSE').strftime('%Y-%m-%d'),
+            'executed_at': now,
+        }, order_id=order_id_for('equity', client['order_key'])))
+        client['fills'].append(ticket.key)
+
+def sync_matching_engine():
+    """Requote symbols with working client orders at their live price, run NYSE auctions and book fills."""
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+
+    engine = get_matching_engine()
+    with engine.lock:
+        symbols = sorted({o.symbol for o in engine.live.values() if o.client is not None})
+    # Whatever is cached, without waiting and outside the lock: a cold quote is
+    # fetched in the background and requotes the book on a later rerun
+    quotes = get_quote_service().get_quotes(symbols, wait=False) if symbols else {}
+    with engine.lock:
+        for symbol, quote in quotes.items():
+            if quote.get('price'):
+                make_market(engine, symbol, quote['price'])
+        now = datetime.now(ZoneInfo('America/New_York')).replace(tzinfo=None)
+        engine.run_session(now, bool(np.is_busday(now.date(), busdaycal=calendar('NYSE'))))
+        book_engine_fills(engine)
+
+def equity_order_progress(confirmed):
+    """Status line for a Stock/ETF order: the engine's view (fills, resting, rejected) plus booking."""
+    order = get_matching_engine().client_orders.get(confirmed['engine_order_id'])
+    if order is None:
+        # Finished long enough ago to have been evicted from the engine's history
+        return True, f"order {confirmed['order_id']} finished"
+    if order.status == REJECTED:
+        return False, f"Order {confirmed['order_id']} rejected: {order.reason}"
+    tickets = get_order_pipeline().tickets
+    booked = [tickets[key] for key in order.client['fills'] if key in tickets]
+    failed = [t for t in booked if t.status == FAILED]
+    if failed:
+        return False, f"Order {confirmed['order_id']} failed: {failed[0].error}"
+    filled = f"{order.filled:,} filled @ ${order.average_price:,.2f}" if order.filled else "nothing filled"
+    committed = sum(t.status == COMMITTED for t in booked)
+    if order.status == FILLED:
+        state = f"order {confirmed['order_id']} filled: {filled}"
+    elif order.status == CANCELED:
+        state = f"order {confirmed['order_id']} done, {filled}; {order.reason or 'rest cancelled'}"
+    elif order.status == WAITING_TRIGGER:
+        state = f"order {confirmed['order_id']} waiting for its stop" + (f" at ${order.stop_price:,.2f}" if order.stop else "")
+    elif order.status == WAITING_AUCTION:
+        state = f"order {confirmed['order_id']} waiting for the {'opening' if order.tif == OPG else 'closing'} auction"
+    else:
+        state = f"order {confirmed['order_id']} working, {filled}"
+    if booked:
+        state += f" · {committed} of {len(booked)} fills booked"
+    return True, state
+
+sync_matching_engine()
+
+@cached_loader(ttl=120, tables=(EQUITY_TRADES,))
+def get_security_quote(symbol):
+    # Fallback when no live quote is available: the book's own last trade
+    return session.sql("""
+        SELECT SYMBOL, MAX(SECURITY_NAME) as SECURITY_NAME, MAX_BY(PRICE, CREATED_AT) as LAST_PRICE,
+            AVG(PRICE) as AVG_PRICE, COUNT(*) as TRADE_COUNT
+        FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES
+        WHERE SYMBOL = ?
+        GROUP BY SYMBOL
+    """, params=[symbol]).to_pandas()
+
+@cached_loader(ttl=900, tables=(CORPORATE_BONDS,))
 def get_tradeable_bonds():
     return session.sql("""
         SELECT DISTINCT CUSIP, BOND_ID, ISSUER_NAME, TICKER, COUPON_RATE, CURRENT_YIELD, CREDIT_RATING, MATURITY_DATE, PAR_VALUE
@@ -185,7 +456,7 @@ def get_tradeable_bonds():
         ORDER BY ISSUER_NAME
     """).to_pandas()
 
-@st.cache_data(ttl=600)
+@cached_loader(ttl=600, tables=(BOND_TRADES, CORPORATE_BONDS))
 def get_bond_holdings():
     return session.sql("""
         SELECT DISTINCT b.CUSIP, b.ISSUER_NAME, b.COUPON_RATE, b.CURRENT_YIELD, b.CREDIT_RATING,
@@ -199,26 +470,28 @@ def get_bond_holdings():
 
 # Load minimal data for initial render
 securities = load_securities()
-quick_metrics = get_quick_metrics()
+portfolio_snapshot = get_portfolio_snapshot()
+quick_metrics = portfolio_snapshot['quick_metrics']
 
 # Top metrics - use cached quick metrics
 col1, col2, col3, col4, col5 = st.columns(5)
 total_trades = quick_metrics['TOTAL_TRADES'].iloc[0] if not quick_metrics.empty else 0
-total_aum = 100_000_000_000
-cash_balance = 50_000_000
-us_treasury_bonds = 10_000_000_000
-net_pnl = 2_450_000_000
+# Valued once per rerun; the tabs below read the same engine
+book_valuation = valuation()
+book_value = book_valuation.summary()
+net_pnl = book_value['unrealized_pnl']
 
 with col1:
-    st.metric("Total AUM", f"${total_aum/1e9:.0f}B")
+    st.metric("Total AUM", f"${book_value['aum']/1e9:,.2f}B")
 with col2:
-    st.metric("Cash Balance", f"${cash_balance/1e6:.0f}M")
+    st.metric("Cash Balance", f"${book_value['cash']/1e6:,.0f}M")
 with col3:
-    st.metric("US Treasury (4.25%)", f"${us_treasury_bonds/1e9:.0f}B")
+    st.metric("Fixed Income", f"${book_value['bond_market_value']/1e9:,.2f}B")
 with col4:
     st.metric("Total Trades", f"{int(total_trades):,}")
 with col5:
-    st.metric("Realized P&L", f"🟢 ${net_pnl:,.0f}")
+    st.metric("Unrealized P&L", f"{'🟢' if net_pnl >= 0 else '🔴'} ${net_pnl:,.0f}",
+              f"Realized ${book_value['realized_pnl']:,.0f}", delta_color="off")
 
 # Tabs
 tab1, tab2, tab4, tab5, tab6, tab7, tab8, tab9, tab10 = st.tabs(["📊 Portfolio", "🔍 Trade History", "🔗 Equity Trades", "📉 Bond Trades", "✏️ Master Data", "📜 Master History", "📋 Settlement Details", "📝 Stock / ETF Order", "🏦 Bond Order"])
@@ -231,9 +504,32 @@ with tab1:
     st.markdown("""<div style="background: linear-gradient(135deg, #93c5fd 0%, #60a5fa 50%, #3b82f6 100%); border-radius: 10px; padding: 0.5rem 1rem; margin-bottom: 1rem;">
         <h4 style="color: white; margin: 0; font-weight: 600;">📊 Portfolio Summary by Security</h4></div>""", unsafe_allow_html=True)
     
-    portfolio_summary = get_portfolio_summary_fast()
-    portfolio_with_pnl = portfolio_summary.copy()
-    portfolio_with_pnl['REALIZED_PNL'] = portfolio_with_pnl['SELL_VALUE'] - portfolio_with_pnl['BUY_VALUE']
+    lot_col1, lot_col2, lot_col3 = st.columns([2, 1, 3])
+    with lot_col1:
+        st.radio("Lot Accounting", list(LOT_METHOD_LABELS), key="lot_method", horizontal=True)
+    with lot_col2:
+        if st.button("♻️ Rebuild Positions", key="rebuild_positions", use_container_width=True):
+            position_book().load(session)
+            # The header was valued before this button ran
+            st.experimental_rerun()
+    with lot_col3:
+        book_stats = position_book().stats
+        st.caption(f"Last update applied {book_stats['last_refresh_trades']:,} trades in "
+                   f"{book_stats['last_refresh_seconds'] * 1000:,.0f} ms "
+                   f"({book_stats['full_loads']} full loads, {book_stats['incremental_refreshes']} incremental)")
+        valuation_stats = book_valuation.stats
+        st.caption(f"Marked {book_value['open_positions']:,} open positions "
+                   f"({book_value['live_priced']:,} at live quotes, the rest at last trade), "
+                   f"{valuation_stats['last_repriced']:,} re-priced in {valuation_stats['last_refresh_seconds'] * 1000:,.1f} ms · "
+                   f"gross exposure ${book_value['gross_exposure']/1e9:,.2f}B, net ${book_value['net_exposure']/1e9:,.2f}B"
+                   + (f" · {book_value['unpriced_bonds']:,} bond positions could not be priced and are left out"
+                      if book_value['unpriced_bonds'] else ""))
+    
+    portfolio_summary = position_book().summary(top=100)
+    equity_marks = book_valuation.equity_frame()
+    portfolio_with_pnl = portfolio_summary.merge(equity_marks[['SYMBOL', 'PRICE', 'MARKET_VALUE', 'UNREALIZED_PNL']],
+                                                 on='SYMBOL', how='left')
+    portfolio_with_pnl['TOTAL_PNL'] = portfolio_with_pnl['REALIZED_PNL'] + portfolio_with_pnl['UNREALIZED_PNL'].fillna(0)
     
     st.subheader("📈 Top 10 Equity Performers")
     portfolio_with_names = portfolio_with_pnl.merge(securities[['SYMBOL', 'SECURITY_NAME']], on='SYMBOL', how='left')
@@ -241,81 +537,131 @@ with tab1:
     chart_col1, chart_col2 = st.columns(2)
     with chart_col1:
         st.markdown("🟢 **Top 10 Gainers**")
-        gainers_chart = portfolio_with_names.nlargest(10, 'REALIZED_PNL')[['SECURITY_NAME', 'REALIZED_PNL']].copy()
-        gainers_chart = gainers_chart.sort_values('REALIZED_PNL', ascending=True).set_index('SECURITY_NAME')
+        gainers_chart = portfolio_with_names.nlargest(10, 'TOTAL_PNL')[['SECURITY_NAME', 'TOTAL_PNL']].copy()
+        gainers_chart = gainers_chart.sort_values('TOTAL_PNL', ascending=True).set_index('SECURITY_NAME')
         st.bar_chart(gainers_chart, use_container_width=True, height=300)
     
     with chart_col2:
         st.markdown("🔴 **Top 10 Losers**")
-        losers_chart = portfolio_with_names.nsmallest(10, 'REALIZED_PNL')[['SECURITY_NAME', 'REALIZED_PNL']].copy()
-        losers_chart['REALIZED_PNL'] = losers_chart['REALIZED_PNL'].abs()
-        losers_chart = losers_chart.sort_values('REALIZED_PNL', ascending=True).set_index('SECURITY_NAME')
+        losers_chart = portfolio_with_names.nsmallest(10, 'TOTAL_PNL')[['SECURITY_NAME', 'TOTAL_PNL']].copy()
+        losers_chart['TOTAL_PNL'] = losers_chart['TOTAL_PNL'].abs()
+        losers_chart = losers_chart.sort_values('TOTAL_PNL', ascending=True).set_index('SECURITY_NAME')
         st.bar_chart(losers_chart, use_container_width=True, height=300)
     
+    PNL_COLUMNS = {'SYMBOL': 'Symbol', 'TRADE_COUNT': 'Trades', 'TOTAL_PNL': 'P&L'}
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("#### 🟢 Top Gainers")
-        gainers = portfolio_with_pnl.nlargest(10, 'REALIZED_PNL')[['SYMBOL', 'TRADE_COUNT', 'REALIZED_PNL']].copy()
-        gainers['REALIZED_PNL'] = gainers['REALIZED_PNL'].apply(lambda x: f"${x:,.0f}")
-        st.dataframe(gainers.rename(columns={'SYMBOL': 'Symbol', 'TRADE_COUNT': 'Trades', 'REALIZED_PNL': 'P&L'}), use_container_width=True)
+        gainers = portfolio_with_pnl.nlargest(10, 'TOTAL_PNL')
+        show_frame(gainers, PNL_COLUMNS, {'TOTAL_PNL': usd(0)}, use_container_width=True)
     
     with col2:
         st.markdown("#### 🔴 Top Losers")
-        losers = portfolio_with_pnl.nsmallest(10, 'REALIZED_PNL')[['SYMBOL', 'TRADE_COUNT', 'REALIZED_PNL']].copy()
-        losers['REALIZED_PNL'] = losers['REALIZED_PNL'].apply(lambda x: f"${x:,.0f}")
-        st.dataframe(losers.rename(columns={'SYMBOL': 'Symbol', 'TRADE_COUNT': 'Trades', 'REALIZED_PNL': 'P&L'}), use_container_width=True)
+        losers = portfolio_with_pnl.nsmallest(10, 'TOTAL_PNL')
+        show_frame(losers, PNL_COLUMNS, {'TOTAL_PNL': usd(0)}, use_container_width=True)
     
     st.markdown("#### 📈 Full Equity Portfolio")
-    display_portfolio = portfolio_summary.copy()
-    display_portfolio['BUY_VALUE'] = display_portfolio['BUY_VALUE'].apply(lambda x: f"${x:,.0f}")
-    display_portfolio['SELL_VALUE'] = display_portfolio['SELL_VALUE'].apply(lambda x: f"${x:,.0f}")
-    display_portfolio['AVG_PRICE'] = display_portfolio['AVG_PRICE'].apply(lambda x: f"${x:.2f}")
-    st.dataframe(display_portfolio.rename(columns={'SYMBOL': 'Symbol', 'TRADE_COUNT': 'Trades', 'TOTAL_BOUGHT': 'Bought', 'TOTAL_SOLD': 'Sold', 'BUY_VALUE': 'Buy Value', 'SELL_VALUE': 'Sell Value', 'NET_POSITION': 'Net Pos', 'AVG_PRICE': 'Avg Price'}), use_container_width=True, height=300)
+    show_frame(portfolio_with_pnl, {
+        'SYMBOL': 'Symbol', 'TRADE_COUNT': 'Trades', 'TOTAL_BOUGHT': 'Bought', 'TOTAL_SOLD': 'Sold',
+        'BUY_VALUE': 'Buy Value', 'SELL_VALUE': 'Sell Value', 'NET_POSITION': 'Net Pos',
+        'AVG_PRICE': 'Avg Price', 'AVG_COST': 'Avg Cost', 'PRICE': 'Mark', 'MARKET_VALUE': 'Market Value',
+        'UNREALIZED_PNL': 'Unrealized P&L', 'REALIZED_PNL': 'Realized P&L',
+    }, {
+        'BUY_VALUE': usd(0), 'SELL_VALUE': usd(0), 'REALIZED_PNL': usd(0),
+        'AVG_PRICE': usd(2, thousands=False), 'AVG_COST': usd(2, thousands=False),
+        'PRICE': usd(2, thousands=False), 'MARKET_VALUE': usd(0), 'UNREALIZED_PNL': usd(0),
+    }, use_container_width=True, height=300)
     
     st.markdown("---")
     st.subheader("📈 Sector Analysis")
     
-    sector_data = get_sector_breakdown_fast()
+    sector_data = portfolio_snapshot['sector_breakdown']
     
     if not sector_data.empty:
-        sector_display = sector_data.copy()
-        sector_display['REALIZED_PNL'] = sector_display['SELL_VALUE'] - sector_display['BUY_VALUE']
+        # P&L per sector from the marks, not the sector's net cash flow
+        sector_marks = equity_marks.merge(securities[['SYMBOL', 'GICS_SECTOR']].drop_duplicates('SYMBOL'), on='SYMBOL')
+        sector_pnl = sector_marks.groupby('GICS_SECTOR')[['MARKET_VALUE', 'UNREALIZED_PNL', 'REALIZED_PNL']].sum()
+        sector_display = sector_data.merge(sector_pnl, left_on='GICS_SECTOR', right_index=True, how='left')
         
         st.bar_chart(sector_display.set_index('GICS_SECTOR')['TOTAL_VALUE'], use_container_width=True)
         
         st.markdown("#### 📊 Equity Sector Breakdown")
-        sector_display['TOTAL_VALUE'] = sector_display['TOTAL_VALUE'].apply(lambda x: f"${x:,.0f}")
-        sector_display['BUY_VALUE'] = sector_display['BUY_VALUE'].apply(lambda x: f"${x:,.0f}")
-        sector_display['SELL_VALUE'] = sector_display['SELL_VALUE'].apply(lambda x: f"${x:,.0f}")
-        sector_display['REALIZED_PNL'] = sector_display['REALIZED_PNL'].apply(lambda x: f"${x:,.0f}")
-        st.dataframe(sector_display.rename(columns={'GICS_SECTOR': 'Sector', 'SECURITIES_TRADED': 'Securities', 'TOTAL_VALUE': 'Total Value', 'BUY_VALUE': 'Buy Value', 'SELL_VALUE': 'Sell Value', 'REALIZED_PNL': 'Realized P&L'}), use_container_width=True)
+        show_frame(sector_display, {
+            'GICS_SECTOR': 'Sector', 'SECURITIES_TRADED': 'Securities', 'TOTAL_VALUE': 'Total Value',
+            'BUY_VALUE': 'Buy Value', 'SELL_VALUE': 'Sell Value', 'MARKET_VALUE': 'Market Value',
+            'UNREALIZED_PNL': 'Unrealized P&L', 'REALIZED_PNL': 'Realized P&L',
+        }, {
+            'TOTAL_VALUE': usd(0), 'BUY_VALUE': usd(0), 'SELL_VALUE': usd(0), 'MARKET_VALUE': usd(0),
+            'UNREALIZED_PNL': usd(0), 'REALIZED_PNL': usd(0),
+        }, use_container_width=True)
     
     st.markdown("---")
     st.markdown("#### 🏦 Fixed Income Sector Analysis")
     
-    @st.cache_data(ttl=600)
-    def get_bond_sector_breakdown_portfolio():
-        return session.sql("""
-            SELECT b.SECTOR, COUNT(*) as BOND_COUNT, SUM(t.TOTAL_VALUE) as TOTAL_VALUE,
-                AVG(t.YIELD) as AVG_YIELD, AVG(t.PRICE) as AVG_PRICE
-            FROM SECURITY_MASTER_DB.TRADES.BOND_TRADES t
-            JOIN SECURITY_MASTER_DB.FIXED_INCOME.CORPORATE_BONDS b ON t.CUSIP = b.CUSIP
-            GROUP BY b.SECTOR
-            ORDER BY TOTAL_VALUE DESC
-        """).to_pandas()
-    
-    bond_sector_pf = get_bond_sector_breakdown_portfolio()
+    bond_sector_pf = portfolio_snapshot['bond_sectors']
     if not bond_sector_pf.empty:
         st.bar_chart(bond_sector_pf.set_index('SECTOR')['TOTAL_VALUE'], use_container_width=True)
-        bond_sector_pf['TOTAL_VALUE'] = bond_sector_pf['TOTAL_VALUE'].apply(lambda x: f"${x:,.0f}")
-        bond_sector_pf['AVG_YIELD'] = bond_sector_pf['AVG_YIELD'].apply(lambda x: f"{x:.2f}%")
-        bond_sector_pf['AVG_PRICE'] = bond_sector_pf['AVG_PRICE'].apply(lambda x: f"{x:.4f}")
-        st.dataframe(bond_sector_pf.rename(columns={'SECTOR': 'Sector', 'BOND_COUNT': 'Bonds', 'TOTAL_VALUE': 'Total Value', 'AVG_YIELD': 'Avg Yield', 'AVG_PRICE': 'Avg Price'}), use_container_width=True)
+        show_frame(bond_sector_pf, {
+            'SECTOR': 'Sector', 'BOND_COUNT': 'Bonds', 'TOTAL_VALUE': 'Total Value',
+            'AVG_YIELD': 'Avg Yield', 'AVG_PRICE': 'Avg Price',
+        }, {
+            'TOTAL_VALUE': usd(0), 'AVG_YIELD': percent(2), 'AVG_PRICE': number(4, thousands=False),
+        }, use_container_width=True)
+    
+    st.markdown("#### 📐 Bond Risk")
+    bond_marks = book_valuation.bond_frame()
+    bond_marks = bond_marks[bond_marks['NET_FACE'] != 0]
+    if not bond_marks.empty:
+        risk_value = bond_marks['MARKET_VALUE'].sum()
+        risk_weights = bond_marks['MARKET_VALUE'] / risk_value if risk_value else 0
+        risk_col1, risk_col2, risk_col3, risk_col4 = st.columns(4)
+        with risk_col1:
+            st.metric("Portfolio DV01", f"${bond_marks['DV01'].sum():,.0f}")
+        with risk_col2:
+            st.metric("Modified Duration", f"{(bond_marks['MODIFIED_DURATION'].fillna(0) * risk_weights).sum():.2f}")
+        with risk_col3:
+            st.metric("Convexity", f"{(bond_marks['CONVEXITY'].fillna(0) * risk_weights).sum():.1f}")
+        with risk_col4:
+            st.metric("Accrued Interest", f"${bond_marks['ACCRUED_INTEREST'].sum():,.0f}")
+        riskiest = bond_marks.reindex(bond_marks['DV01'].abs().sort_values(ascending=False).index).head(50)
+        show_frame(riskiest, {
+            'CUSIP': 'CUSIP', 'ISSUER_NAME': 'Issuer', 'CREDIT_RATING': 'Rating', 'NET_FACE': 'Face',
+            'PRICE': 'Price', 'YTM': 'YTM', 'MARKET_VALUE': 'Market Value', 'UNREALIZED_PNL': 'Unrealized P&L',
+            'MODIFIED_DURATION': 'Mod. Duration', 'CONVEXITY': 'Convexity', 'DV01': 'DV01',
+        }, {
+            'NET_FACE': usd(0), 'PRICE': number(4, thousands=False), 'YTM': percent(3),
+            'MARKET_VALUE': usd(0), 'UNREALIZED_PNL': usd(0), 'MODIFIED_DURATION': number(2),
+            'CONVEXITY': number(1), 'DV01': usd(0),
+        }, use_container_width=True, height=300)
+        
+        risk_book = rate_risk(book_valuation)
+        st.markdown("##### Key-Rate DV01")
+        key_rates = risk_book.key_rate_dv01()
+        st.bar_chart(key_rates, use_container_width=True)
+        st.caption(f"Dollars per basis point by tenor across {len(risk_book):,} bonds; "
+                   f"sums to ${key_rates.sum():,.0f}")
+        
+        st.markdown("##### Rate Scenarios")
+        shock_col1, shock_col2 = st.columns(2)
+        with shock_col1:
+            parallel_bp = st.number_input("Parallel shift (bp)", value=0, step=25, key="risk_parallel_bp")
+        with shock_col2:
+            twist_bp = st.number_input("Twist, 2Y to 10Y (bp)", value=0, step=25, key="risk_twist_bp",
+                                       help="Short end moves by minus half, long end by plus half")
+        scenarios = dict(SCENARIOS)
+        if parallel_bp or twist_bp:
+            scenarios['Custom'] = curve_shock(parallel_bp, twist_bp)
+        show_frame(risk_book.scenarios(scenarios), {
+            'SCENARIO': 'Scenario', 'PNL': 'P&L', 'LINEAR_PNL': 'Key-Rate Estimate',
+            'CONVEXITY_PNL': 'Convexity', 'MILLISECONDS': 'ms',
+        }, {
+            'PNL': usd(0), 'LINEAR_PNL': usd(0), 'CONVEXITY_PNL': usd(0), 'MILLISECONDS': number(1),
+        }, use_container_width=True)
     
     st.markdown("---")
     st.subheader("💵 Bond Portfolio - Yield Analysis")
     
-    @st.cache_data(ttl=600)
+    @cached_loader(ttl=600, tables=(CORPORATE_BONDS,))
     def get_active_bonds_by_yield():
         return session.sql("""
             SELECT BOND_ID, TICKER, ISSUER_NAME, COUPON_RATE, CURRENT_YIELD, MATURITY_DATE, CREDIT_RATING, PAR_VALUE, CURRENCY
@@ -326,6 +672,8 @@ with tab1:
         """).to_pandas()
     
     active_bonds = get_active_bonds_by_yield()
+    YIELD_COLUMNS = {'TICKER': 'Ticker', 'ISSUER_NAME': 'Issuer', 'CURRENT_YIELD': 'Yield', 'MATURITY_DATE': 'Maturity', 'CREDIT_RATING': 'Rating'}
+    YIELD_FORMATS = {'CURRENT_YIELD': percent(2), 'MATURITY_DATE': date('YYYY-MM-DD')}
     bond_col1, bond_col2 = st.columns(2)
     
     with bond_col1:
@@ -334,10 +682,7 @@ with tab1:
         top_yield_chart = top_yield_chart.sort_values('CURRENT_YIELD', ascending=True).set_index('ISSUER_NAME')
         st.bar_chart(top_yield_chart['CURRENT_YIELD'], use_container_width=True, height=250)
         
-        top_yield = active_bonds.head(10)[['TICKER', 'ISSUER_NAME', 'CURRENT_YIELD', 'MATURITY_DATE', 'CREDIT_RATING']].copy()
-        top_yield['CURRENT_YIELD'] = top_yield['CURRENT_YIELD'].apply(lambda x: f"{x:.2f}%")
-        top_yield['MATURITY_DATE'] = top_yield['MATURITY_DATE'].astype(str).str[:10]
-        st.dataframe(top_yield.rename(columns={'TICKER': 'Ticker', 'ISSUER_NAME': 'Issuer', 'CURRENT_YIELD': 'Yield', 'MATURITY_DATE': 'Maturity', 'CREDIT_RATING': 'Rating'}), use_container_width=True, height=250)
+        show_frame(active_bonds.head(10), YIELD_COLUMNS, YIELD_FORMATS, use_container_width=True, height=250)
     
     with bond_col2:
         st.markdown("📉 **Bottom 10 Lowest Yielding Bonds**")
@@ -345,34 +690,12 @@ with tab1:
         bottom_yield_chart = bottom_yield_chart.sort_values('CURRENT_YIELD', ascending=True).set_index('ISSUER_NAME')
         st.bar_chart(bottom_yield_chart['CURRENT_YIELD'], use_container_width=True, height=250)
         
-        bottom_yield = active_bonds.tail(10)[['TICKER', 'ISSUER_NAME', 'CURRENT_YIELD', 'MATURITY_DATE', 'CREDIT_RATING']].copy()
-        bottom_yield['CURRENT_YIELD'] = bottom_yield['CURRENT_YIELD'].apply(lambda x: f"{x:.2f}%")
-        bottom_yield['MATURITY_DATE'] = bottom_yield['MATURITY_DATE'].astype(str).str[:10]
-        st.dataframe(bottom_yield.rename(columns={'TICKER': 'Ticker', 'ISSUER_NAME': 'Issuer', 'CURRENT_YIELD': 'Yield', 'MATURITY_DATE': 'Maturity', 'CREDIT_RATING': 'Rating'}), use_container_width=True, height=250)
+        show_frame(active_bonds.tail(10), YIELD_COLUMNS, YIELD_FORMATS, use_container_width=True, height=250)
 
 # ============================================
 # TAB 2: TRADE HISTORY (Lazy loaded)
 # ============================================
 with tab2:
-    @st.cache_data(ttl=300)
-    def load_trades_fast(symbol=None):
-        if symbol and symbol != "All Securities":
-            return session.sql(f"""
-                SELECT t.TRADE_ID, t.SYMBOL, s.SECURITY_NAME, t.TRADE_DATE, t.SIDE, t.QUANTITY, t.PRICE, t.TOTAL_VALUE
-                FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
-                JOIN SECURITY_MASTER_DB.SECURITIES.SP500 s ON t.SYMBOL = s.SYMBOL
-                WHERE t.SYMBOL = '{symbol}'
-                ORDER BY t.TRADE_DATE DESC
-                LIMIT 500
-            """).to_pandas()
-        return session.sql("""
-            SELECT t.TRADE_ID, t.SYMBOL, s.SECURITY_NAME, t.TRADE_DATE, t.SIDE, t.QUANTITY, t.PRICE, t.TOTAL_VALUE
-            FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
-            JOIN SECURITY_MASTER_DB.SECURITIES.SP500 s ON t.SYMBOL = s.SYMBOL
-            ORDER BY t.TRADE_DATE DESC
-            LIMIT 500
-        """).to_pandas()
-    
     col1, col2 = st.columns([1, 3])
     with col1:
         symbol_options = ["All Securities"] + [f"{row['SYMBOL']} - {row['SECURITY_NAME']}" for _, row in securities.head(100).iterrows()]
@@ -388,14 +711,25 @@ with tab2:
                     <p style="margin: 0.5rem 0 0 0;">{info['GICS_SECTOR']} • {info['GICS_SUB_INDUSTRY']}<br/>📍 {info['HEADQUARTERS']}</p></div>""", unsafe_allow_html=True)
     
     st.subheader("📋 Trade History")
-    trades = load_trades_fast(selected_symbol)
+    hist_col1, hist_col2 = st.columns([1, 2])
+    with hist_col1:
+        history_side = st.selectbox("Side", options=["All", "BUY", "SELL"], index=0, key="history_side")
+    with hist_col2:
+        history_dates = date_range_filters("history_dates")
+    history_filters = {
+        'symbol': None if selected_symbol == "All Securities" else selected_symbol,
+        'side': None if history_side == "All" else history_side,
+        **history_dates,
+    }
+    history_page, history_state = blotter_page("history", "history", history_filters)
+    trades = history_page.rows
     
     if not trades.empty:
-        display_df = trades.copy()
-        display_df['TOTAL_VALUE'] = display_df['TOTAL_VALUE'].apply(lambda x: f"${x:,.2f}")
-        display_df['PRICE'] = display_df['PRICE'].apply(lambda x: f"${x:.2f}")
-        display_df['QUANTITY'] = display_df['QUANTITY'].apply(lambda x: f"{x:,.0f}")
-        st.dataframe(display_df.rename(columns={'TRADE_ID': 'ID', 'SYMBOL': 'Symbol', 'SECURITY_NAME': 'Security', 'TRADE_DATE': 'Date', 'SIDE': 'Type', 'QUANTITY': 'Qty', 'PRICE': 'Price', 'TOTAL_VALUE': 'Total Value'}), use_container_width=True)
+        show_frame(trades, {
+            'TRADE_ID': 'ID', 'SYMBOL': 'Symbol', 'SECURITY_NAME': 'Security', 'TRADE_DATE': 'Date',
+            'SIDE': 'Type', 'QUANTITY': 'Qty', 'PRICE': 'Price', 'TOTAL_VALUE': 'Total Value',
+        }, TRADE_FORMATS, use_container_width=True)
+        blotter_nav("history", history_page, history_state)
     else:
         st.info("No trades found.")
 
@@ -405,7 +739,7 @@ with tab2:
 with tab4:
     st.subheader("🔗 Trade Matching to NYSE Security Master")
     
-    @st.cache_data(ttl=300)
+    @cached_loader(ttl=300, tables=(EQUITY_TRADES, NYSE_SECURITIES))
     def get_trade_match_summary_fast():
         return session.sql("""
             SELECT CASE WHEN n.SYMBOL IS NOT NULL THEN 'Matched' ELSE 'Unmatched' END as MATCH_STATUS,
@@ -415,20 +749,7 @@ with tab4:
             GROUP BY CASE WHEN n.SYMBOL IS NOT NULL THEN 'Matched' ELSE 'Unmatched' END
         """).to_pandas()
     
-    @st.cache_data(ttl=300)
-    def get_trades_with_nyse_fast():
-        return session.sql("""
-            SELECT t.TRADE_ID, t.SYMBOL, n.SECURITY_NAME as NYSE_COMPANY_NAME, n.ISIN as FIGI,
-                t.TRADE_DATE, t.SIDE, t.QUANTITY, t.PRICE, t.TOTAL_VALUE,
-                CASE WHEN n.SYMBOL IS NOT NULL THEN 'Matched' ELSE 'Unmatched' END as MATCH_STATUS
-            FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
-            LEFT JOIN SECURITY_MASTER_DB.EQUITY.NYSE_SECURITIES n ON t.SYMBOL = n.SYMBOL
-            ORDER BY t.TRADE_DATE DESC
-            LIMIT 500
-        """).to_pandas()
-    
     match_summary = get_trade_match_summary_fast()
-    trades_with_nyse = get_trades_with_nyse_fast()
     
     mcol1, mcol2, mcol3, mcol4 = st.columns(4)
     matched_row = match_summary[match_summary['MATCH_STATUS'] == 'Matched']
@@ -452,17 +773,34 @@ with tab4:
         st.metric("Matched Value", f"${matched_value:,.0f}")
     
     st.markdown("---")
-    match_filter = st.selectbox("Filter by Match Status", options=["All", "Matched", "Unmatched"], index=0)
-    
-    filtered_trades = trades_with_nyse if match_filter == "All" else trades_with_nyse[trades_with_nyse['MATCH_STATUS'] == match_filter]
-    st.markdown(f"*Showing {len(filtered_trades):,} trades*")
+    match_col1, match_col2, match_col3 = st.columns([1, 1, 2])
+    with match_col1:
+        match_filter = st.selectbox("Filter by Match Status", options=["All", "Matched", "Unmatched"], index=0)
+    with match_col2:
+        match_side = st.selectbox("Side", options=["All", "BUY", "SELL"], index=0, key="match_side")
+    with match_col3:
+        match_dates = date_range_filters("match_dates")
+    match_filters = {
+        'match_status': None if match_filter == "All" else match_filter,
+        'side': None if match_side == "All" else match_side,
+        **match_dates,
+    }
+    match_page, match_state = blotter_page("matched", "nyse", match_filters)
+    filtered_trades = match_page.rows
+    if match_side == "All" and not any(match_dates.values()):
+        # The summary above already counts every trade per match status
+        matching_total = {'All': total_trades_match, 'Matched': matched_trades, 'Unmatched': unmatched_trades}[match_filter]
+        st.markdown(f"*{matching_total:,} trades*")
     
     if not filtered_trades.empty:
-        display_matched = filtered_trades.copy()
-        display_matched['TOTAL_VALUE'] = display_matched['TOTAL_VALUE'].apply(lambda x: f"${x:,.2f}")
-        display_matched['PRICE'] = display_matched['PRICE'].apply(lambda x: f"${x:.2f}")
-        display_matched['QUANTITY'] = display_matched['QUANTITY'].apply(lambda x: f"{x:,.0f}")
-        st.dataframe(display_matched.rename(columns={'TRADE_ID': 'ID', 'SYMBOL': 'Symbol', 'NYSE_COMPANY_NAME': 'NYSE Company', 'FIGI': 'Bloomberg FIGI', 'TRADE_DATE': 'Date', 'SIDE': 'Type', 'QUANTITY': 'Qty', 'PRICE': 'Price', 'TOTAL_VALUE': 'Total Value', 'MATCH_STATUS': 'Status'}), use_container_width=True, height=400)
+        show_frame(filtered_trades, {
+            'TRADE_ID': 'ID', 'SYMBOL': 'Symbol', 'NYSE_COMPANY_NAME': 'NYSE Company', 'FIGI': 'Bloomberg FIGI',
+            'TRADE_DATE': 'Date', 'SIDE': 'Type', 'QUANTITY': 'Qty', 'PRICE': 'Price',
+            'TOTAL_VALUE': 'Total Value', 'MATCH_STATUS': 'Status',
+        }, TRADE_FORMATS, use_container_width=True, height=400)
+        blotter_nav("matched", match_page, match_state)
+    else:
+        st.info("No trades found matching the selected filters.")
 
 # ============================================
 # TAB 5: BOND TRADES (Lazy loaded)
@@ -473,10 +811,10 @@ with tab5:
         st.subheader("📉 Bond Trading Activity")
     with header_col2:
         if st.button("🔄 Refresh", key="refresh_bond_trades", use_container_width=True):
-            st.cache_data.clear()
+            invalidate_tables(BOND_TRADES)
             st.experimental_rerun()
     
-    @st.cache_data(ttl=300)
+    @cached_loader(ttl=300, tables=(BOND_TRADES, CORPORATE_BONDS))
     def load_bond_trades_fast():
         return session.sql("""
             SELECT t.TRADE_ID, t.CUSIP, b.ISSUER_NAME, b.TICKER, b.CREDIT_RATING, t.TRADE_DATE, t.SIDE,
@@ -487,7 +825,7 @@ with tab5:
             LIMIT 500
         """).to_pandas()
     
-    @st.cache_data(ttl=300)
+    @cached_loader(ttl=300, tables=(BOND_TRADES, CORPORATE_BONDS))
     def get_bond_summary_fast():
         return session.sql("""
             SELECT b.ISSUER_NAME, b.TICKER, COUNT(*) as TRADE_COUNT,
@@ -500,7 +838,7 @@ with tab5:
             LIMIT 20
         """).to_pandas()
     
-    @st.cache_data(ttl=300)
+    @cached_loader(ttl=300, tables=(BOND_TRADES,))
     def get_counterparty_fast():
         return session.sql("""
             SELECT COUNTERPARTY, COUNT(*) as TRADE_COUNT, SUM(TOTAL_VALUE) as TOTAL_VALUE, AVG(PRICE) as AVG_PRICE
@@ -529,31 +867,37 @@ with tab5:
     st.markdown("---")
     
     if not bond_trades.empty:
-        display_bt = bond_trades[['TRADE_ID', 'CUSIP', 'TICKER', 'ISSUER_NAME', 'CREDIT_RATING', 'TRADE_DATE', 'SIDE', 'QUANTITY', 'PRICE', 'YIELD_AT_TRADE', 'TOTAL_VALUE', 'COUNTERPARTY']].head(200).copy()
-        display_bt['TOTAL_VALUE'] = display_bt['TOTAL_VALUE'].apply(lambda x: f"${x:,.0f}")
-        display_bt['PRICE'] = display_bt['PRICE'].apply(lambda x: f"{x:.4f}")
-        display_bt['YIELD_AT_TRADE'] = display_bt['YIELD_AT_TRADE'].apply(lambda x: f"{x:.3f}%" if pd.notna(x) else "N/A")
-        display_bt['QUANTITY'] = display_bt['QUANTITY'].apply(lambda x: f"{x:,}")
-        st.dataframe(display_bt.rename(columns={'TRADE_ID': 'ID', 'CUSIP': 'CUSIP', 'TICKER': 'Ticker', 'ISSUER_NAME': 'Issuer', 'CREDIT_RATING': 'Rating', 'TRADE_DATE': 'Date', 'SIDE': 'Type', 'QUANTITY': 'Qty', 'PRICE': 'Price', 'YIELD_AT_TRADE': 'Yield', 'TOTAL_VALUE': 'Value', 'COUNTERPARTY': 'Counterparty'}), use_container_width=True, height=350)
+        show_frame(bond_trades.head(200), {
+            'TRADE_ID': 'ID', 'CUSIP': 'CUSIP', 'TICKER': 'Ticker', 'ISSUER_NAME': 'Issuer', 'CREDIT_RATING': 'Rating',
+            'TRADE_DATE': 'Date', 'SIDE': 'Type', 'QUANTITY': 'Qty', 'PRICE': 'Price', 'YIELD_AT_TRADE': 'Yield',
+            'TOTAL_VALUE': 'Value', 'COUNTERPARTY': 'Counterparty',
+        }, {
+            'TOTAL_VALUE': usd(0), 'PRICE': number(4, thousands=False), 'YIELD_AT_TRADE': percent(3), 'QUANTITY': number(0),
+        }, use_container_width=True, height=350)
     
     st.markdown("---")
     summary_col1, summary_col2 = st.columns(2)
+    MILLIONS = usd(1, scale=1e6, suffix="M", thousands=False)
     
     with summary_col1:
         st.markdown("#### 🏢 Top Issuers")
         top_issuers = get_bond_summary_fast()
         if not top_issuers.empty:
-            top_issuers['BUY_VALUE'] = top_issuers['BUY_VALUE'].apply(lambda x: f"${x/1e6:.1f}M")
-            top_issuers['SELL_VALUE'] = top_issuers['SELL_VALUE'].apply(lambda x: f"${x/1e6:.1f}M")
-            st.dataframe(top_issuers.rename(columns={'TICKER': 'Ticker', 'ISSUER_NAME': 'Issuer', 'TRADE_COUNT': 'Trades', 'BUY_VALUE': 'Buys', 'SELL_VALUE': 'Sells'}), use_container_width=True, height=300)
+            show_frame(top_issuers, {
+                'TICKER': 'Ticker', 'ISSUER_NAME': 'Issuer', 'TRADE_COUNT': 'Trades', 'BUY_VALUE': 'Buys', 'SELL_VALUE': 'Sells',
+            }, {
+                'BUY_VALUE': MILLIONS, 'SELL_VALUE': MILLIONS,
+            }, use_container_width=True, height=300)
     
     with summary_col2:
         st.markdown("#### 🤝 By Counterparty")
         cp_data = get_counterparty_fast()
         if not cp_data.empty:
-            cp_data['TOTAL_VALUE'] = cp_data['TOTAL_VALUE'].apply(lambda x: f"${x/1e6:.1f}M")
-            cp_data['AVG_PRICE'] = cp_data['AVG_PRICE'].apply(lambda x: f"{x:.2f}")
-            st.dataframe(cp_data.rename(columns={'COUNTERPARTY': 'Counterparty', 'TRADE_COUNT': 'Trades', 'TOTAL_VALUE': 'Total Value', 'AVG_PRICE': 'Avg Price'}), use_container_width=True, height=300)
+            show_frame(cp_data, {
+                'COUNTERPARTY': 'Counterparty', 'TRADE_COUNT': 'Trades', 'TOTAL_VALUE': 'Total Value', 'AVG_PRICE': 'Avg Price',
+            }, {
+                'TOTAL_VALUE': MILLIONS, 'AVG_PRICE': number(2, thousands=False),
+            }, use_container_width=True, height=300)
 
 # ============================================
 # TAB 6: MASTER DATA (Lazy loaded)
@@ -569,20 +913,7 @@ with tab6:
     
     def lookup_isin_external(isin_code):
         try:
-            result = session.sql(f"""
-                SELECT 
-                    RESULT:success::boolean as success,
-                    RESULT:name::string as name,
-                    RESULT:ticker::string as ticker,
-                    RESULT:isin::string as isin,
-                    RESULT:cusip::string as cusip,
-                    RESULT:sedol::string as sedol,
-                    RESULT:figi::string as figi,
-                    RESULT:exchange::string as exchange,
-                    RESULT:security_type::string as security_type,
-                    RESULT:error::string as error
-                FROM (SELECT SECURITY_MASTER_DB.GOLDEN_RECORD.LOOKUP_ISIN_EXTERNAL('{isin_code}') as RESULT)
-            """).to_pandas()
+            result = run_query('lookup_isin_external', isin_code)
             if not result.empty:
                 row = result.iloc[0]
                 if row['SUCCESS']:
@@ -604,28 +935,29 @@ with tab6:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def security_lookup_result(record):
+        return {
+            'success': True,
+            'name': record.get('NAME') or '',
+            'ticker': record.get('TICKER') or '',
+            'isin': record.get('ISIN') or '',
+            'cusip': record.get('CUSIP') or '',
+            'sedol': record.get('SEDOL') or '',
+            'figi': record.get('FIGI') or '',
+            'exchange': record.get('EXCHANGE') or 'NYSE/NASDAQ',
+            'security_type': record.get('ASSET_CLASS') or 'Equity',
+            'sector': record.get('GICS_SECTOR') or record.get('SECTOR') or '',
+            'sub_industry': record.get('GICS_SUB_INDUSTRY') or '',
+            'headquarters': record.get('HEADQUARTERS') or '',
+            'source': 'S&P 500 Database' if 'SP500' in record['SOURCES'] else 'Security Master'
+        }
+    
     def lookup_ticker(ticker_code):
         try:
-            local_result = session.sql(f"""
-                SELECT SYMBOL, SECURITY_NAME, GICS_SECTOR, GICS_SUB_INDUSTRY, HEADQUARTERS, CIK, FOUNDED
-                FROM SECURITY_MASTER_DB.SECURITIES.SP500 
-                WHERE SYMBOL = '{ticker_code}'
-                LIMIT 1
-            """).to_pandas()
-            if not local_result.empty:
-                row = local_result.iloc[0]
-                return {
-                    'success': True,
-                    'name': row['SECURITY_NAME'],
-                    'ticker': row['SYMBOL'],
-                    'exchange': 'NYSE/NASDAQ',
-                    'security_type': 'Equity',
-                    'sector': row['GICS_SECTOR'],
-                    'sub_industry': row['GICS_SUB_INDUSTRY'],
-                    'headquarters': row['HEADQUARTERS'],
-                    'source': 'S&P 500 Database'
-                }
-            return {'success': False, 'error': 'Ticker not found in S&P 500'}
+            record = security_index().get('ticker', ticker_code)
+            if record is not None:
+                return security_lookup_result(record)
+            return {'success': False, 'error': 'Ticker not found in security master'}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
@@ -643,7 +975,14 @@ with tab6:
     if lookup_clicked and lookup_value:
         with st.spinner(f"Looking up {lookup_type}..."):
             if lookup_type == "ISIN":
-                result = lookup_isin_external(lookup_value.upper().strip())
+                isin_code = lookup_value.upper().strip()
+                local_record = security_index().get('isin', isin_code) if is_valid_isin(isin_code) else None
+                if local_record is not None:
+                    result = security_lookup_result(local_record)
+                elif is_valid_isin(isin_code):
+                    result = lookup_isin_external(isin_code)
+                else:
+                    result = {'success': False, 'error': f"'{isin_code}' is not a valid ISIN (check digit mismatch or bad format)"}
             else:
                 result = lookup_ticker(lookup_value.upper().strip())
             st.session_state.lookup_result = result
@@ -705,32 +1044,23 @@ with tab6:
             clear_btn = st.form_submit_button("🗑️ Clear Form", use_container_width=True)
         
         if submitted:
+            sec_isin, sec_cusip, sec_sedol = (v.upper().strip() for v in (sec_isin, sec_cusip, sec_sedol))
+            identifier_errors = validate_identifiers(isin=sec_isin, cusip=sec_cusip, sedol=sec_sedol)
             if not sec_name or not sec_ticker:
                 st.error("Security Name and Ticker are required.")
+            elif identifier_errors:
+                for message in identifier_errors:
+                    st.error(message)
             else:
                 try:
-                    session.sql(f"""
-                        INSERT INTO SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_REFERENCE 
-                        (GLOBAL_SECURITY_ID, ISSUER, ASSET_CLASS, PRIMARY_TICKER, PRIMARY_EXCHANGE, 
-                         ISIN, CUSIP, SEDOL, CURRENCY, STATUS, GOLDEN_SOURCE, LAST_VALIDATED, CREATED_AT, CREATED_BY)
-                        SELECT
-                            'GSID_' || SECURITY_MASTER_DB.GOLDEN_RECORD.GSID_SEQ.NEXTVAL,
-                            '{sec_name.replace("'", "''")}',
-                            '{sec_type}',
-                            '{sec_ticker}',
-                            '{sec_exchange}',
-                            {f"'{sec_isin}'" if sec_isin else 'NULL'},
-                            {f"'{sec_cusip}'" if sec_cusip else 'NULL'},
-                            {f"'{sec_sedol}'" if sec_sedol else 'NULL'},
-                            '{sec_currency}',
-                            '{sec_status}',
-                            '{sec_source.replace("'", "''")}',
-                            CURRENT_TIMESTAMP(),
-                            CURRENT_TIMESTAMP(),
-                            CURRENT_USER()
-                    """).collect()
+                    run_query('insert_security_master_reference',
+                              sec_name, sec_type, sec_ticker, sec_exchange,
+                              sec_isin or None, sec_cusip or None, sec_sedol or None,
+                              sec_currency, sec_status, sec_source, fetch='collect')
                     st.success(f"✅ Security '{sec_ticker} - {sec_name}' saved successfully!")
                     st.session_state.lookup_result = None
+                    get_security_index().refresh(session)
+                    invalidate_tables(SECURITY_MASTER_REFERENCE, SECURITY_MASTER_HISTORY)
                 except Exception as e:
                     st.error(f"Error saving security: {str(e)}")
         
@@ -745,7 +1075,7 @@ with tab7:
     st.markdown("""<div style="background: linear-gradient(135deg, #7c3aed 0%, #8b5cf6 50%, #a78bfa 100%); border-radius: 10px; padding: 0.5rem 1rem; margin-bottom: 1rem;">
         <h4 style="color: white; margin: 0; font-weight: 600;">📜 Security Master History</h4></div>""", unsafe_allow_html=True)
     
-    @st.cache_data(ttl=300)
+    @cached_loader(ttl=300, tables=(SECURITY_MASTER_HISTORY,))
     def load_history_fast():
         return session.sql("""
             SELECT HISTORY_ID, GLOBAL_SECURITY_ID, ACTION, ISSUER_BEFORE, ISSUER_AFTER,
@@ -789,81 +1119,21 @@ with tab8:
     </div>
     """, unsafe_allow_html=True)
     
-    @st.cache_data(ttl=60)
-    def load_settlement_trades(security_type=None, trade_date=None, exchange_filter=None):
-        equity_query = """
-            SELECT 
-                t.ORDER_ID,
-                'Equity' as ASSET_CLASS,
-                t.TRADE_DATE,
-                TO_CHAR(t.CREATED_AT, 'HH24:MI:SS') as TRADE_TIME,
-                DATEADD('day', 1, t.TRADE_DATE) as SETTLEMENT_DATE,
-                CASE WHEN CURRENT_DATE() >= DATEADD('day', 1, t.TRADE_DATE) THEN 'Settled' ELSE 'Pending' END as SETTLEMENT_STATUS,
-                t.SIDE,
-                t.SYMBOL as TICKER,
-                g.ISSUER,
-                g.PRIMARY_EXCHANGE as EXCHANGE,
-                t.QUANTITY,
-                t.PRICE,
-                t.TOTAL_VALUE as AMOUNT_USD
-            FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
-            LEFT JOIN SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_REFERENCE g
-                ON t.SYMBOL = g.PRIMARY_TICKER AND g.ASSET_CLASS = 'Equity'
-        """
-        
-        bond_query = """
-            SELECT 
-                t.ORDER_ID,
-                'Bond' as ASSET_CLASS,
-                t.TRADE_DATE,
-                TO_CHAR(t.CREATED_AT, 'HH24:MI:SS') as TRADE_TIME,
-                DATEADD('day', 1, t.TRADE_DATE) as SETTLEMENT_DATE,
-                CASE WHEN CURRENT_DATE() >= DATEADD('day', 1, t.TRADE_DATE) THEN 'Settled' ELSE 'Pending' END as SETTLEMENT_STATUS,
-                t.SIDE,
-                g.PRIMARY_TICKER as TICKER,
-                g.ISSUER,
-                g.PRIMARY_EXCHANGE as EXCHANGE,
-                t.FACE_VALUE as QUANTITY,
-                t.PRICE,
-                t.TOTAL_VALUE as AMOUNT_USD
-            FROM SECURITY_MASTER_DB.TRADES.BOND_TRADES t
-            LEFT JOIN SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_REFERENCE g
-                ON t.CUSIP = g.CUSIP AND g.ASSET_CLASS = 'Fixed Income'
-        """
-        
-        if security_type == "Equity":
-            full_query = equity_query
-        elif security_type == "Bond":
-            full_query = bond_query
-        elif security_type == "ETF":
-            full_query = equity_query
-        else:
-            full_query = f"({equity_query}) UNION ALL ({bond_query})"
-        
-        full_query = f"SELECT * FROM ({full_query}) trades WHERE 1=1"
-        
+    # TRADE_SETTLEMENTS is refreshed from new trades every minute, or by the Refresh button
+    @cached_loader(ttl=60, tables=(TRADE_SETTLEMENTS, EQUITY_TRADES, BOND_TRADES))
+    def load_settlement_trades(security_type=None, trade_date=None, exchange_filter=None, status_filter=None):
+        asset_class = {'Equity': 'Equity', 'ETF': 'Equity', 'Bond': 'Bond'}.get(security_type)
+        trade_day = None
         if trade_date and trade_date != "<ALL>":
-            from datetime import datetime
-            parsed_date = datetime.strptime(trade_date, '%d-%b-%Y')
-            full_query += f" AND TRADE_DATE = '{parsed_date.strftime('%Y-%m-%d')}'"
-        if exchange_filter and exchange_filter != "<ALL>":
-            full_query += f" AND EXCHANGE = '{exchange_filter}'"
-        
-        full_query += " ORDER BY ORDER_ID DESC LIMIT 1000"
-        
-        return session.sql(full_query).to_pandas()
+            trade_day = pd.to_datetime(trade_date, format='%d-%b-%Y').strftime('%Y-%m-%d')
+        exchange = exchange_filter if exchange_filter and exchange_filter != "<ALL>" else None
+        status = status_filter if status_filter and status_filter != "<ALL>" else None
+        return run_query('trade_settlements', trade_day, trade_day, exchange, exchange, status, status,
+                         asset_class, asset_class)
     
-    @st.cache_data(ttl=300)
+    @cached_loader(ttl=300, tables=(TRADE_SETTLEMENTS,))
     def get_trade_dates():
-        return session.sql("""
-            SELECT DISTINCT TRADE_DATE 
-            FROM (
-                SELECT TRADE_DATE FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES
-                UNION
-                SELECT TRADE_DATE FROM SECURITY_MASTER_DB.TRADES.BOND_TRADES
-            )
-            ORDER BY TRADE_DATE DESC
-        """).to_pandas()['TRADE_DATE'].tolist()
+        return run_query('trade_dates')['TRADE_DATE'].tolist()
     
     filter_col1, filter_col2, filter_col3, filter_col4, filter_col5 = st.columns([0.4, 0.4, 0.4, 0.4, 0.375])
     
@@ -895,7 +1165,7 @@ with tab8:
     with filter_col4:
         settle_status_filter = st.selectbox(
             "Status",
-            options=["<ALL>", "Pending", "Settled", "Cancelled"],
+            options=["<ALL>", "Pending", "Settled", "Cancelled", "Unknown"],
             index=0,
             key="settle_status"
         )
@@ -903,29 +1173,20 @@ with tab8:
     with filter_col5:
         st.markdown('<label style="font-size: 0.875rem; color: transparent; display: block; margin-bottom: 0.5rem;">&nbsp;</label>', unsafe_allow_html=True)
         if st.button("🔄 Refresh", key="refresh_settlement", use_container_width=True):
-            st.cache_data.clear()
+            run_query('refresh_trade_settlements', False, fetch='collect')
+            invalidate_tables(TRADE_SETTLEMENTS)
             st.experimental_rerun()
     
     settlement_trades = load_settlement_trades(
         security_type=settle_type_filter if settle_type_filter != "<ALL>" else None,
         trade_date=settle_date_filter if settle_date_filter != "<ALL>" else None,
-        exchange_filter=settle_exchange_filter if settle_exchange_filter != "<ALL>" else None
+        exchange_filter=settle_exchange_filter if settle_exchange_filter != "<ALL>" else None,
+        status_filter=settle_status_filter if settle_status_filter != "<ALL>" else None
     )
     
-    if settle_status_filter != "<ALL>" and not settlement_trades.empty:
-        settlement_trades = settlement_trades[settlement_trades['SETTLEMENT_STATUS'] == settle_status_filter]
-    
     if not settlement_trades.empty:
-        display_settle = settlement_trades[['ORDER_ID', 'ASSET_CLASS', 'TRADE_DATE', 'TRADE_TIME', 
-                                            'SETTLEMENT_DATE', 'SETTLEMENT_STATUS', 'SIDE', 'TICKER',
-                                            'ISSUER', 'EXCHANGE', 'QUANTITY', 'PRICE', 'AMOUNT_USD']].copy()
-        display_settle['ORDER_ID'] = display_settle['ORDER_ID'].apply(lambda x: f"ORD{int(x)}" if pd.notna(x) else "N/A")
-        display_settle['TRADE_DATE'] = pd.to_datetime(display_settle['TRADE_DATE']).dt.strftime('%d-%b-%Y').str.upper()
-        display_settle['SETTLEMENT_DATE'] = pd.to_datetime(display_settle['SETTLEMENT_DATE']).dt.strftime('%d-%b-%Y').str.upper()
-        display_settle['AMOUNT_USD'] = display_settle['AMOUNT_USD'].apply(lambda x: f"${x:,.2f}" if pd.notna(x) else "N/A")
-        display_settle['PRICE'] = display_settle['PRICE'].apply(lambda x: f"${x:,.2f}" if pd.notna(x) else "N/A")
-        display_settle['QUANTITY'] = display_settle['QUANTITY'].apply(lambda x: f"{int(x)}" if pd.notna(x) else "N/A")
-        display_settle = display_settle.rename(columns={
+        st.markdown(f'<p style="color: #64748b; font-size: 0.85rem;">Showing <strong>{len(settlement_trades):,}</strong> trades</p>', unsafe_allow_html=True)
+        show_frame(settlement_trades, {
             'ORDER_ID': 'Order ID',
             'ASSET_CLASS': 'Type',
             'TRADE_DATE': 'Trade Date',
@@ -939,10 +1200,14 @@ with tab8:
             'QUANTITY': 'Qty',
             'PRICE': 'Price',
             'AMOUNT_USD': 'Amount USD'
-        })
-        
-        st.markdown(f'<p style="color: #64748b; font-size: 0.85rem;">Showing <strong>{len(settlement_trades):,}</strong> trades</p>', unsafe_allow_html=True)
-        st.dataframe(display_settle, use_container_width=True, height=500)
+        }, {
+            'ORDER_ID': identifier('ORD'),
+            'TRADE_DATE': date(),
+            'SETTLEMENT_DATE': date(),
+            'QUANTITY': number(0, thousands=False),
+            'PRICE': usd(2),
+            'AMOUNT_USD': usd(2),
+        }, use_container_width=True, height=500)
     else:
         st.info("No trades found matching the selected filters.")
 
@@ -1017,8 +1282,7 @@ with tab9:
                 change_color = '#10b981' if change >= 0 else '#ef4444'
                 change_symbol = '+' if change >= 0 else ''
                 
-                security_info = tradeable[tradeable['SYMBOL'] == selected_order_symbol]
-                security_name = security_info.iloc[0]['SECURITY_NAME'] if not security_info.empty else selected_order_symbol
+                security_name = security_index().name('ticker', selected_order_symbol, selected_order_symbol)
                 
                 st.markdown(f"""
                 <div style="background: linear-gradient(90deg, #ecfdf5 0%, #d1fae5 100%);
@@ -1200,8 +1464,7 @@ with tab9:
                 else:
                     execution_price = live_price if live_price else 100.00
                 
-                security_info = tradeable[tradeable['SYMBOL'] == selected_order_symbol]
-                security_name = security_info.iloc[0]['SECURITY_NAME'] if not security_info.empty else selected_order_symbol
+                security_name = security_index().name('ticker', selected_order_symbol, selected_order_symbol)
                 
                 st.session_state.preview_data = {
                     'symbol': selected_order_symbol,
@@ -1211,18 +1474,31 @@ with tab9:
                     'price_type': price_type,
                     'duration': order_duration,
                     'execution_price': execution_price,
-                    'est_value': order_quantity * execution_price
+                    'est_value': order_quantity * execution_price,
+                    'live_price': live_price,
+                    'limit_price': limit_price if price_type in ["Limit", "Stop Limit"] else None,
+                    'stop_price': stop_price if price_type in ["Stop", "Stop Limit"] else None,
+                    'trail_amount': trail_amount if price_type == "Trailing Stop $" else None,
+                    'trail_percent': trail_percent if price_type == "Trailing Stop %" else None,
+                    # One key per previewed order: placing it twice books it once
+                    'order_key': new_order_key()
                 }
                 st.session_state.show_preview = True
                 st.session_state.order_confirmed = None
         
+        if st.session_state.order_confirmed and st.session_state.order_confirmed.get('success'):
+            booked, progress = equity_order_progress(st.session_state.order_confirmed)
+            if not booked:
+                st.session_state.order_confirmed = {'success': False, 'error': progress}
+        
         if st.session_state.order_confirmed:
             if st.session_state.order_confirmed.get('success'):
                 st.markdown(f"""
                 <div style="background: #dcfce7; border: 2px solid #22c55e; border-radius: 10px; padding: 1rem; margin: 0.75rem 0;">
                     <p style="color: #000000; margin: 0; font-size: 1rem; font-weight: 600;">
-                        ✅ Confirmed {st.session_state.order_confirmed['side']} {st.session_state.order_confirmed['security_name']} ${st.session_state.order_confirmed['price']:,.2f} Quantity {st.session_state.order_confirmed['quantity']:,}
+                        ✅ Accepted {st.session_state.order_confirmed['side']} {st.session_state.order_confirmed['security_name']} ${st.session_state.order_confirmed['price']:,.2f} Quantity {st.session_state.order_confirmed['quantity']:,}
                     </p>
+                    <p style="color: #374151; margin: 0.25rem 0 0 0; font-size: 0.8rem;">{progress}</p>
                 </div>
                 """, unsafe_allow_html=True)
             else:
@@ -1286,80 +1562,37 @@ with tab9:
                 cancel_clicked = st.button("❌ Cancel", key="cancel_order_btn", use_container_width=True)
             
             if place_order_clicked:
-                import uuid
-                from datetime import datetime
-                
-                order_id = f"ORD-{str(uuid.uuid4())[:8].upper()}"
-                trade_id = f"TRD-{str(uuid.uuid4())[:8].upper()}"
-                now = datetime.now()
-                trade_date = now.strftime('%Y-%m-%d')
-                settlement_date = (now + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
-                
-                side = 'BUY' if 'Buy' in pd_data['action'] else 'SELL'
-                total_value = pd_data['quantity'] * pd_data['execution_price']
+                side = ACTIONS[pd_data['action']]
                 
                 try:
-                    session.sql(f"""
-                        INSERT INTO SECURITY_MASTER_DB.TRADES.EQUITY_TRADES (
-                            TRADE_ID, TRADE_DATE, SETTLEMENT_DATE, SYMBOL, SECURITY_NAME,
-                            SIDE, QUANTITY, PRICE, TOTAL_VALUE, CURRENCY, EXCHANGE,
-                            COUNTERPARTY, TRADER, STATUS
-                        ) VALUES (
-                            '{trade_id}',
-                            '{trade_date}',
-                            '{settlement_date}',
-                            '{pd_data['symbol']}',
-                            '{pd_data['security_name'].replace("'", "''")}',
-                            '{side}',
-                            {pd_data['quantity']},
-                            {pd_data['execution_price']},
-                            {total_value},
-                            'USD',
-                            'NYSE',
-                            'INTERNAL',
-                            'CURRENT_USER',
-                            'CONFIRMED'
-                        )
-                    """).collect()
-                    
-                    side_code = '1' if 'Buy' in pd_data['action'] else '2'
-                    
-                    fixml_msg = f'''<?xml version="1.0" encoding="UTF-8"?>
-<FIXML xmlns="http://www.fixprotocol.org/FIXML-5-0-SP2" v="5.0SP2">
-    <ExecRpt ExecID="{trade_id}" ExecTyp="F" OrdStat="2" Side="{side_code}" LeavesQty="0" CumQty="{pd_data['quantity']}" AvgPx="{pd_data['execution_price']}" TrdDt="{trade_date}" TxnTm="{now.strftime('%Y-%m-%dT%H:%M:%S')}Z" SettlDt="{settlement_date}">
-        <Hdr SID="SECMASTER" TID="EXCHANGE" Snt="{now.strftime('%Y-%m-%dT%H:%M:%S')}Z"/>
-        <OrdID ID="{order_id}"/>
-        <Instrmt Sym="{pd_data['symbol']}" SecTyp="CS" Exch="XNYS" ID="{pd_data['symbol']}" Src="M"/>
-        <OrdQty Qty="{pd_data['quantity']}"/>
-        <Px Px="{pd_data['execution_price']}"/>
-        <TrdCapRpt LastQty="{pd_data['quantity']}" LastPx="{pd_data['execution_price']}"/>
-        <Amt Typ="SMTL" Amt="{total_value}" Ccy="USD"/>
-        <Comm Typ="3" Comm="0.00" Ccy="USD"/>
-        <Pty ID="SECMASTER" R="1"/>
-        <Pty ID="EXCHANGE" R="17"/>
-    </ExecRpt>
-</FIXML>'''
-                    
-                    fixml_filename = f"FIX_{now.strftime('%d-%b-%Y').upper()}_{now.strftime('%H-%M-%S')}_{pd_data['symbol']}_{side}.xml"
-                    
-                    session.sql(f"""
-                        COPY INTO @SECURITY_MASTER_DB.TRADES.FIX_STAGE/{fixml_filename}
-                        FROM (SELECT '{fixml_msg.replace("'", "''")}')
-                        FILE_FORMAT = (TYPE = CSV FIELD_DELIMITER = NONE)
-                        OVERWRITE = TRUE
-                        SINGLE = TRUE
-                    """).collect()
-                    
+                    engine = get_matching_engine()
+                    with engine.lock:
+                        # Placing the same preview twice enters it once
+                        entered = [o for o in engine.client_orders.values()
+                                   if o.client['order_key'] == pd_data['order_key']]
+                        if entered:
+                            engine_order = entered[0]
+                        else:
+                            make_market(engine, pd_data['symbol'], pd_data['live_price'] or pd_data['execution_price'])
+                            engine_order = engine.submit(
+                                pd_data['symbol'], ACTIONS[pd_data['action']], pd_data['quantity'],
+                                PRICE_TYPES[pd_data['price_type']], DURATIONS[pd_data['duration']],
+                                limit=pd_data['limit_price'], stop=pd_data['stop_price'],
+                                trail_amount=pd_data['trail_amount'], trail_percent=pd_data['trail_percent'],
+                                client={'order_key': pd_data['order_key'], 'security_name': pd_data['security_name'],
+                                        'fills': []})
+                        book_engine_fills(engine)
                     st.session_state.order_confirmed = {
                         'success': True,
+                        'order_key': pd_data['order_key'],
+                        'order_id': order_id_for('equity', pd_data['order_key']),
+                        'engine_order_id': engine_order.order_id,
                         'side': side,
                         'security_name': pd_data['security_name'],
                         'price': pd_data['execution_price'],
                         'quantity': pd_data['quantity']
                     }
                     st.session_state.show_preview = False
-                    st.cache_data.clear()
-                    st.success(f"✅ Confirmed {side} {pd_data['security_name']} ${pd_data['execution_price']:,.2f} Quantity {pd_data['quantity']:,} - Portfolio updated!")
                     st.experimental_rerun()
                     
                 except Exception as e:
@@ -1497,14 +1730,10 @@ with tab10:
         
         if selected_bond_display and selected_bond_display != "-- Select a bond --":
             selected_bond_cusip = selected_bond_display.split(" - ")[0]
-            bond_match = tradeable_bonds[tradeable_bonds['CUSIP'] == selected_bond_cusip]
-            if not bond_match.empty:
-                selected_bond_info = bond_match.iloc[0]
+            selected_bond_info = security_index().bond(selected_bond_cusip)
         elif selected_holding and selected_holding != "-- Select --":
             selected_bond_cusip = selected_holding.split(" - ")[0]
-            bond_match = tradeable_bonds[tradeable_bonds['CUSIP'] == selected_bond_cusip]
-            if not bond_match.empty:
-                selected_bond_info = bond_match.iloc[0]
+            selected_bond_info = security_index().bond(selected_bond_cusip)
         
         if selected_bond_info is not None:
             st.markdown(f"""
@@ -1590,7 +1819,7 @@ with tab10:
                 "Yield",
                 min_value=0.01,
                 max_value=50.00,
-                value=selected_bond_info['CURRENT_YIELD'] if selected_bond_info is not None else 5.00,
+                value=selected_bond_info['CURRENT_YIELD'] if selected_bond_info is not None and pd.notna(selected_bond_info['CURRENT_YIELD']) else 5.00,
                 step=0.01,
                 format="%.2f",
                 key="bond_yield_input",
@@ -1598,6 +1827,27 @@ with tab10:
             )
             bond_price = 100.00
         
+        # Price <-> yield, accrued and risk at T+1 settlement
+        bond_risk = None
+        if selected_bond_info is not None:
+            bond_terms = pd.DataFrame([{
+                'COUPON_RATE': selected_bond_info['COUPON_RATE'],
+                'MATURITY_DATE': selected_bond_info['MATURITY_DATE'],
+                'COUPON_FREQUENCY': selected_bond_info.get('COUPON_FREQUENCY'),
+                'PRICE': bond_price,
+                'YIELD': bond_yield_input,
+            }])
+            bond_settlement = pd.Timestamp(settlement_date(pd.Timestamp.now(), 'Bond', 'OTC'))
+            if price_mode == "Price":
+                bond_risk = bond_analytics(bond_terms, bond_settlement, price_column='PRICE').iloc[0]
+            else:
+                bond_risk = bond_analytics(bond_terms, bond_settlement, yield_column='YIELD').iloc[0]
+                bond_price = round(float(bond_risk['CLEAN_PRICE']), 4) if pd.notna(bond_risk['CLEAN_PRICE']) else bond_price
+            if pd.notna(bond_risk['YTM']):
+                st.caption(f"Clean {bond_risk['CLEAN_PRICE']:.4f} · Dirty {bond_risk['DIRTY_PRICE']:.4f} · "
+                           f"YTM {bond_risk['YTM']:.3f}% · Mod. duration {bond_risk['MODIFIED_DURATION']:.2f} · "
+                           f"Convexity {bond_risk['CONVEXITY']:.1f}")
+        
         st.markdown("---")
         
         comm_col, total_col, calc_col = st.columns([1, 1, 1])
@@ -1608,6 +1858,7 @@ with tab10:
         
         face_value = bond_quantity * 1000
         est_total = face_value * (bond_price / 100)
+        accrued_total = face_value * bond_risk['ACCRUED'] / 100 if bond_risk is not None and pd.notna(bond_risk['ACCRUED']) else 0.0
         
         with total_col:
             st.markdown('<p style="font-size: 0.85rem; color: #64748b; margin-bottom: 0.1rem;">Est. Total</p>', unsafe_allow_html=True)
@@ -1615,7 +1866,8 @@ with tab10:
         
         with calc_col:
             if st.button("Calculate totals", key="calc_bond_totals"):
-                st.info(f"Face Value: ${face_value:,.0f} | Est. Total: ${est_total:,.2f}")
+                st.info(f"Face Value: ${face_value:,.0f} | Est. Total: ${est_total:,.2f} | "
+                        f"Accrued: ${accrued_total:,.2f} | Settlement: ${est_total + accrued_total:,.2f}")
         
         st.markdown("---")
         
@@ -1635,22 +1887,35 @@ with tab10:
                     'quantity': bond_quantity,
                     'face_value': face_value,
                     'price': bond_price,
-                    'yield_value': bond_yield_input if bond_yield_input else selected_bond_info['CURRENT_YIELD'],
+                    'yield_value': (bond_yield_input if bond_yield_input
+                                    else bond_risk['YTM'] if bond_risk is not None and pd.notna(bond_risk['YTM'])
+                                    else selected_bond_info['CURRENT_YIELD']),
                     'exec_type': bond_exec_type,
                     'est_total': est_total,
+                    'accrued': accrued_total,
+                    'modified_duration': bond_risk['MODIFIED_DURATION'] if bond_risk is not None else None,
+                    'position_dv01': face_value * bond_risk['DV01'] / 100 if bond_risk is not None else None,
                     'credit_rating': selected_bond_info['CREDIT_RATING'],
-                    'coupon_rate': selected_bond_info['COUPON_RATE']
+                    'coupon_rate': selected_bond_info['COUPON_RATE'],
+                    'order_key': new_order_key()
                 }
                 st.session_state.bond_show_preview = True
                 st.session_state.bond_order_confirmed = None
         
         if st.session_state.bond_order_confirmed and st.session_state.bond_order_confirmed.get('success'):
             conf = st.session_state.bond_order_confirmed
+            booked, progress = order_progress(conf)
+            if not booked:
+                st.session_state.bond_order_confirmed = None
+                st.error(f"❌ {progress}")
+        
+        if st.session_state.bond_order_confirmed and st.session_state.bond_order_confirmed.get('success'):
             st.markdown(f"""
             <div style="background: #dcfce7; border: 2px solid #22c55e; border-radius: 10px; padding: 1rem; margin: 0.75rem 0;">
                 <p style="color: #166534; margin: 0; font-size: 1rem; font-weight: 600;">
                     ✅ Bond {conf['issuer_name']} confirmed at ${conf['price']:.2f} with Quantity {conf['quantity']:,}
                 </p>
+                <p style="color: #374151; margin: 0.25rem 0 0 0; font-size: 0.8rem;">{progress}</p>
             </div>
             """, unsafe_allow_html=True)
         
@@ -1668,6 +1933,9 @@ with tab10:
                     <tr><td style="padding: 0.35rem 0; color: #6b7280;">Price:</td><td style="padding: 0.35rem 0; color: #000000; font-weight: 700;">{bpd['price']:.4f}%</td></tr>
                     <tr><td style="padding: 0.35rem 0; color: #6b7280;">Yield:</td><td style="padding: 0.35rem 0; color: #000000; font-weight: 700;">{bpd['yield_value']:.2f}%</td></tr>
                     <tr><td style="padding: 0.35rem 0; color: #6b7280;">Est. Total:</td><td style="padding: 0.35rem 0; color: #000000; font-weight: 800;">${bpd['est_total']:,.2f}</td></tr>
+                    <tr><td style="padding: 0.35rem 0; color: #6b7280;">Accrued Interest:</td><td style="padding: 0.35rem 0; color: #000000; font-weight: 700;">${bpd['accrued']:,.2f}</td></tr>
+                    <tr><td style="padding: 0.35rem 0; color: #6b7280;">Settlement Amount:</td><td style="padding: 0.35rem 0; color: #000000; font-weight: 700;">${bpd['est_total'] + bpd['accrued']:,.2f}</td></tr>
+                    <tr><td style="padding: 0.35rem 0; color: #6b7280;">Mod. Duration / DV01:</td><td style="padding: 0.35rem 0; color: #000000; font-weight: 700;">{bpd['modified_duration'] or 0:.2f} / ${bpd['position_dv01'] or 0:,.2f}</td></tr>
                 </table>
             </div>
             """, unsafe_allow_html=True)
@@ -1681,73 +1949,29 @@ with tab10:
                 cancel_bond_order = st.button("❌ Cancel", key="cancel_bond_order_btn", use_container_width=True)
             
             if place_bond_order:
-                import uuid
                 from datetime import datetime
                 
-                order_id = f"BND-{str(uuid.uuid4())[:8].upper()}"
-                trade_id = f"TRD-{str(uuid.uuid4())[:8].upper()}"
                 now = datetime.now()
-                trade_date = now.strftime('%Y-%m-%d')
-                settlement_date = (now + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
-                
                 side = bpd['action'].upper()
-                side_code = '1' if side == 'BUY' else '2'
                 
                 try:
-                    session.sql(f"""
-                        INSERT INTO SECURITY_MASTER_DB.TRADES.BOND_TRADES (
-                            TRADE_ID, TRADE_DATE, SETTLEMENT_DATE, BOND_ID, CUSIP, ISSUER,
-                            SIDE, FACE_VALUE, PRICE, YIELD, TOTAL_VALUE, CURRENCY,
-                            COUNTERPARTY, TRADER, STATUS
-                        ) VALUES (
-                            '{trade_id}',
-                            '{trade_date}',
-                            '{settlement_date}',
-                            '{bpd['bond_id']}',
-                            '{bpd['cusip']}',
-                            '{bpd['issuer_name'].replace("'", "''")}',
-                            '{side}',
-                            {bpd['face_value']},
-                            {bpd['price']},
-                            {bpd['yield_value']},
-                            {bpd['est_total']},
-                            'USD',
-                            'INTERNAL',
-                            'CURRENT_USER',
-                            'CONFIRMED'
-                        )
-                    """).collect()
-                    
-                    fixml_bond_msg = f'''<?xml version="1.0" encoding="UTF-8"?>
-<FIXML xmlns="http://www.fixprotocol.org/FIXML-5-0-SP2" v="5.0SP2">
-    <ExecRpt ExecID="{trade_id}" ExecTyp="F" OrdStat="2" Side="{side_code}" LeavesQty="0" CumQty="{bpd['face_value']}" AvgPx="{bpd['price']}" TrdDt="{trade_date}" TxnTm="{now.strftime('%Y-%m-%dT%H:%M:%S')}Z" SettlDt="{settlement_date}">
-        <Hdr SID="SECMASTER" TID="EXCHANGE" Snt="{now.strftime('%Y-%m-%dT%H:%M:%S')}Z"/>
-        <OrdID ID="{order_id}"/>
-        <Instrmt CUSIP="{bpd['cusip']}" SecTyp="CORP" ID="{bpd['cusip']}" Src="1" Issr="{bpd['issuer_name'].replace('"', '&quot;')}"/>
-        <Yield Typ="CURRENT" Yld="{bpd['yield_value']}"/>
-        <OrdQty Qty="{bpd['face_value']}"/>
-        <Px Px="{bpd['price']}"/>
-        <TrdCapRpt LastQty="{bpd['face_value']}" LastPx="{bpd['price']}"/>
-        <Amt Typ="SMTL" Amt="{bpd['est_total']}" Ccy="USD"/>
-        <Comm Typ="3" Comm="0.00" Ccy="USD"/>
-        <Pty ID="SECMASTER" R="1"/>
-        <Pty ID="EXCHANGE" R="17"/>
-    </ExecRpt>
-</FIXML>'''
-                    
-                    bond_symbol = bpd['cusip']
-                    fixml_bond_filename = f"FIXML_BOND_{side}_{bond_symbol}_{now.strftime('%d-%b-%Y').upper()}_{now.strftime('%H-%M-%S')}.xml"
-                    
-                    session.sql(f"""
-                        COPY INTO @SECURITY_MASTER_DB.TRADES.BOND_ORDERS/{fixml_bond_filename}
-                        FROM (SELECT '{fixml_bond_msg.replace("'", "''")}')
-                        FILE_FORMAT = (TYPE = CSV FIELD_DELIMITER = NONE)
-                        OVERWRITE = TRUE
-                        SINGLE = TRUE
-                    """).collect()
-                    
+                    ticket = get_order_pipeline().submit(Order('bond', bpd['order_key'], {
+                        'bond_id': bpd['bond_id'],
+                        'cusip': bpd['cusip'],
+                        'issuer_name': bpd['issuer_name'],
+                        'side': side,
+                        'face_value': bpd['face_value'],
+                        'price': bpd['price'],
+                        'yield_value': bpd['yield_value'],
+                        'total_value': bpd['est_total'],
+                        'trade_date': now.strftime('%Y-%m-%d'),
+                        'settlement_date': settlement_date(now, 'Bond', 'OTC').strftime('%Y-%m-%d'),
+                        'executed_at': now,
+                    }))
                     st.session_state.bond_order_confirmed = {
                         'success': True,
+                        'order_key': ticket.key,
+                        'order_id': ticket.order_id,
                         'side': side,
                         'issuer_name': bpd['issuer_name'],
                         'price': bpd['price'],
@@ -1755,14 +1979,6 @@ with tab10:
                         'total': bpd['est_total']
                     }
                     st.session_state.bond_show_preview = False
-                    st.cache_data.clear()
-                    st.markdown(f"""
-                    <div style="background: #dcfce7; border: 2px solid #22c55e; border-radius: 10px; padding: 1rem; margin: 0.75rem 0;">
-                        <p style="color: #166534; margin: 0; font-size: 1rem; font-weight: 600;">
-                            ✅ Bond {bpd['issuer_name']} confirmed at ${bpd['price']:.2f} with Quantity {bpd['quantity']:,}
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
                     st.experimental_rerun()
                     
                 except Exception as e:
@@ -1814,11 +2030,82 @@ with tab10:
             st.metric("Coupon Rate", f"{selected_bond_info['COUPON_RATE']:.2f}%")
             st.metric("Credit Rating", selected_bond_info['CREDIT_RATING'])
             st.metric("Maturity", str(selected_bond_info['MATURITY_DATE'])[:10])
+            at_yield = bond_analytics(pd.DataFrame([{
+                'COUPON_RATE': selected_bond_info['COUPON_RATE'],
+                'CURRENT_YIELD': selected_bond_info['CURRENT_YIELD'],
+                'MATURITY_DATE': selected_bond_info['MATURITY_DATE'],
+                'COUPON_FREQUENCY': selected_bond_info.get('COUPON_FREQUENCY'),
+            }])).iloc[0]
+            if pd.notna(at_yield['CLEAN_PRICE']):
+                st.metric("Price at Current Yield", f"{at_yield['CLEAN_PRICE']:.4f}")
+                st.metric("Modified Duration", f"{at_yield['MODIFIED_DURATION']:.2f}")
+                st.metric("DV01 per $1MM", f"${at_yield['DV01'] * 10_000:,.0f}")
         else:
             st.info("Select a bond to view stats")
 
 # Footer
 st.markdown("---")
+with st.expander("🗄️ Cache statistics"):
+    st.dataframe(cache_stats(), use_container_width=True)
+with st.expander("⏱️ Query statistics"):
+    st.dataframe(get_query_runner().query_stats(), use_container_width=True)
+with st.expander("📨 Order pipeline"):
+    pipeline = get_order_pipeline()
+    latency = pipeline.latency_stats()
+    pipeline_cols = st.columns(4)
+    pipeline_cols[0].metric("Queued", pipeline.pending())
+    pipeline_cols[1].metric("Booked", pipeline.stats['committed'], f"{pipeline.stats['batches']} batches")
+    pipeline_cols[2].metric("Commit p50", f"{latency['p50_ms']:,.0f} ms" if latency['orders'] else "-")
+    pipeline_cols[3].metric("Commit p95", f"{latency['p95_ms']:,.0f} ms" if latency['orders'] else "-")
+    st.caption(f"{pipeline.stats['duplicates']} repeated submits ignored · {pipeline.stats['retries']} batch retries · "
+               f"{pipeline.stats['failed']} orders failed · {pipeline.stats['file_errors']} FIXML writes failed")
+    st.dataframe(pipeline.tickets_frame(), use_container_width=True)
+with st.expander("📈 Matching engine"):
+    engine = get_matching_engine()
+    with engine.lock:
+        working = engine.client_frame(working_only=True)
+        client_orders = engine.client_frame()
+        fills = engine.fills_frame().tail(200)
+        engine_stats = dict(engine.stats)
+    engine_cols = st.columns(4)
+    engine_cols[0].metric("Working client orders", len(working))
+    engine_cols[1].metric("Orders entered", f"{engine_stats['orders']:,}")
+    engine_cols[2].metric("Fills", f"{len(engine.fills):,}")
+    engine_cols[3].metric("Stops triggered", engine_stats['triggered'])
+    if not working.empty:
+        cancel_col1, cancel_col2 = st.columns([3, 1])
+        with cancel_col1:
+            labels = {r.ORDER_ID: f"#{r.ORDER_ID} {r.SIDE} {r.QUANTITY:,} {r.SYMBOL} {r.TYPE} {r.TIF} ({r.STATUS})"
+                      for r in working.itertuples()}
+            cancel_id = st.selectbox("Working order", list(labels), format_func=labels.get, key="engine_cancel_id")
+        with cancel_col2:
+            if st.button("Cancel order", key="engine_cancel_btn", use_container_width=True):
+                with engine.lock:
+                    engine.cancel(cancel_id)
+                st.experimental_rerun()
+    st.dataframe(client_orders, use_container_width=True)
+    st.caption("Most recent fills, market maker included")
+    st.dataframe(fills.iloc[::-1], use_container_width=True)
+with st.expander("🧾 FIX reconciliation"):
+    recon_col1, recon_col2 = st.columns([1, 3])
+    with recon_col1:
+        recon_days = st.number_input("Days back", min_value=1, max_value=365, value=7, key="fix_recon_days")
+        run_recon = st.button("Reconcile staged FIX", key="fix_recon_btn", use_container_width=True)
+    if run_recon:
+        from datetime import datetime, timedelta
+        since = (datetime.now() - timedelta(days=int(recon_days))).strftime('%Y-%m-%d')
+        with st.spinner("Reading FIX stages..."):
+            reports = pd.concat([frame for stage in (EQUITY_FIX_STAGE, BOND_FIX_STAGE)
+                                 for frame in read_stage(session, stage)], ignore_index=True)
+            reports = reports[reports['TRADE_DATE'] >= since]
+            recon = reconcile(reports, run_query('booked_trades_since', since, since))
+        with recon_col2:
+            counts = recon['STATUS'].value_counts()
+            recon_metrics = st.columns(4)
+            for col, status in zip(recon_metrics, ('MATCHED', 'BREAK', 'MISSING_REPORT', 'MISSING_TRADE')):
+                col.metric(status.replace('_', ' ').title(), int(counts.get(status, 0)))
+            st.caption(f"{len(reports):,} execution reports · {(~reports['VALID']).sum():,} failed checksum")
+            st.dataframe(recon[recon['STATUS'] != 'MATCHED'], use_container_width=True)
 st.markdown("""
 <div style="text-align: center; color: #94a3b8; font-family: 'JetBrains Mono', monospace; font-size: 0.75rem;">
     Data Source: Snowflake Marketplace | Built with Streamlit in Snowflake
@@ -0,0 +1,151 @@
+"""
+Table-scoped caching for Streamlit data loaders
+
+Every loader declares the tables it reads:
+
+    @cached_loader(ttl=300, tables=(EQUITY_TRADES, SP500))
+    def load_trades_fast(symbol=None): ...
+
+and a write invalidates only the loaders that read the written table:
+
+    invalidate_tables(EQUITY_TRADES)
+
+instead of st.cache_data.clear(), which also throws away the reference
+data (SP500, CORPORATE_BONDS, ...) that an order never touches.
+
+Loaders are registered by qualified name, so redefining one on every
+script rerun (loaders inside `with tab:` blocks) replaces the previous
+registration rather than adding to it. Hit/miss/invalidation counters are
+kept per loader for the whole server process, like the cache itself.
+"""
+
+import functools
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+EQUITY_TRADES = 'EQUITY_TRADES'
+BOND_TRADES = 'BOND_TRADES'
+SP500 = 'SP500'
+NYSE_SECURITIES = 'NYSE_SECURITIES'
+CORPORATE_BONDS = 'CORPORATE_BONDS'
+SECURITY_MASTER_REFERENCE = 'SECURITY_MASTER_REFERENCE'
+SECURITY_MASTER_HISTORY = 'SECURITY_MASTER_HISTORY'
+TRADE_SETTLEMENTS = 'TRADE_SETTLEMENTS'
+
+_lock = threading.Lock()
+_loaders = {}        # loader name -> _Loader
+_dependents = {}     # table -> set of loader names
+
+
+class _Loader:
+    def __init__(self, name, tables, clear):
+        self.name = name
+        self.tables = tables
+        self._clear = clear
+        self.calls = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.last_invalidated = None
+
+    def record(self, hit):
+        with _lock:
+            self.calls += 1
+            if not hit:
+                self.misses += 1
+
+    def clear(self):
+        self._clear()
+        self.invalidations += 1
+        self.last_invalidated = time.time()
+
+
+def register_cache(name, tables, clear):
+    """
+    Make any cache invalidatable by table, not just st.cache_data loaders.
+
+    Args:
+        name: Name shown in cache_stats(); re-registering keeps the counters
+        tables: Names of the tables the cache reads
+        clear: Callable that empties the cache
+
+    Returns:
+        Handle whose record(hit) feeds the hit/miss counters
+    """
+    tables = tuple(tables)
+    with _lock:
+        previous = _loaders.get(name)
+        loader = _Loader(name, tables, clear)
+        if previous is not None:
+            loader.calls, loader.misses = previous.calls, previous.misses
+            loader.invalidations = previous.invalidations
+            loader.last_invalidated = previous.last_invalidated
+            for table in previous.tables:
+                _dependents.get(table, set()).discard(name)
+        _loaders[name] = loader
+        for table in tables:
+            _dependents.setdefault(table, set()).add(name)
+    return loader
+
+
+def cached_loader(ttl, tables):
+    """
+    st.cache_data(ttl=ttl) plus a dependency on `tables`.
+
+    Args:
+        ttl: Seconds before an entry expires on its own
+        tables: Names of the tables the loader reads
+    """
+    def decorator(func):
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def load(*args, **kwargs):
+            # Only runs on a cache miss
+            with _lock:
+                _loaders[name].misses += 1
+            return func(*args, **kwargs)
+
+        cached = st.cache_data(ttl=ttl)(load)
+        loader = register_cache(name, tables, cached.clear)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _lock:
+                loader.calls += 1
+            return cached(*args, **kwargs)
+
+        wrapper.clear = loader.clear
+        wrapper.tables = loader.tables
+        return wrapper
+
+    return decorator
+
+
+def invalidate_tables(*tables):
+    """Clear every loader that reads any of `tables`; returns the loader names."""
+    with _lock:
+        names = sorted(set().union(*(_dependents.get(t, set()) for t in tables)))
+        loaders = [_loaders[n] for n in names]
+    for loader in loaders:
+        loader.clear()
+    return names
+
+
+def cache_stats():
+    """One row per loader: tables, calls, hits, misses, invalidations."""
+    with _lock:
+        rows = [{
+            'LOADER': l.name,
+            'TABLES': ', '.join(l.tables),
+            'CALLS': l.calls,
+            'HITS': l.calls - l.misses,
+            'MISSES': l.misses,
+            'HIT_RATE': (l.calls - l.misses) / l.calls if l.calls else None,
+            'INVALIDATIONS': l.invalidations,
+            'LAST_INVALIDATED': pd.to_datetime(l.last_invalidated, unit='s') if l.last_invalidated else None,
+        } for l in _loaders.values()]
+    return pd.DataFrame(rows, columns=['LOADER', 'TABLES', 'CALLS', 'HITS', 'MISSES', 'HIT_RATE',
+                                       'INVALIDATIONS', 'LAST_INVALIDATED'])
@@ -0,0 +1,188 @@
+"""
+Keyset-paginated trade blotter
+
+Serves the Trade History and Equity Trades tabs one page at a time with
+every filter (symbol, side, trade date range, NYSE match status) pushed
+into SQL, instead of pulling the latest 500 rows and filtering those in
+pandas. Pages are ordered by (TRADE_DATE, TRADE_ID) descending and the
+next page starts strictly after the last row of the current one:
+
+    WHERE ... AND (t.TRADE_DATE < :d OR (t.TRADE_DATE = :d AND t.TRADE_ID < :id))
+    ORDER BY t.TRADE_DATE DESC, t.TRADE_ID DESC
+    LIMIT page_size + 1
+
+so page N costs the same as page 1 however deep the user browses, and a
+trade inserted meanwhile never shifts rows between pages. The extra row
+tells whether a next page exists; when it does, that page is fetched in
+the background so "Next" is usually a cache hit.
+"""
+
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+PAGE_SIZE = 100
+PAGE_TTL = 300          # seconds a fetched page is served without re-querying
+PAGE_CACHE_SIZE = 64    # pages kept across all users, least recently used evicted
+PREFETCH_WORKERS = 2
+
+VIEWS = {
+    # Trade History: S&P 500 trades with the security name
+    'history': """
+        SELECT t.TRADE_ID, t.SYMBOL, s.SECURITY_NAME, t.TRADE_DATE, t.SIDE, t.QUANTITY, t.PRICE, t.TOTAL_VALUE
+        FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
+        JOIN SECURITY_MASTER_DB.SECURITIES.SP500 s ON t.SYMBOL = s.SYMBOL
+    """,
+    # Equity Trades: every trade with its NYSE security master match
+    'nyse': """
+        SELECT t.TRADE_ID, t.SYMBOL, n.SECURITY_NAME as NYSE_COMPANY_NAME, n.ISIN as FIGI,
+            t.TRADE_DATE, t.SIDE, t.QUANTITY, t.PRICE, t.TOTAL_VALUE,
+            CASE WHEN n.SYMBOL IS NOT NULL THEN 'Matched' ELSE 'Unmatched' END as MATCH_STATUS
+        FROM SECURITY_MASTER_DB.TRADES.EQUITY_TRADES t
+        LEFT JOIN SECURITY_MASTER_DB.EQUITY.NYSE_SECURITIES n ON t.SYMBOL = n.SYMBOL
+    """,
+}
+MATCH_CONDITIONS = {'Matched': 'n.SYMBOL IS NOT NULL', 'Unmatched': 'n.SYMBOL IS NULL'}
+FILTERS = ('symbol', 'side', 'date_from', 'date_to', 'match_status')
+
+
+def _bindable(value):
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, datetime.date) or value is None:
+        return value
+    return pd.Timestamp(value).to_pydatetime()
+
+
+def normalize_filters(filters):
+    """Drop empty filters and fix the key order so equal filters hash equal."""
+    filters = filters or {}
+    unknown = set(filters) - set(FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown blotter filters: {sorted(unknown)}")
+    return tuple((k, filters[k]) for k in FILTERS if filters.get(k) not in (None, ''))
+
+
+def build_page_query(view, filters, cursor, limit):
+    """SQL and bind parameters for one page after `cursor` ((TRADE_DATE, TRADE_ID) or None)."""
+    if view not in VIEWS:
+        raise ValueError(f"Unknown blotter view '{view}', expected one of {tuple(VIEWS)}")
+    where, params = [], []
+    for key, value in filters:
+        if key == 'symbol':
+            where.append("t.SYMBOL = ?")
+            params.append(value)
+        elif key == 'side':
+            where.append("t.SIDE = ?")
+            params.append(value)
+        elif key == 'date_from':
+            where.append("t.TRADE_DATE >= ?")
+            params.append(_bindable(value))
+        elif key == 'date_to':
+            where.append("t.TRADE_DATE <= ?")
+            params.append(_bindable(value))
+        elif key == 'match_status':
+            if view != 'nyse' or value not in MATCH_CONDITIONS:
+                raise ValueError(f"match_status '{value}' is not valid for view '{view}'")
+            where.append(MATCH_CONDITIONS[value])
+    if cursor is not None:
+        trade_date, trade_id = cursor
+        where.append("(t.TRADE_DATE < ? OR (t.TRADE_DATE = ? AND t.TRADE_ID < ?))")
+        params.extend([trade_date, trade_date, trade_id])
+    query = VIEWS[view]
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += f" ORDER BY t.TRADE_DATE DESC, t.TRADE_ID DESC LIMIT {int(limit)}"
+    return query, params
+
+
+class BlotterPage:
+    def __init__(self, rows, cursor, next_cursor, seconds, cached):
+        self.rows = rows
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.seconds = seconds
+        self.cached = cached
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class TradeBlotter:
+    """
+    Page source shared by all sessions of the app.
+
+    Args:
+        session: Snowpark session
+        page_size: Rows per page
+        ttl: Seconds a cached page stays valid
+        prefetch: Fetch the following page in the background
+        on_lookup: Optional callable(hit) told about every page request
+    """
+
+    def __init__(self, session, page_size=PAGE_SIZE, ttl=PAGE_TTL, cache_size=PAGE_CACHE_SIZE,
+                 prefetch=True, on_lookup=None):
+        self.session = session
+        self.page_size = page_size
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.prefetch = prefetch
+        self.on_lookup = on_lookup
+        self.executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="blotter")
+        self.pages = OrderedDict()   # key -> (submitted_at, future)
+        self.lock = threading.Lock()
+        self.stats = {'queries': 0, 'hits': 0, 'misses': 0, 'prefetches': 0}
+
+    def _fetch(self, view, filters, cursor):
+        query, params = build_page_query(view, filters, cursor, self.page_size + 1)
+        start = time.perf_counter()
+        rows = self.session.sql(query, params=params).to_pandas()
+        with self.lock:
+            self.stats['queries'] += 1
+        return rows, time.perf_counter() - start
+
+    def _future(self, key, prefetch=False):
+        """(future, was cached) for a page, submitting the query if needed."""
+        now = time.time()
+        with self.lock:
+            entry = self.pages.get(key)
+            if entry is not None:
+                submitted_at, future = entry
+                failed = future.done() and future.exception() is not None
+                if not failed and now - submitted_at < self.ttl:
+                    self.pages.move_to_end(key)
+                    return future, True
+            future = self.executor.submit(self._fetch, *key)
+            self.pages[key] = (now, future)
+            while len(self.pages) > self.cache_size:
+                self.pages.popitem(last=False)
+            if prefetch:
+                self.stats['prefetches'] += 1
+        return future, False
+
+    def page(self, view, filters=None, cursor=None):
+        """One page of trades, newest first, starting after `cursor`."""
+        key = (view, normalize_filters(filters), cursor)
+        future, cached = self._future(key)
+        rows, seconds = future.result()
+        with self.lock:
+            self.stats['hits' if cached else 'misses'] += 1
+        if self.on_lookup is not None:
+            self.on_lookup(cached)
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows.iloc[:self.page_size]
+            last = rows.iloc[-1]
+            next_cursor = (_bindable(last['TRADE_DATE']), last['TRADE_ID'])
+            if self.prefetch:
+                self._future((view, key[1], next_cursor), prefetch=True)
+        return BlotterPage(rows.reset_index(drop=True), cursor, next_cursor, seconds, cached)
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
@@ -0,0 +1,241 @@
+"""
+Mark-to-market valuation of the equity and bond book
+
+Equity positions come from positions.PositionBook (net quantity, cost
+basis, realized P&L and trade cash flows per symbol) and are priced from
+quote_service.QuoteService, falling back to the last trade price when no
+live quote is cached yet: a valuation never waits on a quote fetch, it
+picks the quote up on a later refresh. Bond positions are aggregated per
+CUSIP from BOND_TRADES in one query and priced with bond_analytics from
+the CORPORATE_BONDS coupon, current yield, frequency and maturity, with
+accrued interest, duration and DV01 alongside.
+
+Everything is held in NumPy arrays, one row per symbol or CUSIP, so
+valuing the whole book is a handful of array operations. refresh()
+re-reads the quote cache and re-prices only the symbols whose price
+moved, adjusting the totals by the difference; the arrays are rebuilt
+only when the position book has applied new trades. Bond rows are
+reloaded after invalidate_bonds() (a bond order or a reference data
+change).
+
+    AUM = opening cash + trade cash flows + equity market value + bond market value
+        = opening cash + realized P&L + unrealized P&L
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from bond_analytics import bond_analytics
+
+BOND_POSITIONS_QUERY = """
+    SELECT t.CUSIP, b.ISSUER_NAME, b.SECTOR, b.CREDIT_RATING, b.COUPON_RATE, b.CURRENT_YIELD,
+        b.COUPON_FREQUENCY, b.MATURITY_DATE,
+        SUM(CASE WHEN t.SIDE = 'BUY' THEN t.FACE_VALUE ELSE -t.FACE_VALUE END) AS NET_FACE,
+        SUM(CASE WHEN t.SIDE = 'BUY' THEN t.FACE_VALUE ELSE 0 END) AS FACE_BOUGHT,
+        SUM(CASE WHEN t.SIDE = 'BUY' THEN t.TOTAL_VALUE ELSE 0 END) AS BUY_VALUE,
+        SUM(CASE WHEN t.SIDE = 'SELL' THEN t.TOTAL_VALUE ELSE 0 END) AS SELL_VALUE
+    FROM SECURITY_MASTER_DB.TRADES.BOND_TRADES t
+    JOIN SECURITY_MASTER_DB.FIXED_INCOME.CORPORATE_BONDS b ON t.CUSIP = b.CUSIP
+    GROUP BY t.CUSIP, b.ISSUER_NAME, b.SECTOR, b.CREDIT_RATING, b.COUPON_RATE, b.CURRENT_YIELD,
+        b.COUPON_FREQUENCY, b.MATURITY_DATE
+"""
+
+EQUITY_COLUMNS = ['SYMBOL', 'NET_POSITION', 'PRICE', 'PRICE_SOURCE', 'MARKET_VALUE', 'COST_BASIS',
+                  'UNREALIZED_PNL', 'REALIZED_PNL']
+BOND_COLUMNS = ['CUSIP', 'ISSUER_NAME', 'SECTOR', 'CREDIT_RATING', 'NET_FACE', 'PRICE', 'YTM', 'MARKET_VALUE',
+                'ACCRUED_INTEREST', 'COST_BASIS', 'UNREALIZED_PNL', 'REALIZED_PNL', 'MODIFIED_DURATION',
+                'CONVEXITY', 'DV01']
+
+
+class ValuationEngine:
+    """
+    Book-wide mark-to-market.
+
+    Args:
+        book: positions.PositionBook with the equity trades applied
+        quotes: quote_service.QuoteService (or None to value at last trade prices)
+        session: Snowpark session for the bond positions (None values equities only)
+        opening_cash: Cash before the first trade
+    """
+
+    def __init__(self, book, quotes=None, session=None, opening_cash=0.0):
+        self.book = book
+        self.quotes = quotes
+        self.session = session
+        self.opening_cash = opening_cash
+        self.lock = threading.RLock()
+        self.book_version = None
+        self.symbols = np.empty(0, dtype=object)
+        self.quantity = self.cost = self.realized = self.cash_flow = np.empty(0)
+        self.last_trade = self.prices = self.market_value = np.empty(0)
+        self.live = np.empty(0, dtype=bool)
+        self.totals = {'equity_market_value': 0.0, 'equity_unrealized': 0.0}
+        self.bonds = None       # DataFrame of priced bond positions, None until loaded
+        self.valued_at = None
+        self.stats = {'rebuilds': 0, 'refreshes': 0, 'last_repriced': 0, 'last_refresh_seconds': 0.0,
+                      'bond_loads': 0}
+
+    # ---- equity -------------------------------------------------------------------------
+
+    def _rebuild(self):
+        """Arrays from the position book; every row is priced again afterwards."""
+        with self.book.lock:
+            positions = list(self.book.positions.values())
+        self.symbols = np.array([p.symbol for p in positions], dtype=object)
+        self.quantity = np.array([p.quantity for p in positions], dtype=np.float64)
+        self.cost = np.array([p.cost_basis for p in positions], dtype=np.float64)
+        self.realized = np.array([p.realized for p in positions], dtype=np.float64)
+        self.cash_flow = np.array([p.sell_value - p.buy_value for p in positions], dtype=np.float64)
+        self.last_trade = np.array([p.last_price if p.last_price is not None else np.nan for p in positions],
+                                   dtype=np.float64)
+        self.prices = np.full(len(positions), np.nan)
+        self.live = np.zeros(len(positions), dtype=bool)
+        self.market_value = np.zeros(len(positions))
+        self.totals['equity_market_value'] = 0.0
+        self.totals['equity_unrealized'] = -float(self.cost.sum())
+        self.stats['rebuilds'] += 1
+
+    def _latest_prices(self):
+        """Live quote where one is cached, else the last trade price; missing quotes are fetched for the next refresh."""
+        prices = self.last_trade.copy()
+        live = np.zeros(len(prices), dtype=bool)
+        open_rows = np.flatnonzero(self.quantity != 0)
+        if self.quotes is not None and len(open_rows):
+            quotes = self.quotes.get_quotes(self.symbols[open_rows].tolist(), wait=False)
+            quoted = np.array([(quotes.get(s) or {}).get('price') for s in self.symbols[open_rows]],
+                              dtype=np.float64)
+            ok = np.isfinite(quoted)
+            prices[open_rows[ok]] = quoted[ok]
+            live[open_rows[ok]] = True
+        return prices, live
+
+    def refresh(self):
+        """Re-price what moved; returns the number of rows re-priced."""
+        start = time.perf_counter()
+        with self.lock:
+            version = (self.book.stats['full_loads'], self.book.stats['trades_applied'])
+            if version != self.book_version:
+                self._rebuild()
+                self.book_version = version
+            prices, live = self._latest_prices()
+            changed = np.flatnonzero(~((prices == self.prices) | (np.isnan(prices) & np.isnan(self.prices))))
+            if len(changed):
+                new_value = self.quantity[changed] * np.nan_to_num(prices[changed])
+                delta = float(new_value.sum() - self.market_value[changed].sum())
+                self.market_value[changed] = new_value
+                self.prices[changed] = prices[changed]
+                self.totals['equity_market_value'] += delta
+                self.totals['equity_unrealized'] += delta
+            self.live = live
+            if self.bonds is None:
+                self._load_bonds()
+            self.valued_at = time.time()
+            self.stats['refreshes'] += 1
+            self.stats['last_repriced'] = len(changed)
+            self.stats['last_refresh_seconds'] = time.perf_counter() - start
+        return len(changed)
+
+    def equity_frame(self):
+        """One row per symbol with its price, market value and P&L."""
+        with self.lock:
+            return pd.DataFrame({
+                'SYMBOL': self.symbols,
+                'NET_POSITION': self.quantity,
+                'PRICE': self.prices,
+                'PRICE_SOURCE': np.where(self.live, 'LIVE', 'LAST TRADE'),
+                'MARKET_VALUE': self.market_value,
+                'COST_BASIS': self.cost,
+                'UNREALIZED_PNL': self.market_value - self.cost,
+                'REALIZED_PNL': self.realized,
+            }, columns=EQUITY_COLUMNS)
+
+    # ---- bonds --------------------------------------------------------------------------
+
+    def _load_bonds(self):
+        if self.session is None:
+            return
+        self.bonds = self.price_bonds(self.session.sql(BOND_POSITIONS_QUERY).to_pandas())
+        self.stats['bond_loads'] += 1
+
+    @staticmethod
+    def price_bonds(positions, as_of=None):
+        """
+        Value per-CUSIP bond positions (BOND_POSITIONS_QUERY rows).
+
+        Market value is at the clean price (matured bonds at par, their
+        redemption value) with accrued interest reported beside it. A bond
+        the pricer cannot value (no current yield, say) keeps a NaN price,
+        market value and unrealized P&L, so it is left out of the totals
+        instead of being marked at a made-up price; summary() counts them. Open face is carried at the
+        average purchase price, so unrealized P&L is market value less
+        that cost and realized P&L is what sales earned over it. DV01 is
+        per position (net face), in dollars per basis point.
+        """
+        as_of = pd.Timestamp(as_of or pd.Timestamp.now().normalize())
+        df = positions.copy()
+        for column in ('COUPON_RATE', 'NET_FACE', 'FACE_BOUGHT', 'BUY_VALUE', 'SELL_VALUE'):
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0.0).astype(np.float64)
+        df['CURRENT_YIELD'] = pd.to_numeric(df['CURRENT_YIELD'], errors='coerce').astype(np.float64)
+        marks = bond_analytics(df, as_of)
+        matured = (pd.to_datetime(df['MATURITY_DATE']) <= as_of).to_numpy()
+        df['PRICE'] = np.where(matured, 100.0, marks['CLEAN_PRICE'].to_numpy())
+        df['YTM'] = marks['YTM']
+        net_face = df['NET_FACE'].to_numpy()
+        df['ACCRUED_INTEREST'] = net_face * marks['ACCRUED'].fillna(0.0).to_numpy() / 100
+        df['MODIFIED_DURATION'] = marks['MODIFIED_DURATION']
+        df['CONVEXITY'] = marks['CONVEXITY']
+        df['DV01'] = net_face * marks['DV01'].fillna(0.0).to_numpy() / 100
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_cost = np.where(df['FACE_BOUGHT'] > 0, df['BUY_VALUE'] / df['FACE_BOUGHT'], 0.0)
+        df['MARKET_VALUE'] = net_face * df['PRICE'].to_numpy() / 100
+        df['COST_BASIS'] = net_face * avg_cost
+        df['UNREALIZED_PNL'] = df['MARKET_VALUE'] - df['COST_BASIS']
+        df['REALIZED_PNL'] = df['SELL_VALUE'] - (df['FACE_BOUGHT'] - net_face) * avg_cost
+        df['CASH_FLOW'] = df['SELL_VALUE'] - df['BUY_VALUE']
+        return df
+
+    def bond_frame(self):
+        """One row per CUSIP with its model price, market value and P&L."""
+        with self.lock:
+            if self.bonds is None:
+                return pd.DataFrame(columns=BOND_COLUMNS)
+            return self.bonds[BOND_COLUMNS]
+
+    def invalidate_bonds(self):
+        with self.lock:
+            self.bonds = None
+
+    # ---- book totals --------------------------------------------------------------------
+
+    def summary(self):
+        """Headline numbers for the whole book."""
+        with self.lock:
+            bonds = self.bonds if self.bonds is not None else pd.DataFrame(
+                columns=['NET_FACE', 'MARKET_VALUE', 'UNREALIZED_PNL', 'REALIZED_PNL', 'CASH_FLOW', 'ACCRUED_INTEREST',
+                         'DV01'])
+            equity_value = self.totals['equity_market_value']
+            bond_value = float(bonds['MARKET_VALUE'].sum())
+            cash = self.opening_cash + float(self.cash_flow.sum()) + float(bonds['CASH_FLOW'].sum())
+            long_value = float(self.market_value[self.market_value > 0].sum())
+            short_value = float(-self.market_value[self.market_value < 0].sum())
+            return {
+                'aum': cash + equity_value + bond_value,
+                'cash': cash,
+                'equity_market_value': equity_value,
+                'bond_market_value': bond_value,
+                'unrealized_pnl': self.totals['equity_unrealized'] + float(bonds['UNREALIZED_PNL'].sum()),
+                'realized_pnl': float(self.realized.sum()) + float(bonds['REALIZED_PNL'].sum()),
+                'bond_accrued': float(bonds['ACCRUED_INTEREST'].sum()),
+                'bond_dv01': float(bonds['DV01'].sum()),
+                'unpriced_bonds': int((bonds['MARKET_VALUE'].isna() & (bonds['NET_FACE'] != 0)).sum()),
+                'gross_exposure': long_value + short_value + abs(bond_value),
+                'net_exposure': long_value - short_value + bond_value,
+                'long_exposure': long_value,
+                'short_exposure': short_value,
+                'live_priced': int(self.live.sum()),
+                'open_positions': int((self.quantity != 0).sum()),
+                'valued_at': self.valued_at,
+            }
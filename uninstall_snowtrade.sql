@@ -18,6 +18,12 @@ USE WAREHOUSE ADHOC_WH;
 -- ============================================
 DROP STREAMLIT IF EXISTS SECURITY_MASTER_DB.GOLDEN_RECORD.SNOWTRADE_APP;
 
+-- Settlement projection refresh (suspend before dropping the tables it writes)
+ALTER TASK IF EXISTS SECURITY_MASTER_DB.TRADES.REFRESH_TRADE_SETTLEMENTS_TASK SUSPEND;
+DROP TASK IF EXISTS SECURITY_MASTER_DB.TRADES.REFRESH_TRADE_SETTLEMENTS_TASK;
+DROP PROCEDURE IF EXISTS SECURITY_MASTER_DB.TRADES.REFRESH_TRADE_SETTLEMENTS(BOOLEAN);
+DROP PROCEDURE IF EXISTS SECURITY_MASTER_DB.TRADES.LOAD_SETTLEMENT_CALENDAR(DATE, DATE);
+
 -- ============================================
 -- STEP 2: Drop External Access Integrations
 -- ============================================
@@ -36,6 +42,7 @@ DROP STAGE IF EXISTS SECURITY_MASTER_DB.TRADES.BOND_ORDERS;
 -- ============================================
 DROP FUNCTION IF EXISTS SECURITY_MASTER_DB.GOLDEN_RECORD.LOOKUP_ISIN_EXTERNAL(VARCHAR);
 DROP FUNCTION IF EXISTS SECURITY_MASTER_DB.TRADES.GET_STOCK_PRICE(VARCHAR);
+DROP FUNCTION IF EXISTS SECURITY_MASTER_DB.TRADES.GET_STOCK_PRICES(ARRAY);
 
 -- ============================================
 -- STEP 5: Drop Streams
@@ -59,6 +66,8 @@ DROP SEQUENCE IF EXISTS SECURITY_MASTER_DB.TRADES.ORDER_ID_SEQ;
 -- Hybrid Tables
 DROP TABLE IF EXISTS SECURITY_MASTER_DB.TRADES.EQUITY_TRADES;
 DROP TABLE IF EXISTS SECURITY_MASTER_DB.TRADES.BOND_TRADES;
+DROP TABLE IF EXISTS SECURITY_MASTER_DB.TRADES.TRADE_SETTLEMENTS;
+DROP TABLE IF EXISTS SECURITY_MASTER_DB.TRADES.TRADE_DATES;
 
 -- Standard Tables
 DROP TABLE IF EXISTS SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_REFERENCE;
@@ -66,6 +75,8 @@ DROP TABLE IF EXISTS SECURITY_MASTER_DB.GOLDEN_RECORD.SECURITY_MASTER_HISTORY;
 DROP TABLE IF EXISTS SECURITY_MASTER_DB.SECURITIES.SP500;
 DROP TABLE IF EXISTS SECURITY_MASTER_DB.SECURITIES.NYSE_LISTED;
 DROP TABLE IF EXISTS SECURITY_MASTER_DB.FIXED_INCOME.CORPORATE_BONDS;
+DROP TABLE IF EXISTS SECURITY_MASTER_DB.TRADES.SETTLEMENT_CALENDAR;
+DROP TABLE IF EXISTS SECURITY_MASTER_DB.TRADES.SETTLEMENT_CONVENTIONS;
 
 -- ============================================
 -- STEP 9: Drop Schemas